@@ -0,0 +1,406 @@
+'''
+ローカルのモックサーバー(benchmarks.mock_server)に対して、method.pyの各クラスのメソッドを呼び出し、
+スループットと応答時間(p50・p99)を計測します。計測結果はJSONで出力します。
+
+シナリオ
+    single :    メソッドごとに1スレッドで繰り返し呼び出します。
+    threads :   複数スレッドから同時に呼び出します(取引APIはKeyPoolでスレッドごとにAPIキーを割り当てます)。
+    async :     asyncio版のクラスで同時に呼び出します(aiohttpが導入されている場合のみ)。
+    pagination: 取引履歴を全件取得するまでページを送ります。
+    import :    新しいPythonプロセスでzaiferを読み込む時間を計測します。
+
+    python -m benchmarks.bench_client --output result.json
+    python -m benchmarks.bench_client --latency 0.01 --error-rate 0.01 --baseline result.json
+
+--baseline を指定した場合、クライアント側の所要時間(p50から模擬した遅延を除いたもの)が
+--tolerance を超えて悪化したシナリオを表示し、終了コード1で終了します。
+'''
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.keypool import KeyPool
+from zaifer.zaifapi.method import (Account, AirFXMarket, AirFXTrade, Chart,
+                                   MarginMarket, MarginTrade, Market, Trade)
+
+try:
+    from zaifer.zaifapi import async_method
+    from zaifer.zaifapi.async_connection import AsyncSessionPool, aiohttp
+except ImportError:
+    async_method = None
+    aiohttp = None
+
+
+def _create_key() -> tuple:
+    '''
+    ノンスの状態を以前の計測と共有しないよう、計測ごとに新しいAPIキーを作成します。
+    '''
+    return str(uuid.uuid4()), str(uuid.uuid4())
+
+
+def _create_calls(url_config) -> list:
+    '''
+    計測するメソッドの(名前, 呼び出す関数)のリストを作成します。
+    '''
+    chart = Chart(url_config)
+    account = Account(*_create_key(), url_config=url_config)
+    market = Market(url_config)
+    trade = Trade(*_create_key(), url_config=url_config)
+    margin_market = MarginMarket(url_config)
+    margin_trade = MarginTrade(*_create_key(), url_config=url_config)
+    airfx_market = AirFXMarket(url_config)
+    airfx_trade = AirFXTrade(*_create_key(), url_config=url_config)
+    to_datetime = datetime.now()
+    from_datetime = to_datetime - timedelta(hours=1000)
+    price = Decimal('4000000')
+    amount = Decimal('0.01')
+    return [
+        ('Chart.get_ohlc', lambda: chart.get_ohlc(CURRENCY_PAIR, '60', from_datetime, to_datetime)),
+        ('Account.get_info', lambda: account.get_info()),
+        ('Account.get_info2', lambda: account.get_info2()),
+        ('Account.get_personal_info', lambda: account.get_personal_info()),
+        ('Account.get_id_info', lambda: account.get_id_info()),
+        ('Account.withdraw', lambda: account.withdraw('btc', 'address', amount)),
+        ('Account.get_deposit_history', lambda: account.get_deposit_history('btc', count=100)),
+        ('Account.get_withdraw_history', lambda: account.get_withdraw_history('btc', count=100)),
+        ('Market.get_currencies', lambda: market.get_currencies('btc')),
+        ('Market.get_currency_pairs', lambda: market.get_currency_pairs(CURRENCY_PAIR)),
+        ('Market.get_last_price', lambda: market.get_last_price(CURRENCY_PAIR)),
+        ('Market.get_ticker', lambda: market.get_ticker(CURRENCY_PAIR)),
+        ('Market.get_trade_history', lambda: market.get_trade_history(CURRENCY_PAIR)),
+        ('Market.get_depth', lambda: market.get_depth(CURRENCY_PAIR)),
+        ('Trade.get_trade_history', lambda: trade.get_trade_history(CURRENCY_PAIR, count=1000)),
+        ('Trade.get_active_orders', lambda: trade.get_active_orders(CURRENCY_PAIR)),
+        ('Trade.open_order', lambda: trade.open_order(CURRENCY_PAIR, 'bid', price, amount)),
+        ('Trade.cancel_order', lambda: trade.cancel_order(1, CURRENCY_PAIR)),
+        ('MarginMarket.get_groups', lambda: margin_market.get_groups('all')),
+        ('MarginMarket.get_last_price', lambda: margin_market.get_last_price(1, CURRENCY_PAIR)),
+        ('MarginMarket.get_ticker', lambda: margin_market.get_ticker(1, CURRENCY_PAIR)),
+        ('MarginMarket.get_trade_history', lambda: margin_market.get_trade_history(1, CURRENCY_PAIR)),
+        ('MarginMarket.get_depth', lambda: margin_market.get_depth(1, CURRENCY_PAIR)),
+        ('MarginMarket.get_swap_history', lambda: margin_market.get_swap_history(1, CURRENCY_PAIR)),
+        ('MarginTrade.get_positions', lambda: margin_trade.get_positions('margin', 1, CURRENCY_PAIR, count=1000)),
+        ('MarginTrade.get_position_history', lambda: margin_trade.get_position_history('margin', 1, 1)),
+        ('MarginTrade.get_active_positions', lambda: margin_trade.get_active_positions('margin', 1, CURRENCY_PAIR)),
+        ('MarginTrade.create_position', lambda: margin_trade.create_position(
+            'margin', 1, CURRENCY_PAIR, 'bid', price, amount, Decimal('2.5'))),
+        ('MarginTrade.update_position', lambda: margin_trade.update_position('margin', 1, 1, price)),
+        ('MarginTrade.cancel_position', lambda: margin_trade.cancel_position('margin', 1, 1)),
+        ('AirFXMarket.get_ticker', lambda: airfx_market.get_ticker()),
+        ('AirFXMarket.get_depth', lambda: airfx_market.get_depth()),
+        ('AirFXTrade.get_active_positions', lambda: airfx_trade.get_active_positions()),
+        ('AirFXTrade.create_position', lambda: airfx_trade.create_position('bid', price, amount, Decimal('2.5'))),
+    ]
+
+
+def _percentile(sorted_values: list, rate: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(rate * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _summarize(scenario: str, name: str, latencies: list, errors: int, elapsed: float, latency: float,
+               **extra) -> dict:
+    '''
+    計測結果を集計します。
+    '''
+    latencies = sorted(latencies)
+    count = len(latencies) + errors
+    p50 = _percentile(latencies, 0.5) * 1000
+    result = {
+        'scenario': scenario,
+        'name': name,
+        'count': count,
+        'errors': errors,
+        'elapsed_sec': round(elapsed, 6),
+        'throughput_rps': round(count / elapsed, 3) if elapsed > 0 else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 4) if latencies else 0.0,
+        'p50_ms': round(p50, 4),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 4),
+        # 模擬した遅延を除いた、クライアント側の所要時間
+        'overhead_p50_ms': round(max(p50 - latency * 1000, 0.0), 4)
+    }
+    result.update(extra)
+    return result
+
+
+def _measure(func, iterations: int) -> tuple:
+    '''
+    funcを繰り返し呼び出し、(成功した呼び出しの所要時間のリスト, 失敗した回数)を返します。
+    '''
+    latencies = []
+    errors = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    return latencies, errors
+
+
+def run_single(server: MockZaifServer, args) -> list:
+    '''
+    メソッドごとに1スレッドで計測します。
+    '''
+    results = []
+    for name, func in _create_calls(server.url_config()):
+        _measure(func, args.warmup)
+        start = time.perf_counter()
+        latencies, errors = _measure(func, args.iterations)
+        results.append(_summarize('single', name, latencies, errors,
+                                  time.perf_counter() - start, server.latency))
+    return results
+
+
+def run_threads(server: MockZaifServer, args) -> list:
+    '''
+    複数スレッドから同時に計測します。
+    '''
+    url_config = server.url_config()
+    market = Market(url_config)
+    key_pool = KeyPool([_create_key() for _ in range(args.threads)])
+    trade = Trade(key_pool, url_config=url_config)
+    calls = [
+        ('Market.get_depth', lambda: market.get_depth(CURRENCY_PAIR)),
+        ('Market.get_trade_history', lambda: market.get_trade_history(CURRENCY_PAIR)),
+        ('Trade.open_order', lambda: trade.open_order(
+            CURRENCY_PAIR, 'bid', Decimal('4000000'), Decimal('0.01'))),
+        ('Trade.get_active_orders', lambda: trade.get_active_orders(CURRENCY_PAIR)),
+    ]
+    results = []
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        for name, func in calls:
+            _measure(func, args.warmup)
+            start = time.perf_counter()
+            outcomes = list(executor.map(lambda _: _measure(func, args.iterations), range(args.threads)))
+            elapsed = time.perf_counter() - start
+            latencies = [latency for outcome in outcomes for latency in outcome[0]]
+            errors = sum(outcome[1] for outcome in outcomes)
+            results.append(_summarize('threads', name, latencies, errors, elapsed, server.latency,
+                                      concurrency=args.threads))
+    return results
+
+
+def run_async(server: MockZaifServer, args) -> list:
+    '''
+    asyncio版のクラスで同時に計測します。
+    '''
+    if async_method is None or aiohttp is None:
+        return []
+
+    async def measure(func) -> tuple:
+        latencies = []
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                try:
+                    await func()
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.threads)))
+        return latencies, errors, time.perf_counter() - start
+
+    async def main() -> list:
+        url_config = server.url_config()
+        url_config.async_session_pool = AsyncSessionPool()
+        market = async_method.AsyncMarket(url_config)
+        trade = async_method.AsyncTrade(*_create_key(), url_config=url_config)
+        calls = [
+            ('AsyncMarket.get_depth', lambda: market.get_depth(CURRENCY_PAIR)),
+            ('AsyncMarket.get_ticker', lambda: market.get_ticker(CURRENCY_PAIR)),
+            ('AsyncTrade.open_order', lambda: trade.open_order(
+                CURRENCY_PAIR, 'bid', Decimal('4000000'), Decimal('0.01'))),
+        ]
+        results = []
+        try:
+            for name, func in calls:
+                latencies, errors, elapsed = await measure(func)
+                results.append(_summarize('async', name, latencies, errors, elapsed, server.latency,
+                                          concurrency=args.threads))
+        finally:
+            await url_config.async_session_pool.close()
+        return results
+
+    loop = asyncio.new_event_loop()
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(main())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def run_pagination(server: MockZaifServer, args) -> list:
+    '''
+    取引履歴を全件取得するまでページを送り、1件あたりの所要時間を計測します。
+    '''
+    trade = Trade(*_create_key(), url_config=server.url_config())
+    results = []
+    for prefetch in (False, True):
+        start = time.perf_counter()
+        errors = 0
+        records = 0
+        try:
+            for _ in trade.iter_trade_history(CURRENCY_PAIR, page_size=args.page_size, prefetch=prefetch):
+                records += 1
+        except Exception:
+            errors += 1
+        elapsed = time.perf_counter() - start
+        results.append({
+            'scenario': 'pagination',
+            'name': 'Trade.iter_trade_history' + (' (prefetch)' if prefetch else ''),
+            'records': records,
+            'errors': errors,
+            'page_size': args.page_size,
+            'elapsed_sec': round(elapsed, 6),
+            'records_per_sec': round(records / elapsed, 3) if elapsed > 0 else 0.0
+        })
+    return results
+
+
+# importシナリオで計測する文
+IMPORT_STATEMENTS = (
+    'import zaifer',
+    'from zaifer import TimeConverter',
+    'from zaifer import Market'
+)
+
+
+def run_import(server: MockZaifServer, args) -> list:
+    '''
+    新しいPythonプロセスでzaiferを読み込み、所要時間の中央値を計測します。
+    '''
+    script = ('import time; start = time.perf_counter(); exec({!r}); '
+              'print(time.perf_counter() - start)')
+    results = []
+    for statement in IMPORT_STATEMENTS:
+        timings = []
+        errors = 0
+        for _ in range(args.import_runs):
+            process = subprocess.run([sys.executable, '-c', script.format(statement)],
+                                     capture_output=True, text=True)
+            if process.returncode != 0:
+                errors += 1
+                continue
+            timings.append(float(process.stdout) * 1000)
+        results.append({
+            'scenario': 'import',
+            'name': statement,
+            'runs': len(timings),
+            'errors': errors,
+            'import_ms': round(statistics.median(timings), 3) if timings else None
+        })
+    return results
+
+
+SCENARIOS = {
+    'single': run_single,
+    'threads': run_threads,
+    'async': run_async,
+    'pagination': run_pagination,
+    'import': run_import
+}
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    '''
+    基準の計測結果と比較し、悪化したシナリオの説明のリストを返します。
+    '''
+    previous = {(result['scenario'], result['name']): result for result in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = previous.get((result['scenario'], result['name']))
+        if base is None:
+            continue
+        for metric in ('overhead_p50_ms', 'records_per_sec', 'import_ms'):
+            if metric not in result or metric not in base or not base[metric]:
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            if metric == 'records_per_sec':
+                change = -change
+            if change > tolerance:
+                regressions.append('{} {} {}: {} -> {} ({:+.1%})'.format(
+                    result['scenario'], result['name'], metric, base[metric], result[metric], change))
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='モックサーバーに対してクライアントの性能を計測します。')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='計測するシナリオ(カンマ区切り): ' + ', '.join(SCENARIOS))
+    parser.add_argument('--iterations', type=int, default=200, help='メソッドごと(スレッドごと)の呼び出し回数')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=8, help='threads・asyncシナリオの同時実行数')
+    parser.add_argument('--latency', type=float, default=0.0, help='サーバーの応答遅延(秒)')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--depth-levels', type=int, default=150)
+    parser.add_argument('--trades-size', type=int, default=150)
+    parser.add_argument('--history-size', type=int, default=20000)
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--import-runs', type=int, default=5, help='importシナリオの計測回数')
+    parser.add_argument('--output', help='計測結果を出力するJSONファイル')
+    parser.add_argument('--baseline', help='比較する基準の計測結果(JSONファイル)')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='悪化とみなす変化率')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error('unknown scenarios: {}'.format(', '.join(sorted(unknown))))
+
+    server = MockZaifServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            depth_levels=args.depth_levels, trades_size=args.trades_size,
+                            history_size=args.history_size)
+    results = []
+    with server:
+        for name in scenarios:
+            for result in SCENARIOS[name](server, args):
+                results.append(result)
+                print(json.dumps(result, ensure_ascii=False))
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'config': {name: value for name, value in vars(args).items()
+                   if name not in ('output', 'baseline')},
+        'server': server.statistics,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,68 @@
+'''
+レスポンスを辞書のまま保持した場合と、モデルに変換して保持した場合のメモリ使用量・参照時間を比較します。
+
+    python benchmarks/bench_models.py
+'''
+import gc
+import json
+import timeit
+import tracemalloc
+
+from zaifer.zaifapi.model import ModelConverter
+
+
+def create_trades(count: int) -> list:
+    payload = [{'date': 1546300800 + i, 'price': 4000000.0 + i, 'amount': 0.0123, 'tid': 100000000 + i,
+                'currency_pair': 'btc_jpy', 'trade_type': 'bid' if i % 2 else 'ask'} for i in range(count)]
+    return json.loads(json.dumps(payload))
+
+
+def create_depth(count: int) -> dict:
+    payload = {'asks': [[4000000.0 + i * 5, 0.01 * (i + 1)] for i in range(count)],
+               'bids': [[3999995.0 - i * 5, 0.01 * (i + 1)] for i in range(count)]}
+    return json.loads(json.dumps(payload))
+
+
+def measure_memory(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def main():
+    count = 100000
+
+    # 約定履歴を保持した場合のメモリ使用量(JSONからデコードした状態を基準とする)
+    dict_size = measure_memory(lambda: create_trades(count))
+    model_size = measure_memory(lambda: list(ModelConverter.trades(create_trades(count))))
+    print('trades x{}: dict {:.1f} MB, PublicTrade {:.1f} MB ({:.0%})'.format(
+        count, dict_size / 1e6, model_size / 1e6, model_size / dict_size))
+
+    dict_size = measure_memory(lambda: create_depth(count))
+    model_size = measure_memory(lambda: {side: list(levels)
+                                         for side, levels in ModelConverter.depth(create_depth(count)).items()})
+    print('depth x{}: list {:.1f} MB, DepthLevel {:.1f} MB ({:.0%})'.format(
+        count * 2, dict_size / 1e6, model_size / 1e6, model_size / dict_size))
+
+    # 項目の参照時間
+    trades = create_trades(1000)
+    models = list(ModelConverter.trades(trades))
+    number = 200
+    dict_time = timeit.timeit(lambda: [trade['price'] * trade['amount'] for trade in trades], number=number)
+    model_time = timeit.timeit(lambda: [trade.price * trade.amount for trade in models], number=number)
+    print('access: dict {:.1f} ns, PublicTrade {:.1f} ns per record'.format(
+        dict_time / number / len(trades) * 1e9, model_time / number / len(trades) * 1e9))
+
+    # 変換の時間(参照されるまで変換しないため、参照しない明細の変換は発生しない)
+    convert_time = timeit.timeit(lambda: ModelConverter.trades(trades), number=number)
+    materialize_time = timeit.timeit(lambda: list(ModelConverter.trades(trades)), number=number)
+    print('convert: lazy {:.1f} us, all records {:.1f} us per 1000 records'.format(
+        convert_time / number * 1e6, materialize_time / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+'''
+注文の要求の作成(パラメータの組み立て・エンコード・署名)にかかる時間を、
+従来の方法(分岐によるパラメータの組み立て・urlencode・署名ごとのhmac.new)と比較します。
+
+    python benchmarks/bench_request.py
+'''
+import hashlib
+import hmac
+import time
+import timeit
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from zaifer.zaifapi.builder import RequestSpec, TradeRequestBuilder
+from zaifer.zaifapi.connection import NonceSequencer
+from zaifer.zaifapi.signer import HmacSigner
+from zaifer.zaifapi.utils import NumericConverter
+
+KEY = 'a1b2c3d4-e5f6-a7b8-c9d0-e1f2a3b4c5d6'
+SECRET = 'f6e5d4c3-b2a1-f0e9-d8c7-b6a5f4e3d2c1'
+NONCE = Decimal('1546300800.123456')
+
+
+def legacy_open_order(currency_pair, action, price, amount, limit=None, comment=None):
+    params = {
+        'method': 'trade',
+        'currency_pair': currency_pair,
+        'action': action,
+        'price': NumericConverter.decimal_to_str(price),
+        'amount': NumericConverter.decimal_to_str(amount)
+    }
+    if limit is not None:
+        params['limit'] = limit
+    if comment is not None:
+        params['comment'] = comment
+    return None, params
+
+
+def legacy_trade_history(currency_pair, since, end, count):
+    params = {'method': 'trade_history', 'currency_pair': currency_pair, 'count': str(count)}
+    params['since'] = str(int(time.mktime(since.timetuple())))
+    params['end'] = str(int(time.mktime(end.timetuple())))
+    return None, params
+
+
+def legacy_sign(params):
+    encoded_params = urlencode(params)
+    signature = hmac.new(bytearray(SECRET.encode('utf-8')), digestmod=hashlib.sha512)
+    signature.update(encoded_params.encode('utf-8'))
+    return encoded_params, {'key': KEY, 'sign': signature.hexdigest()}
+
+
+SIGNER = HmacSigner(KEY, SECRET)
+
+
+def compiled_sign(params):
+    encoded_params = RequestSpec.encode_params(params)
+    return encoded_params, SIGNER.create_http_headers(encoded_params)
+
+
+def legacy_order():
+    _, params = legacy_open_order('btc_jpy', 'bid', Decimal('4000000'), Decimal('0.01'), Decimal('4100000'))
+    params['nonce'] = NONCE
+    return legacy_sign(params)
+
+
+def compiled_order():
+    _, params = TradeRequestBuilder.open_order('btc_jpy', 'bid', Decimal('4000000'), Decimal('0.01'), Decimal('4100000'))
+    params['nonce'] = NONCE
+    return compiled_sign(params)
+
+
+SINCE = datetime(2019, 1, 1)
+END = datetime(2019, 2, 1)
+
+
+def legacy_history():
+    _, params = legacy_trade_history('btc_jpy', SINCE, END, 1000)
+    params['nonce'] = NONCE
+    return legacy_sign(params)
+
+
+def compiled_history():
+    _, params = TradeRequestBuilder.get_trade_history('btc_jpy', SINCE, END, None, 1000)
+    params['nonce'] = NONCE
+    return compiled_sign(params)
+
+
+def measure(func, number: int = 50000) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    assert legacy_order()[1] == compiled_order()[1]
+    for name, legacy, compiled in (('open_order', legacy_order, compiled_order),
+                                   ('trade_history', legacy_history, compiled_history)):
+        legacy_time = measure(legacy)
+        compiled_time = measure(compiled)
+        print('{}: legacy {:.2f} us, compiled {:.2f} us ({:.1f}x)'.format(
+            name, legacy_time, compiled_time, legacy_time / compiled_time))
+
+    # 参考:ノンスの採番(プロセス間で共有するファイルのロックを含む)
+    sequencer = NonceSequencer.for_key(KEY)
+    print('nonce: {:.2f} us'.format(measure(sequencer.generate, 20000)))
+
+
+if __name__ == '__main__':
+    main()
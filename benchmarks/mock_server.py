@@ -0,0 +1,341 @@
+'''
+ベンチマーク用に、ZaifAPIの公開API・取引API・証拠金取引API・チャートAPIを模したHTTPサーバーです。
+
+応答は実際のAPIと同じ形式・同程度の大きさで、遅延とエラーを指定した割合で発生させることができます。
+
+    python -m benchmarks.mock_server --port 8080 --latency 0.05
+'''
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from zaifer.zaifapi.connection import UrlConfigs
+
+CURRENCY_PAIR = 'btc_jpy'
+BASE_PRICE = 4000000.0
+
+
+class MockZaifServer():
+    '''
+    ZaifAPIを模したHTTPサーバーです。バックグラウンドのスレッドで応答します。
+    '''
+
+    # 発生させるエラーの種類
+    ERROR_KINDS = ('server_error', 'throttled', 'trade_unavailable')
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, error_kinds: tuple = ERROR_KINDS,
+                 depth_levels: int = 150, trades_size: int = 150, history_size: int = 20000, seed: int = 0):
+        '''
+        コンストラクタ
+        latency :
+            応答までの遅延(秒)
+        jitter :
+            遅延に加える揺らぎの最大値(秒)
+        error_rate :
+            エラーを返す割合(0～1)
+        depth_levels :
+            板情報の売り・買いそれぞれの価格帯の数
+        trades_size :
+            全ユーザーの取引履歴の件数
+        history_size :
+            ユーザー自身の取引履歴・証拠金取引の履歴の件数
+        '''
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_kinds = tuple(error_kinds)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._order_ids = iter(range(10000000, 2 ** 62))
+        self._order_lock = threading.Lock()
+        self._statistics = {'requests': 0, 'errors': 0}
+        self._payloads = self._create_payloads(depth_levels, trades_size)
+        self._history = self._create_history(history_size)
+        self._httpd = ThreadingHTTPServer((host, port), self._create_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    @property
+    def statistics(self) -> dict:
+        return dict(self._statistics)
+
+    def url_config(self) -> UrlConfigs:
+        '''
+        このサーバーへ接続するUrlConfigsを作成します。
+        '''
+        url_config = UrlConfigs()
+        url_config.public_api_url = self.base_url + '/api/1'
+        url_config.trade_api_url = self.base_url + '/tapi'
+        url_config.margin_public_api_url = self.base_url + '/fapi/1'
+        url_config.margin_trade_api_url = self.base_url + '/tlapi'
+        url_config.chart_api_url = self.base_url + '/zaif_chart_api/v1'
+        return url_config
+
+    def start(self) -> 'MockZaifServer':
+        '''
+        サーバーを起動します。
+        '''
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-zaif', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        '''
+        サーバーを停止します。
+        '''
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockZaifServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def handle_get(self, path: str) -> tuple:
+        '''
+        GET要求の(ステータスコード, 本文)を作成します。
+        '''
+        url = urlparse(path)
+        parts = [part for part in url.path.split('/') if part]
+        if parts[:2] == ['zaif_chart_api', 'v1'] and parts[2:] == ['history']:
+            return 200, self._payloads['chart']
+        if parts[:2] in (['api', '1'], ['fapi', '1']) and len(parts) >= 3:
+            payload = self._payloads.get(parts[2])
+            if payload is not None:
+                return 200, payload
+        return 404, b'{"error": "not found"}'
+
+    def handle_post(self, path: str, params: dict) -> tuple:
+        '''
+        POST要求の(ステータスコード, 本文)を作成します。
+        '''
+        method = params.get('method')
+        handler = getattr(self, '_api_' + str(method), None)
+        if handler is None:
+            return 200, self._error('invalid method')
+        return 200, json.dumps({'success': 1, 'return': handler(params)}).encode('utf-8')
+
+    def inject(self, is_post: bool) -> tuple:
+        '''
+        遅延を発生させ、エラーを返す場合はその(ステータスコード, 本文)を返します。
+        '''
+        with self._random_lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            kinds = [kind for kind in self.error_kinds if is_post or kind != 'trade_unavailable']
+            kind = self._random.choice(kinds) if failed and kinds else None
+            self._statistics['requests'] += 1
+            if kind is not None:
+                self._statistics['errors'] += 1
+        if delay > 0:
+            time.sleep(delay)
+        if kind == 'server_error':
+            return 500, b'Internal Server Error'
+        if kind == 'throttled':
+            return 429, b'Too Many Requests'
+        if kind == 'trade_unavailable':
+            return 200, self._error('trade temporarily unavailable.')
+        return None
+
+    def _create_handler(self):
+        '''
+        要求を処理するハンドラーを作成します。
+        '''
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # ヘッダーと本文を1回で送信し、遅延ACKによる待ちが生じないようにする
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._respond(*(server.inject(False) or server.handle_get(self.path)))
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8')
+                params = {name: values[0] for name, values in parse_qs(body).items()}
+                self._respond(*(server.inject(True) or server.handle_post(self.path, params)))
+
+            def _respond(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @staticmethod
+    def _create_payloads(depth_levels: int, trades_size: int) -> dict:
+        '''
+        公開APIの応答をあらかじめ作成します。
+        '''
+        now = int(time.time())
+        ticker = {'last': BASE_PRICE, 'high': BASE_PRICE * 1.02, 'low': BASE_PRICE * 0.98,
+                  'vwap': BASE_PRICE, 'volume': 1234.5678, 'bid': BASE_PRICE - 5, 'ask': BASE_PRICE + 5}
+        trades = [{'date': now - i, 'price': BASE_PRICE + (i % 40) * 5, 'amount': round(0.0001 * (i % 97 + 1), 4),
+                   'tid': 200000000 - i, 'currency_pair': CURRENCY_PAIR, 'trade_type': 'bid' if i % 2 else 'ask'}
+                  for i in range(trades_size)]
+        depth = {'asks': [[BASE_PRICE + 5 * (i + 1), round(0.001 * (i % 53 + 1), 4)] for i in range(depth_levels)],
+                 'bids': [[BASE_PRICE - 5 * (i + 1), round(0.001 * (i % 47 + 1), 4)] for i in range(depth_levels)]}
+        candles = [{'time': (now - (1000 - i) * 3600) * 1000, 'open': BASE_PRICE, 'high': BASE_PRICE + 100,
+                    'low': BASE_PRICE - 100, 'close': BASE_PRICE + 10, 'volume': 12.3456}
+                   for i in range(1000)]
+        payloads = {
+            'currencies': [{'id': 1, 'name': 'btc', 'is_token': False}],
+            'currency_pairs': [{'name': 'BTC/JPY', 'currency_pair': CURRENCY_PAIR, 'description': 'ビットコイン・日本円',
+                                'is_token': False, 'item_unit_min': 0.0001, 'item_unit_step': 0.0001,
+                                'aux_unit_min': 5.0, 'aux_unit_step': 5.0}],
+            'groups': [{'id': 1, 'currency_pair': CURRENCY_PAIR, 'start_timestamp': 1490000000,
+                        'end_timestamp': 4102444800, 'use_swap': True}],
+            'last_price': {'last_price': BASE_PRICE},
+            'ticker': ticker,
+            'trades': trades,
+            'depth': depth,
+            'swap_history': [{'timestamp': now - i * 28800, 'swap_rate_bid': -0.0001, 'swap_rate_ask': 0.0001}
+                             for i in range(100)]
+        }
+        encoded = {name: json.dumps(payload).encode('utf-8') for name, payload in payloads.items()}
+        # チャートAPIは2重にエンコードされた応答を返す
+        encoded['chart'] = json.dumps(json.dumps({'ohlc_data': candles})).encode('utf-8')
+        return encoded
+
+    @staticmethod
+    def _create_history(size: int) -> list:
+        '''
+        取引履歴を作成します。
+        '''
+        now = int(time.time())
+        return [(record_id, {'currency_pair': CURRENCY_PAIR, 'action': 'bid' if record_id % 2 else 'ask',
+                             'amount': 0.01, 'price': BASE_PRICE, 'fee': 0, 'your_action': 'bid',
+                             'bonus': 0, 'timestamp': str(now - size + record_id), 'comment': ''})
+                for record_id in range(1, size + 1)]
+
+    def _page(self, params: dict) -> dict:
+        '''
+        履歴をcount・from_id・end_id・orderで絞り込みます。
+        '''
+        count = int(params.get('count') or 1000)
+        from_id = int(params.get('from_id') or 0)
+        end_id = int(params.get('end_id') or len(self._history))
+        records = self._history[max(from_id - 1, 0):end_id]
+        if params.get('order', 'DESC') == 'DESC':
+            records = records[::-1]
+        return {str(record_id): record for record_id, record in records[:count]}
+
+    def _next_order_id(self) -> int:
+        with self._order_lock:
+            return next(self._order_ids)
+
+    @staticmethod
+    def _error(message: str) -> bytes:
+        return json.dumps({'success': 0, 'error': message}).encode('utf-8')
+
+    def _api_get_info(self, params: dict) -> dict:
+        return {'funds': {'jpy': 1000000, 'btc': 1.5, 'mona': 100.0},
+                'deposit': {'jpy': 1200000, 'btc': 1.6, 'mona': 100.0},
+                'rights': {'info': 1, 'trade': 1, 'withdraw': 0, 'personal_info': 0, 'id_info': 0},
+                'trade_count': 120, 'open_orders': 3, 'server_time': int(time.time())}
+
+    _api_get_info2 = _api_get_info
+
+    def _api_get_personal_info(self, params: dict) -> dict:
+        return {'ranking_nickname': 'bench', 'icon_path': ''}
+
+    def _api_get_id_info(self, params: dict) -> dict:
+        return {'id': 1, 'email': 'bench@example.com', 'name': 'bench', 'kana': 'ベンチ', 'certified': True}
+
+    def _api_withdraw(self, params: dict) -> dict:
+        return {'id': self._next_order_id(), 'fee': 0.0005, 'funds': {'jpy': 1000000, 'btc': 1.0}}
+
+    def _api_deposit_history(self, params: dict) -> dict:
+        return {str(record_id): {'timestamp': record['timestamp'], 'address': 'addr', 'amount': 0.1, 'txid': 'tx'}
+                for record_id, record in self._page(params).items()}
+
+    _api_withdraw_history = _api_deposit_history
+
+    def _api_trade_history(self, params: dict) -> dict:
+        return self._page(params)
+
+    def _api_active_orders(self, params: dict) -> dict:
+        return {str(10000 + i): {'currency_pair': CURRENCY_PAIR, 'action': 'bid', 'amount': 0.01,
+                                 'price': BASE_PRICE - i * 5, 'timestamp': str(int(time.time())), 'comment': ''}
+                for i in range(20)}
+
+    def _api_trade(self, params: dict) -> dict:
+        return {'received': 0, 'remains': float(params.get('amount', 0)), 'order_id': self._next_order_id(),
+                'funds': {'jpy': 1000000, 'btc': 1.5}}
+
+    def _api_cancel_order(self, params: dict) -> dict:
+        return {'order_id': int(params.get('order_id', 0)), 'funds': {'jpy': 1000000, 'btc': 1.5}}
+
+    def _api_get_positions(self, params: dict) -> dict:
+        return {record_id: dict(record, group_id=1, leverage=2.5, price_avg=BASE_PRICE, amount_done=0.01,
+                                close_avg=BASE_PRICE, close_done=0.01, deposit_jpy=16000.0, swap=0.0)
+                for record_id, record in self._page(params).items()}
+
+    def _api_position_history(self, params: dict) -> dict:
+        return {str(params.get('leverage_id')): {'group_id': 1, 'currency_pair': CURRENCY_PAIR, 'action': 'bid',
+                                                 'amount': 0.01, 'price': BASE_PRICE,
+                                                 'timestamp': str(int(time.time()))}}
+
+    def _api_active_positions(self, params: dict) -> dict:
+        return {str(20000 + i): {'group_id': 1, 'currency_pair': CURRENCY_PAIR, 'action': 'bid', 'amount': 0.01,
+                                 'price': BASE_PRICE - i * 5, 'limit': BASE_PRICE * 1.1, 'stop': BASE_PRICE * 0.9,
+                                 'timestamp': str(int(time.time())), 'leverage': 2.5, 'fee_spent': 0,
+                                 'deposit': 16000.0}
+                for i in range(20)}
+
+    def _api_create_position(self, params: dict) -> dict:
+        return {'leverage_id': self._next_order_id(), 'timestamp': str(int(time.time())), 'term_end': 0,
+                'remains': float(params.get('amount', 0)), 'funds': {'jpy': 1000000}}
+
+    def _api_change_position(self, params: dict) -> dict:
+        return {'leverage_id': int(params.get('leverage_id', 0)), 'price_avg': BASE_PRICE,
+                'price': float(params.get('price', 0))}
+
+    def _api_cancel_position(self, params: dict) -> dict:
+        return {'leverage_id': int(params.get('leverage_id', 0)), 'fee_spent': 0, 'timestamp_closed': '0',
+                'price_avg': BASE_PRICE, 'amount': 0.01, 'close_avg': BASE_PRICE}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ZaifAPIを模したHTTPサーバーを起動します。')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--depth-levels', type=int, default=150)
+    parser.add_argument('--trades-size', type=int, default=150)
+    args = parser.parse_args()
+
+    server = MockZaifServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                            depth_levels=args.depth_levels, trades_size=args.trades_size)
+    print('listening on {}'.format(server.base_url))
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -31,7 +31,8 @@ setup(
     url='https://github.com/curio184/zaifer',
     license='MIT',
     include_package_data=True,
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests', 'tests.*']),
+    python_requires='>=3.7',
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
@@ -39,10 +40,15 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
     ],
     keywords='zaif zaifapi zaif-exchange trade bot',
-    install_requires=['requests']
+    install_requires=['requests'],
+    extras_require={
+        'async': ['aiohttp'],
+        'numpy': ['numpy'],
+        'stream': ['websockets'],
+        'json': ['orjson'],
+        'http2': ['httpx[http2]']
+    }
 )
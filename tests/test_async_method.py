@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+from decimal import Decimal
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.async_connection import AsyncSessionPool, aiohttp
+from zaifer.zaifapi.async_method import AsyncAccount, AsyncMarginMarket, AsyncMarket, AsyncTrade
+from zaifer.zaifapi.exception import InvalidAPIKeyException
+from zaifer.zaifapi.method import Market
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncMethodTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockZaifServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def run_async(self, coroutine_function):
+        '''
+        専用のセッションプールを設定したUrlConfigsを渡して、コルーチンを実行します。
+        '''
+        async def main():
+            url_config = self.server.url_config()
+            url_config.async_session_pool = AsyncSessionPool()
+            try:
+                return await coroutine_function(url_config)
+            finally:
+                await url_config.async_session_pool.close()
+        return asyncio.run(main())
+
+    def test_market_matches_sync_api(self):
+        async def main(url_config):
+            return await AsyncMarket(url_config).get_depth(CURRENCY_PAIR)
+        self.assertEqual(self.run_async(main), Market(self.server.url_config()).get_depth(CURRENCY_PAIR))
+
+    def test_margin_market(self):
+        async def main(url_config):
+            return await AsyncMarginMarket(url_config).get_ticker(1, CURRENCY_PAIR)
+        self.assertIn('last', self.run_async(main))
+
+    def test_private_call_requires_key(self):
+        async def main(url_config):
+            return await AsyncAccount(None, None, url_config).get_info2()
+        with self.assertRaises(InvalidAPIKeyException):
+            self.run_async(main)
+
+    def test_concurrent_private_calls_keep_nonce_order(self):
+        received = []
+        handle_post = self.server.handle_post
+
+        def record(path, params):
+            received.append(Decimal(params['nonce']))
+            return handle_post(path, params)
+
+        self.server.handle_post = record
+        try:
+            async def main(url_config):
+                account = AsyncAccount('test-key', 'secret', url_config)
+                trade = AsyncTrade('test-key', 'secret', url_config)
+                return await asyncio.gather(
+                    *[account.get_info2() for _ in range(10)],
+                    *[trade.open_order(CURRENCY_PAIR, 'bid', Decimal('4000000'), Decimal('0.01'))
+                      for _ in range(10)])
+            results = self.run_async(main)
+        finally:
+            del self.server.handle_post
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(received, sorted(received))
+        self.assertEqual(len(set(received)), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
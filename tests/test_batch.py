@@ -0,0 +1,90 @@
+import threading
+import time
+import unittest
+from decimal import Decimal
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.batch import BatchExecutor, BatchResult
+from zaifer.zaifapi.keypool import KeyPool
+from zaifer.zaifapi.method import Trade
+
+
+class BatchExecutorTest(unittest.TestCase):
+
+    def test_results_keep_request_order(self):
+        def func(request):
+            time.sleep(0.01 * (5 - request))
+            return request * 2
+
+        results = BatchExecutor(4).map(func, range(5))
+        self.assertEqual([result.request for result in results], list(range(5)))
+        self.assertEqual([result.result for result in results], [0, 2, 4, 6, 8])
+        self.assertTrue(all(result.ok for result in results))
+
+    def test_errors_are_returned_per_request(self):
+        def func(request):
+            if request % 2:
+                raise ValueError(request)
+            return request
+
+        results = BatchExecutor(2).map(func, range(4))
+        self.assertEqual([result.ok for result in results], [True, False, True, False])
+        self.assertIsInstance(results[1].error, ValueError)
+        self.assertIsNone(results[1].result)
+        self.assertEqual(results[2], BatchResult(2, 2, None))
+
+    def test_max_workers(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def func(request):
+            with lock:
+                active.append(request)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(request)
+
+        BatchExecutor(3).map(func, range(9))
+        self.assertEqual(max(peak), 3)
+        peak.clear()
+        BatchExecutor().map(func, range(3))
+        self.assertEqual(max(peak), 1)
+
+    def test_invalid_max_workers(self):
+        with self.assertRaises(ValueError):
+            BatchExecutor(0)
+
+    def test_for_connection(self):
+        key_pool = KeyPool([('test-batch-{}'.format(i), 'secret') for i in range(3)])
+        self.assertEqual(BatchExecutor.for_connection(Trade(key_pool)._connection).max_workers, 3)
+        self.assertEqual(BatchExecutor.for_connection(Trade('test-key', 'secret')._connection).max_workers, 1)
+        self.assertEqual(BatchExecutor.for_connection(object(), 5).max_workers, 5)
+
+
+class BatchTradeTest(unittest.TestCase):
+
+    def test_open_and_cancel_orders(self):
+        key_pool = KeyPool([('test-batch-trade-{}'.format(i), 'secret') for i in range(2)])
+        with MockZaifServer() as server:
+            trade = Trade(key_pool, url_config=server.url_config())
+            orders = [{'currency_pair': CURRENCY_PAIR, 'action': 'bid', 'price': Decimal('4000000'),
+                       'amount': Decimal('0.01')} for _ in range(4)]
+            orders.append({'currency_pair': CURRENCY_PAIR, 'action': 'bid'})
+            results = trade.open_orders(orders)
+            self.assertEqual([result.ok for result in results], [True] * 4 + [False])
+            self.assertIsInstance(results[-1].error, TypeError)
+
+            order_ids = [result.result['order_id'] for result in results[:4]]
+            cancels = trade.cancel_orders(order_ids)
+            self.assertEqual([result.result['order_id'] for result in cancels], order_ids)
+
+            cancels = trade.cancel_all(CURRENCY_PAIR)
+            self.assertEqual(len(cancels), 20)
+            self.assertTrue(all(result.ok for result in cancels))
+        self.assertTrue(all(statistics['requests'] > 0 for statistics in key_pool.statistics))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import hashlib
+import hmac
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from zaifer.zaifapi.builder import ChartRequestBuilder, RequestSpec, TradeRequestBuilder
+from zaifer.zaifapi.signer import HmacSigner
+
+
+class RequestSpecTest(unittest.TestCase):
+
+    def test_build_omits_optional_none(self):
+        _, params = TradeRequestBuilder.open_order('btc_jpy', 'bid', Decimal('4000000.0'), Decimal('0.0100'))
+        self.assertEqual(params, {'method': 'trade', 'currency_pair': 'btc_jpy', 'action': 'bid',
+                                  'price': '4000000', 'amount': '0.01'})
+
+    def test_encode_matches_urlencode(self):
+        cases = [
+            {'method': 'trade', 'currency_pair': 'btc_jpy', 'action': 'bid', 'price': '4000000',
+             'amount': '0.01', 'comment': 'テスト &=+/ ?', 'nonce': 1500000000.123456},
+            {'method': 'cancel_order', 'order_id': 123, 'nonce': 1},
+            {'method': 'get_info', 'nonce': '1.5'},
+            {'method': 'unknown', 'a b': 'c d', 'nonce': 2}
+        ]
+        for params in cases:
+            self.assertEqual(RequestSpec.encode_params(params), urlencode(params), params)
+            # 2回目はエンコード結果を再利用する
+            self.assertEqual(RequestSpec.encode_params(params), urlencode(params), params)
+
+    def test_of(self):
+        self.assertEqual(RequestSpec.of('trade').method, 'trade')
+        self.assertIsNone(RequestSpec.of('unknown'))
+
+    def test_history_datetime_uses_local_time(self):
+        since = datetime(2020, 1, 1, 9, 0, 0)
+        _, params = TradeRequestBuilder.get_trade_history('btc_jpy', since=since, count=10)
+        self.assertEqual(params['since'], str(int(time.mktime(since.timetuple()))))
+        self.assertEqual(params['count'], '10')
+        self.assertNotIn('end', params)
+
+    def test_aware_datetime_keeps_baseline_conversion(self):
+        # タイムゾーンは無視し、ローカル時刻として変換する(従来と同じ)
+        aware = datetime(2020, 1, 1, 9, 0, 0, tzinfo=timezone(timedelta(hours=-5)))
+        _, params = ChartRequestBuilder.get_ohlc('btc_jpy', '60', aware, aware)
+        self.assertEqual(params['from'], str(int(time.mktime(aware.timetuple()))))
+
+
+class HmacSignerTest(unittest.TestCase):
+
+    def test_sign(self):
+        signer = HmacSigner('key', 'secret')
+        for params in ('method=get_info&nonce=1', 'method=get_info&nonce=2'):
+            expected = hmac.new(b'secret', params.encode('utf-8'), hashlib.sha512).hexdigest()
+            self.assertEqual(signer.sign(params), expected)
+        self.assertEqual(signer.create_http_headers('nonce=1'),
+                         {'key': 'key', 'sign': hmac.new(b'secret', b'nonce=1', hashlib.sha512).hexdigest()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.cache import ResponseCache
+from zaifer.zaifapi.method import Market
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_ttl_of(self):
+        cache = ResponseCache(ttls={'/ticker/': 5.0})
+        self.assertEqual(cache.ttl_of('/ticker/btc_jpy'), 5.0)
+        self.assertEqual(cache.ttl_of('/currencies/all'), 3600.0)
+        self.assertIsNone(cache.ttl_of('/unknown/btc_jpy'))
+
+    def test_hit_until_expired(self):
+        cache = ResponseCache(ttls={'/ticker/': 0.05})
+        calls = []
+        load = lambda: calls.append(1) or {'last': len(calls)}
+        self.assertEqual(cache.get_or_load('url', '/ticker/btc_jpy', {}, load), {'last': 1})
+        self.assertEqual(cache.get_or_load('url', '/ticker/btc_jpy', {}, load), {'last': 1})
+        time.sleep(0.06)
+        self.assertEqual(cache.get_or_load('url', '/ticker/btc_jpy', {}, load), {'last': 2})
+        statistics = cache.statistics
+        self.assertEqual((statistics['hits'], statistics['misses']), (1, 2))
+
+    def test_uncached_endpoint_always_loads(self):
+        cache = ResponseCache()
+        calls = []
+        for _ in range(3):
+            cache.get_or_load('url', '/unknown/', {}, lambda: calls.append(1))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(cache.statistics['entries'], 0)
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(max_entries=2)
+        for name in ('a', 'b'):
+            cache.store(('url', name, ()), name, 60)
+        cache.lookup(('url', 'a', ()))
+        cache.store(('url', 'c', ()), 'c', 60)
+        self.assertEqual(cache.lookup(('url', 'b', ()))[0], ResponseCache.MISS)
+        self.assertEqual(cache.lookup(('url', 'a', ()))[0], ResponseCache.FRESH)
+        self.assertEqual(cache.statistics['evictions'], 1)
+
+    def test_stale_while_revalidate(self):
+        cache = ResponseCache(ttls={'/ticker/': 0.01}, stale_while_revalidate=10.0)
+        cache.get_or_load('url', '/ticker/btc_jpy', {}, lambda: {'last': 1})
+        time.sleep(0.02)
+        refreshed = threading.Event()
+
+        def load():
+            refreshed.set()
+            return {'last': 2}
+
+        # 期限切れのレスポンスを返し、バックグラウンドで再取得する
+        self.assertEqual(cache.get_or_load('url', '/ticker/btc_jpy', {}, load), {'last': 1})
+        self.assertTrue(refreshed.wait(1.0))
+        for _ in range(100):
+            state, value = cache.lookup(cache.key_of('url', '/ticker/btc_jpy', {}))
+            if value == {'last': 2}:
+                break
+            time.sleep(0.01)
+        self.assertEqual((state, value), (ResponseCache.FRESH, {'last': 2}))
+
+    def test_refresh_error_keeps_stale_value(self):
+        cache = ResponseCache(ttls={'/ticker/': 0.01}, stale_while_revalidate=10.0)
+        key = cache.key_of('url', '/ticker/btc_jpy', {})
+        cache.store(key, {'last': 1}, 0.01)
+        time.sleep(0.02)
+        self.assertTrue(cache.begin_refresh(key))
+        self.assertFalse(cache.begin_refresh(key))
+        cache.end_refresh(key, None, 0.01, ValueError())
+        self.assertEqual(cache.lookup(key), (ResponseCache.STALE, {'last': 1}))
+        self.assertEqual(cache.statistics['refresh_errors'], 1)
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        cache.store(cache.key_of('a', '/ticker/btc_jpy', {}), 1, 60)
+        cache.store(cache.key_of('a', '/depth/btc_jpy', {}), 2, 60)
+        cache.store(cache.key_of('b', '/ticker/btc_jpy', {}), 3, 60)
+        cache.invalidate('/ticker/', 'a')
+        self.assertEqual(cache.statistics['entries'], 2)
+        cache.invalidate()
+        self.assertEqual(cache.statistics['entries'], 0)
+
+    def test_callers_cannot_modify_cached_response(self):
+        cache = ResponseCache()
+        loaded = {'asks': [[1.0, 2.0]], 'bids': []}
+        first = cache.get_or_load('url', '/depth/btc_jpy', {}, lambda: loaded)
+        loaded['asks'].clear()
+        first['bids'].append([0.5, 1.0])
+        second = cache.get_or_load('url', '/depth/btc_jpy', {}, lambda: None)
+        second['asks'][0][0] = 9.0
+        third = cache.get_or_load('url', '/depth/btc_jpy', {}, lambda: None)
+        self.assertEqual(third, {'asks': [[1.0, 2.0]], 'bids': []})
+
+
+class ResponseCacheIntegrationTest(unittest.TestCase):
+
+    def test_market_uses_cache(self):
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            url_config.response_cache = ResponseCache(ttls={'/ticker/': 60.0})
+            market = Market(url_config)
+            results = [market.get_ticker(CURRENCY_PAIR) for _ in range(5)]
+            market.get_depth(CURRENCY_PAIR)
+            self.assertEqual(server.statistics['requests'], 2)
+        self.assertTrue(all(result == results[0] for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi import candle_store
+from zaifer.zaifapi.candle_store import CandleStore
+from zaifer.zaifapi.method import Chart
+from zaifer.zaifapi.utils import TimeConverter
+
+
+def create_candles(start: int, count: int, period_seconds: int = 60) -> list:
+    '''
+    startから足の間隔ごとに並んだローソク足を作成します。
+    '''
+    return [{'time': start + i * period_seconds, 'open': i, 'high': i + 1.0, 'low': i - 1.0,
+             'close': i + 0.5, 'volume': 0.1} for i in range(count)]
+
+
+class CandleStoreTest(unittest.TestCase):
+
+    START = int(TimeConverter.datetime_to_unixtime(datetime(2020, 1, 1)))
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+
+    def open_store(self, period: str = '1') -> CandleStore:
+        store = CandleStore(self._directory.name, CURRENCY_PAIR, period)
+        self.addCleanup(store.close)
+        return store
+
+    def test_append_and_read(self):
+        store = self.open_store()
+        self.assertIsNone(store.last_time)
+        self.assertEqual(store.append(create_candles(self.START, 10)), 10)
+        self.assertEqual(len(store), 10)
+        self.assertEqual(store.last_time, self.START + 540)
+        res = store.read()
+        self.assertEqual(list(res['time']), [self.START + i * 60 for i in range(10)])
+        self.assertEqual(list(res['close']), [i + 0.5 for i in range(10)])
+
+    def test_append_skips_old_candles(self):
+        store = self.open_store()
+        store.append(create_candles(self.START, 5))
+        # 保存済みの時刻以前のローソク足は追加しない
+        self.assertEqual(store.append(create_candles(self.START + 180, 5)), 3)
+        self.assertEqual(list(store.read()['time']), [self.START + i * 60 for i in range(8)])
+
+    def test_millisecond_time(self):
+        store = self.open_store()
+        store.append([dict(candle, time=candle['time'] * 1000) for candle in create_candles(self.START, 2)])
+        self.assertEqual(list(store.read()['time']), [self.START, self.START + 60])
+
+    def test_read_range(self):
+        store = self.open_store()
+        store.append(create_candles(self.START, 10))
+        from_datetime = TimeConverter.unixtime_to_datetime(self.START + 120)
+        res = store.read(from_datetime, from_datetime + timedelta(minutes=3))
+        self.assertEqual(list(res['time']), [self.START + i * 60 for i in range(2, 6)])
+
+    def test_reopen(self):
+        store = self.open_store()
+        store.append(create_candles(self.START, 3))
+        store.close()
+        reopened = self.open_store()
+        self.assertEqual(len(reopened), 3)
+        self.assertEqual(reopened.last_time, self.START + 120)
+
+    def test_different_period_is_rejected(self):
+        self.open_store('1').close()
+        os.rename(os.path.join(self._directory.name, '{}_1.candles'.format(CURRENCY_PAIR)),
+                  os.path.join(self._directory.name, '{}_5.candles'.format(CURRENCY_PAIR)))
+        with self.assertRaises(ValueError):
+            self.open_store('5')
+
+    def test_grow_closes_previous_map(self):
+        store = self.open_store()
+        previous = store._mmap
+        count = CandleStore._INITIAL_CAPACITY + 10
+        self.assertEqual(store.append(create_candles(self.START, count)), count)
+        self.assertTrue(previous.closed)
+        self.assertFalse(os.path.exists(store.path + '.tmp'))
+        res = store.read()
+        self.assertEqual(len(res['time']), count)
+        self.assertEqual(res['time'][-1], self.START + (count - 1) * 60)
+        self.assertEqual(res['open'][-1], count - 1)
+
+    def test_grow_keeps_views_readable(self):
+        store = self.open_store()
+        store.append(create_candles(self.START, 10))
+        view = store.read()['time']
+        store.append(create_candles(self.START + 600, CandleStore._INITIAL_CAPACITY))
+        self.assertEqual(list(view), [self.START + i * 60 for i in range(10)])
+
+    def test_grow_with_views_fails_where_mapped_file_cannot_be_replaced(self):
+        store = self.open_store()
+        store.append(create_candles(self.START, 10))
+        view = store.read()['time']
+        with mock.patch.object(candle_store, '_CAN_REPLACE_MAPPED_FILE', False):
+            with self.assertRaises(BufferError):
+                store.append(create_candles(self.START + 600, CandleStore._INITIAL_CAPACITY))
+        # 失敗しても保存済みのローソク足はそのまま残る
+        self.assertFalse(os.path.exists(store.path + '.tmp'))
+        self.assertEqual(len(store), 10)
+        self.assertEqual(list(view), [self.START + i * 60 for i in range(10)])
+        del view
+        self.assertEqual(store.append(create_candles(self.START + 600, CandleStore._INITIAL_CAPACITY)),
+                         CandleStore._INITIAL_CAPACITY)
+
+
+class CandleStoreSyncTest(unittest.TestCase):
+
+    def test_sync(self):
+        with tempfile.TemporaryDirectory() as directory, MockZaifServer() as server:
+            store = CandleStore(directory, CURRENCY_PAIR, '60', Chart(server.url_config()))
+            try:
+                added = store.sync(since=datetime.now() - timedelta(days=30))
+                self.assertGreater(added, 0)
+                # 確定していないローソク足は保存しない
+                self.assertLess(store.last_time + 3600, time.time() + 1)
+                self.assertEqual(store.sync(), 0)
+            finally:
+                store.close()
+
+    def test_sync_requires_since_for_empty_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = CandleStore(directory, CURRENCY_PAIR, '60', chart=object())
+            try:
+                with self.assertRaises(ValueError):
+                    store.sync()
+            finally:
+                store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
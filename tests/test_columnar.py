@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime, timedelta
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.columnar import ColumnarConverter
+from zaifer.zaifapi.method import Chart, Market
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class ColumnarConverterTest(unittest.TestCase):
+
+    def test_ohlc(self):
+        res = ColumnarConverter.ohlc({'ohlc_data': [
+            {'time': 1000, 'open': 1, 'high': 3, 'low': 0.5, 'close': 2, 'volume': 0.1},
+            {'time': 2000, 'open': 2, 'high': 4, 'low': 1.5, 'close': 3, 'volume': 0.2}
+        ]})
+        self.assertEqual(set(res), set(ColumnarConverter.OHLC_COLUMNS))
+        self.assertEqual(res['time'].dtype, numpy.int64)
+        self.assertEqual(res['close'].dtype, numpy.float64)
+        self.assertEqual(res['time'].tolist(), [1000, 2000])
+        self.assertEqual(res['high'].tolist(), [3.0, 4.0])
+        self.assertTrue(res['volume'].flags['C_CONTIGUOUS'])
+
+    def test_trades(self):
+        res = ColumnarConverter.trades([
+            {'tid': 2, 'date': 1500000001, 'price': 100.0, 'amount': 0.5, 'trade_type': 'bid'},
+            {'tid': 1, 'date': 1500000000, 'price': 99.0, 'amount': 1.5, 'trade_type': 'ask'}
+        ])
+        self.assertEqual(res['tid'].tolist(), [2, 1])
+        self.assertEqual(res['date'].dtype, numpy.int64)
+        self.assertEqual(res['price'].tolist(), [100.0, 99.0])
+        self.assertEqual(res['side'].dtype, numpy.int8)
+        self.assertEqual(res['side'].tolist(), [ColumnarConverter.SIDE_BID, ColumnarConverter.SIDE_ASK])
+
+    def test_depth(self):
+        res = ColumnarConverter.depth({'asks': [[101.0, 0.1], [102.0, 0.2]], 'bids': [[99.0, 0.3]]})
+        self.assertEqual(res['asks'].shape, (2, 2))
+        self.assertEqual(res['bids'].tolist(), [[99.0, 0.3]])
+
+    def test_empty(self):
+        self.assertEqual(ColumnarConverter.ohlc({'ohlc_data': []})['time'].shape, (0,))
+        self.assertEqual(ColumnarConverter.trades([])['side'].shape, (0,))
+        self.assertEqual(ColumnarConverter.depth({})['asks'].shape, (0, 2))
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class ColumnarIntegrationTest(unittest.TestCase):
+
+    def test_market_and_chart(self):
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            market = Market(url_config)
+            trades = market.get_trade_history(CURRENCY_PAIR)
+            columns = market.get_trade_history(CURRENCY_PAIR, columnar=True)
+            self.assertEqual(columns['tid'].tolist(), [trade['tid'] for trade in trades])
+            self.assertEqual(columns['price'].tolist(), [trade['price'] for trade in trades])
+
+            depth = market.get_depth(CURRENCY_PAIR)
+            self.assertEqual(market.get_depth(CURRENCY_PAIR, columnar=True)['bids'].tolist(), depth['bids'])
+
+            to_datetime = datetime.now()
+            ohlc = Chart(url_config).get_ohlc(CURRENCY_PAIR, '60', to_datetime - timedelta(days=1),
+                                              to_datetime, columnar=True)
+            self.assertEqual(len(ohlc['time']), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.connection import HttpConnection, ResponseParser, SessionPool
+from zaifer.zaifapi.exception import (HttpStatusException, InvalidAPIKeyException, InvalidAPISecretException,
+                                      OrderNotFoundException)
+from zaifer.zaifapi.method import Account, Market
+
+
+class SessionPoolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockZaifServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def create_url_config(self, session_pool: SessionPool):
+        url_config = self.server.url_config()
+        url_config.session_pool = session_pool
+        url_config.single_flight = None
+        return url_config
+
+    def test_reuses_connection(self):
+        session_pool = SessionPool()
+        market = Market(self.create_url_config(session_pool))
+        for _ in range(5):
+            self.assertIn('last', market.get_ticker(CURRENCY_PAIR))
+        statistics = session_pool.statistics
+        self.assertEqual(statistics['sessions'], 1)
+        self.assertEqual(statistics['requests'], 5)
+        self.assertEqual(statistics['new_connections'], 1)
+        self.assertEqual(statistics['reused_connections'], 4)
+        session_pool.close()
+
+    def test_recycles_session_after_max_requests(self):
+        session_pool = SessionPool(max_requests_per_connection=2)
+        market = Market(self.create_url_config(session_pool))
+        for _ in range(5):
+            market.get_last_price(CURRENCY_PAIR)
+        statistics = session_pool.statistics
+        self.assertEqual(statistics['sessions'], 3)
+        self.assertEqual(statistics['recycled_sessions'], 2)
+        self.assertEqual(statistics['requests'], 5)
+        session_pool.close()
+
+    def test_recycles_idle_session(self):
+        session_pool = SessionPool(keep_alive_timeout=0)
+        market = Market(self.create_url_config(session_pool))
+        market.get_last_price(CURRENCY_PAIR)
+        market.get_last_price(CURRENCY_PAIR)
+        self.assertEqual(session_pool.statistics['recycled_sessions'], 1)
+        session_pool.close()
+
+    def test_sessions_per_base_url(self):
+        session_pool = SessionPool()
+        url_config = self.create_url_config(session_pool)
+        Market(url_config).get_ticker(CURRENCY_PAIR)
+        Account('test-key', 'secret', url_config).get_info2()
+        self.assertEqual(session_pool.statistics['sessions'], 2)
+        session_pool.close()
+
+
+class HttpConnectionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = MockZaifServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def test_get(self):
+        url_config = self.server.url_config()
+        connection = HttpConnection(url_config.public_api_url, url_config=url_config)
+        self.assertEqual(connection.get('/ticker/' + CURRENCY_PAIR, {})['bid'], 3999995.0)
+
+    def test_get_raises_on_http_error(self):
+        url_config = self.server.url_config()
+        connection = HttpConnection(url_config.public_api_url, url_config=url_config)
+        with self.assertRaises(HttpStatusException):
+            connection.get('/unknown', {})
+
+    def test_post_signs_and_parses(self):
+        url_config = self.server.url_config()
+        connection = HttpConnection(url_config.trade_api_url, 'test-key', 'secret', url_config)
+        res = connection.post('', {'method': 'get_info2'})
+        self.assertEqual(ResponseParser.parse(res)['trade_count'], 120)
+
+    def test_post_requires_credentials(self):
+        url_config = self.server.url_config()
+        requests_count = self.server.statistics['requests']
+        with self.assertRaises(InvalidAPIKeyException):
+            HttpConnection(url_config.trade_api_url, url_config=url_config).post('', {'method': 'get_info2'})
+        with self.assertRaises(InvalidAPISecretException):
+            HttpConnection(url_config.trade_api_url, 'test-key', url_config=url_config).post(
+                '', {'method': 'get_info2'})
+        self.assertEqual(self.server.statistics['requests'], requests_count)
+
+
+class ResponseParserTest(unittest.TestCase):
+
+    def test_parse_returns_payload(self):
+        self.assertEqual(ResponseParser.parse({'success': 1, 'return': {'a': 1}}), {'a': 1})
+
+    def test_parse_maps_error_message(self):
+        with self.assertRaises(OrderNotFoundException):
+            ResponseParser.parse({'success': 0, 'error': 'order not found'})
+
+    def test_unknown_error_message(self):
+        error = ResponseParser.error_of({'success': 0, 'error': 'something else'})
+        self.assertIs(type(error), Exception)
+        self.assertEqual(str(error), 'something else')
+
+
+if __name__ == '__main__':
+    unittest.main()
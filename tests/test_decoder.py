@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.connection import ResponseParser
+from zaifer.zaifapi.decoder import JsonDecoder
+from zaifer.zaifapi.method import Chart
+
+
+class JsonDecoderTest(unittest.TestCase):
+
+    def test_backends_decode_alike(self):
+        content = b'{"last": 4000000.5, "asks": [[1.5, 2]], "name": "\\u30d3\\u30c3\\u30c8"}'
+        for backend in ('json', JsonDecoder().backend):
+            self.assertEqual(JsonDecoder(backend).decode(content),
+                             {'last': 4000000.5, 'asks': [[1.5, 2]], 'name': 'ビット'}, backend)
+
+    def test_unsupported_backend(self):
+        with self.assertRaises(ValueError):
+            JsonDecoder('yaml')
+
+    def test_decimal(self):
+        decoder = JsonDecoder(decimal=True)
+        self.assertEqual(decoder.backend, 'json')
+        self.assertEqual(decoder.decode(b'{"price": 0.1}'), {'price': Decimal('0.1')})
+
+    def test_string_body_is_decoded_once(self):
+        # 文字列のJSONはそのまま文字列として返す
+        self.assertEqual(JsonDecoder().decode(b'"{\\"a\\": 1}"'), '{"a": 1}')
+        self.assertEqual(JsonDecoder().decode(b'"ok"'), 'ok')
+
+    def test_copy(self):
+        value = {'asks': [[1.0, 2.0]], 'name': 'btc'}
+        copied = JsonDecoder.copy(value)
+        copied['asks'][0][0] = 9.0
+        self.assertEqual(value, {'asks': [[1.0, 2.0]], 'name': 'btc'})
+
+
+class ParseChartTest(unittest.TestCase):
+
+    def test_double_encoded(self):
+        self.assertEqual(ResponseParser.parse_chart('{"ohlc_data": []}'), {'ohlc_data': []})
+        self.assertEqual(ResponseParser.parse_chart('{"price": 0.1}', JsonDecoder(decimal=True)),
+                         {'price': Decimal('0.1')})
+
+    def test_already_decoded(self):
+        self.assertEqual(ResponseParser.parse_chart({'ohlc_data': []}), {'ohlc_data': []})
+
+    def test_get_ohlc(self):
+        with MockZaifServer() as server:
+            to_datetime = datetime.now()
+            res = Chart(server.url_config()).get_ohlc(CURRENCY_PAIR, '60', to_datetime - timedelta(days=1),
+                                                      to_datetime)
+        self.assertEqual(len(res['ohlc_data']), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
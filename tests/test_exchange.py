@@ -0,0 +1,188 @@
+import asyncio
+import unittest
+from decimal import Decimal
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from zaifer.zaifapi.connection import UrlConfigs
+from zaifer.zaifapi.exception import InvalidAmountException, OrderNotFoundException
+from zaifer.zaifapi.exchange import MatchingEngine, SimulatedExchange, SimulatedOrder
+from zaifer.zaifapi.method import Account, MarginTrade, Market, Trade
+
+if aiohttp is not None:
+    from zaifer.zaifapi.async_method import AsyncAccount, AsyncMarket, AsyncTrade
+
+CURRENCY_PAIR = 'btc_jpy'
+
+DEPTH = {'asks': [[4000100, 0.5], [4000200, 1.0]], 'bids': [[3999900, 0.5], [3999800, 1.0]]}
+
+
+def create_order(order_id: int, action: str, price: int, amount: str, timestamp: float = 0.0) -> SimulatedOrder:
+    return SimulatedOrder(order_id, CURRENCY_PAIR, action, Decimal(price), Decimal(amount), timestamp)
+
+
+class MatchingEngineTest(unittest.TestCase):
+
+    def test_price_time_priority(self):
+        engine = MatchingEngine(CURRENCY_PAIR)
+        first = create_order(1, MatchingEngine.ASK, 101, '1')
+        second = create_order(2, MatchingEngine.ASK, 101, '1')
+        better = create_order(3, MatchingEngine.ASK, 100, '1')
+        for order in (first, second, better):
+            engine.submit(order, 0.0)
+        self.assertEqual(engine.best(MatchingEngine.ASK), 100)
+
+        fills = engine.submit(create_order(4, MatchingEngine.BID, 101, '2.5'), 1.0)
+        self.assertEqual([(fill.maker.order_id, fill.price, fill.amount) for fill in fills],
+                         [(3, 100, 1), (1, 101, 1), (2, 101, Decimal('0.5'))])
+        self.assertEqual(second.remains, Decimal('0.5'))
+        self.assertEqual(engine.last_price, 101)
+        self.assertEqual([trade['tid'] for trade in engine.trades], [3, 2, 1])
+
+    def test_limit_price_and_rest(self):
+        engine = MatchingEngine(CURRENCY_PAIR)
+        engine.submit(create_order(1, MatchingEngine.ASK, 101, '1'), 0.0)
+        bid = create_order(2, MatchingEngine.BID, 100, '1')
+        self.assertEqual(engine.submit(bid, 0.0), [])
+        self.assertEqual(engine.depth(), {'asks': [[101, 1]], 'bids': [[100, 1]]})
+        self.assertEqual(engine.submit(create_order(3, MatchingEngine.BID, 99, '1'), 0.0, rest=False), [])
+        self.assertEqual(engine.best(MatchingEngine.BID), 100)
+
+    def test_cancel(self):
+        engine = MatchingEngine(CURRENCY_PAIR)
+        orders = [create_order(i, MatchingEngine.BID, 100, '1') for i in range(3)]
+        for order in orders:
+            engine.submit(order, 0.0)
+        self.assertEqual(engine.cancel(orders[0]), 1)
+        self.assertEqual(engine.cancel(orders[0]), 0)
+        self.assertEqual(engine.depth()['bids'], [[100, 2]])
+        fills = engine.submit(create_order(9, MatchingEngine.ASK, 100, '1'), 0.0)
+        self.assertEqual(fills[0].maker.order_id, 1)
+        engine.cancel(orders[2])
+        self.assertIsNone(engine.best(MatchingEngine.BID))
+
+    def test_clear(self):
+        engine = MatchingEngine(CURRENCY_PAIR)
+        engine.submit(create_order(1, MatchingEngine.ASK, 101, '1'), 0.0)
+        mine = SimulatedOrder(2, CURRENCY_PAIR, MatchingEngine.ASK, Decimal(102), Decimal(1), 0.0, owner='spot')
+        engine.submit(mine, 0.0)
+        self.assertEqual(engine.clear(None)[0].order_id, 1)
+        self.assertEqual(engine.depth()['asks'], [[102, 1]])
+
+
+class SimulatedExchangeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = SimulatedExchange({'jpy': 1000000, 'btc': 1}, clock=lambda: 1500000000.0)
+        self.exchange.seed_depth(CURRENCY_PAIR, DEPTH)
+        self.url_config = UrlConfigs()
+        self.url_config.transport = self.exchange
+        self.url_config.single_flight = None
+        self.trade = Trade('test-key', 'secret', self.url_config)
+
+    def test_market(self):
+        market = Market(self.url_config)
+        self.assertEqual(market.get_depth(CURRENCY_PAIR), DEPTH)
+        self.assertEqual(market.get_ticker(CURRENCY_PAIR)['ask'], 4000100)
+        self.assertEqual(market.get_last_price(CURRENCY_PAIR), {'last_price': 4000000})
+
+    def test_resting_order_fills_from_trades(self):
+        res = self.trade.open_order(CURRENCY_PAIR, 'bid', Decimal('3999950'), Decimal('0.1'))
+        self.assertEqual(res['remains'], 0.1)
+        self.assertEqual(list(self.trade.get_active_orders()), [str(res['order_id'])])
+        self.assertEqual(self.exchange.balances['funds']['jpy'], Decimal('1000000') - Decimal('399995'))
+
+        self.exchange.seed_trades(CURRENCY_PAIR, [{'trade_type': 'ask', 'price': 3999950, 'amount': 0.1,
+                                                   'date': 1500000001, 'tid': 1}])
+        self.assertEqual(self.trade.get_active_orders(), {})
+        info = Account('test-key', 'secret', self.url_config).get_info()
+        self.assertEqual(info['funds']['btc'], 1.1)
+        self.assertEqual(info['trade_count'], 1)
+
+    def test_crossing_order_fills_immediately(self):
+        res = self.trade.open_order(CURRENCY_PAIR, 'ask', Decimal('3999900'), Decimal('0.2'))
+        self.assertEqual((res['received'], res['remains'], res['order_id']), (0.2, 0.0, 0))
+        self.assertEqual(self.exchange.balances['funds']['jpy'], Decimal('1000000') + Decimal('799980'))
+
+    def test_cancel_order_refunds(self):
+        res = self.trade.open_order(CURRENCY_PAIR, 'ask', Decimal('4100000'), Decimal('0.5'))
+        self.assertEqual(self.exchange.balances['funds']['btc'], Decimal('0.5'))
+        self.trade.cancel_order(res['order_id'])
+        self.assertEqual(self.exchange.balances['funds']['btc'], Decimal('1'))
+        with self.assertRaises(OrderNotFoundException):
+            self.trade.cancel_order(res['order_id'])
+
+    def test_errors(self):
+        with self.assertRaises(InvalidAmountException):
+            self.trade.open_order(CURRENCY_PAIR, 'bid', Decimal('4000000'), Decimal('0'))
+        with self.assertRaisesRegex(Exception, 'insufficient funds'):
+            self.trade.open_order(CURRENCY_PAIR, 'bid', Decimal('4000000'), Decimal('10'))
+
+    def test_unknown_action_is_rejected(self):
+        with self.assertRaisesRegex(Exception, 'invalid action parameter'):
+            self.trade.open_order(CURRENCY_PAIR, 'buy', Decimal('4000000'), Decimal('0.1'))
+        margin_trade = MarginTrade('test-key', 'secret', self.url_config)
+        with self.assertRaisesRegex(Exception, 'invalid action parameter'):
+            margin_trade.create_position('margin', None, CURRENCY_PAIR, 'sell', Decimal('4000000'),
+                                         Decimal('0.1'), Decimal('2'))
+        # 残高・板は変わらない
+        self.assertEqual(self.exchange.balances['funds'], {'jpy': Decimal('1000000'), 'btc': Decimal('1')})
+        self.assertEqual(self.exchange.engine(CURRENCY_PAIR).depth(), DEPTH)
+
+    def test_positions(self):
+        margin_trade = MarginTrade('test-key', 'secret', self.url_config)
+        res = margin_trade.create_position('margin', None, CURRENCY_PAIR, 'bid', Decimal('4000100'),
+                                           Decimal('0.2'), Decimal('2'))
+        self.assertEqual(res['amount_done'], 0.2)
+        self.assertEqual(self.exchange.balances['funds']['jpy'], Decimal('1000000') - Decimal('400010'))
+        positions = margin_trade.get_active_positions('margin')
+        self.assertEqual(positions[str(res['leverage_id'])]['price_avg'], 4000100)
+
+    def test_cancelled_positions_are_history(self):
+        margin_trade = MarginTrade('test-key', 'secret', self.url_config)
+        cancelled = margin_trade.create_position('margin', None, CURRENCY_PAIR, 'bid', Decimal('3900000'),
+                                                 Decimal('0.1'), Decimal('2'))
+        active = margin_trade.create_position('margin', None, CURRENCY_PAIR, 'bid', Decimal('3800000'),
+                                              Decimal('0.1'), Decimal('2'))
+        self.assertEqual(margin_trade.get_positions('margin'), {})
+        margin_trade.cancel_position('margin', None, cancelled['leverage_id'])
+
+        positions = margin_trade.get_positions('margin', currency_pair=CURRENCY_PAIR)
+        self.assertEqual(list(positions), [str(cancelled['leverage_id'])])
+        position = positions[str(cancelled['leverage_id'])]
+        self.assertEqual((position['close_avg'], position['close_done'], position['fee_spent']), (0, 0, 0))
+        self.assertEqual((position['deposit_jpy'], position['refunded_jpy']), (0, 195000))
+        self.assertEqual(position['timestamp_closed'], '1500000000')
+        self.assertEqual(list(margin_trade.get_active_positions('margin')), [str(active['leverage_id'])])
+        self.assertEqual(margin_trade.get_positions('margin', currency_pair='eth_jpy'), {})
+        self.assertEqual(margin_trade.get_positions('margin', from_id=active['leverage_id']), {})
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncSimulatedExchangeTest(unittest.TestCase):
+
+    def test_async_clients_use_exchange(self):
+        exchange = SimulatedExchange({'jpy': 1000000, 'btc': 1})
+        exchange.seed_depth(CURRENCY_PAIR, DEPTH)
+        url_config = UrlConfigs()
+        url_config.transport = exchange
+
+        async def main():
+            trade = AsyncTrade('test-key', 'secret', url_config)
+            order = await trade.open_order(CURRENCY_PAIR, 'bid', Decimal('3999000'), Decimal('0.1'))
+            active_orders = await trade.get_active_orders()
+            depth = await AsyncMarket(url_config).get_depth(CURRENCY_PAIR)
+            info = await AsyncAccount('test-key', 'secret', url_config).get_info2()
+            return order, active_orders, depth, info
+
+        order, active_orders, depth, info = asyncio.run(main())
+        self.assertEqual(list(active_orders), [str(order['order_id'])])
+        self.assertIn([3999000, 0.1], depth['bids'])
+        self.assertEqual(info['funds']['jpy'], 1000000 - 399900)
+
+
+if __name__ == '__main__':
+    unittest.main()
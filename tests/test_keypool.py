@@ -0,0 +1,93 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.keypool import KeyPool
+from zaifer.zaifapi.method import Trade
+
+
+def create_key_pool(size: int) -> KeyPool:
+    return KeyPool([('test-keypool-{}'.format(i), 'secret') for i in range(size)])
+
+
+class KeyPoolTest(unittest.TestCase):
+
+    def test_requires_credentials(self):
+        with self.assertRaises(ValueError):
+            KeyPool([])
+
+    def test_spreads_requests_over_idle_keys(self):
+        key_pool = create_key_pool(3)
+        indexes = [key_pool._acquire({'method': 'get_info'}) for _ in range(3)]
+        self.assertEqual(sorted(indexes), [0, 1, 2])
+
+    def test_waiter_takes_first_key_released(self):
+        key_pool = create_key_pool(2)
+        first = key_pool._acquire({})
+        second = key_pool._acquire({})
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(key_pool._acquire({})), daemon=True)
+        waiter.start()
+        waiter.join(0.1)
+        self.assertEqual(acquired, [])
+
+        # 先に占有したキーが空かなくても、後のキーが空いた時点で割り当てられる
+        key_pool._release(second, {}, {'success': 1, 'return': {}}, 0.0)
+        waiter.join(1.0)
+        self.assertEqual(acquired, [second])
+        key_pool._release(first, {}, {'success': 1, 'return': {}}, 0.0)
+        key_pool._release(second, {}, {'success': 1, 'return': {}}, 0.0)
+
+    def test_sticky_request_waits_for_its_key(self):
+        key_pool = create_key_pool(2)
+        index = key_pool._acquire({'method': 'trade'})
+        key_pool._release(index, {'method': 'trade'}, {'success': 1, 'return': {'order_id': 7}}, 0.0)
+
+        # 発注したキーを占有する
+        busy, other = key_pool._acquire({}), key_pool._acquire({})
+        if busy != index:
+            busy, other = other, busy
+        key_pool._release(other, {}, {'success': 1, 'return': {}}, 0.0)
+        acquired = []
+        cancel = threading.Thread(
+            target=lambda: acquired.append(key_pool._acquire({'method': 'cancel_order', 'order_id': 7})),
+            daemon=True)
+        cancel.start()
+        cancel.join(0.1)
+        self.assertEqual(acquired, [])
+
+        # 取消を待っているキーには、新しい要求を割り当てない
+        other = key_pool._acquire({})
+        self.assertNotEqual(other, index)
+        key_pool._release(busy, {}, {'success': 1, 'return': {}}, 0.0)
+        cancel.join(1.0)
+        self.assertEqual(acquired, [index])
+        self.assertEqual(key_pool.statistics[index]['sticky_requests'], 1)
+
+
+class KeyPoolTradeTest(unittest.TestCase):
+
+    def test_concurrent_orders_and_cancels(self):
+        key_pool = create_key_pool(3)
+        with MockZaifServer(latency=0.01) as server:
+            trade = Trade(key_pool, url_config=server.url_config())
+
+            def open_and_cancel(_):
+                order = trade.open_order(CURRENCY_PAIR, 'bid', Decimal('4000000'), Decimal('0.01'))
+                return trade.cancel_order(order['order_id'])
+
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                results = list(executor.map(open_and_cancel, range(30)))
+
+        self.assertEqual(len(results), 30)
+        statistics = key_pool.statistics
+        self.assertEqual(sum(s['requests'] for s in statistics), 60)
+        self.assertEqual(sum(s['sticky_requests'] for s in statistics), 30)
+        self.assertTrue(all(s['requests'] > 0 for s in statistics))
+        self.assertTrue(all(s['in_flight'] == 0 for s in statistics))
+
+
+if __name__ == '__main__':
+    unittest.main()
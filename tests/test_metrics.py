@@ -0,0 +1,95 @@
+import unittest
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.connection import SessionPool
+from zaifer.zaifapi.method import Market, Trade
+from zaifer.zaifapi.metrics import TRACED_POOL_CLASSES, MetricsAggregator, RequestTrace
+
+
+def pool_classes_of(session_pool: SessionPool, base_url: str, traced: bool) -> dict:
+    '''
+    ベースURLのセッションが使用する接続プールのクラスを取得します。
+    '''
+    adapter = session_pool._entries[(base_url, traced)]['session'].get_adapter(base_url)
+    return adapter.poolmanager.pool_classes_by_scheme
+
+
+class TracedPoolTest(unittest.TestCase):
+
+    def test_untraced_by_default(self):
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            session_pool = url_config.session_pool = SessionPool()
+            Market(url_config).get_ticker(CURRENCY_PAIR)
+            self.assertEqual(list(session_pool._entries), [(url_config.public_api_url, False)])
+            self.assertIsNot(pool_classes_of(session_pool, url_config.public_api_url, False), TRACED_POOL_CLASSES)
+
+    def test_instrumentation_does_not_affect_shared_pool(self):
+        with MockZaifServer() as server:
+            session_pool = SessionPool()
+            plain_config = server.url_config()
+            plain_config.session_pool = session_pool
+            instrumented_config = server.url_config()
+            instrumented_config.session_pool = session_pool
+            instrumented_config.instrumentation = MetricsAggregator()
+
+            plain_market = Market(plain_config)
+            plain_market.get_ticker(CURRENCY_PAIR)
+            Market(instrumented_config).get_ticker(CURRENCY_PAIR)
+            plain_market.get_depth(CURRENCY_PAIR)
+
+            base_url = plain_config.public_api_url
+            # 計測する要求だけが計測に対応した接続プールを使用し、計測しない要求のセッションは作り直さない
+            self.assertIs(pool_classes_of(session_pool, base_url, True), TRACED_POOL_CLASSES)
+            self.assertIsNot(pool_classes_of(session_pool, base_url, False), TRACED_POOL_CLASSES)
+            self.assertEqual(session_pool._entries[(base_url, False)]['requests'], 2)
+            statistics = session_pool.statistics
+            self.assertEqual((statistics['sessions'], statistics['recycled_sessions']), (2, 0))
+
+
+class MetricsAggregatorTest(unittest.TestCase):
+
+    def test_records_phases(self):
+        aggregator = MetricsAggregator()
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            url_config.session_pool = SessionPool()
+            url_config.instrumentation = aggregator
+            Market(url_config).get_ticker(CURRENCY_PAIR)
+            Trade('test-key', 'secret', url_config).get_active_orders()
+
+        snapshot = aggregator.snapshot()
+        self.assertEqual(snapshot['requests'], {('public', 'ticker', '200'): 1, ('trade', 'active_orders', '200'): 1})
+        phases = {key[2] for key in snapshot['phases'] if key[0] == 'trade'}
+        self.assertTrue({'build', 'sign', 'connect', 'send', 'ttfb', 'read', 'decode', 'parse'} <= phases)
+
+    def test_export_prometheus(self):
+        aggregator = MetricsAggregator(buckets=(0.1, 1.0))
+        trace = RequestTrace('GET', 'public', 'ticker')
+        trace.mark('read')
+        trace.status = 200
+        trace.finish()
+        aggregator.after_request(trace)
+        failed = RequestTrace('POST', 'trade', 'trade')
+        failed.finish(ValueError())
+        aggregator.after_request(failed)
+
+        text = aggregator.export_prometheus()
+        self.assertIn('zaifer_request_duration_seconds_bucket{family="public",method="ticker",le="+Inf"} 1', text)
+        self.assertIn('zaifer_requests_total{family="public",method="ticker",status="200"} 1', text)
+        self.assertIn('zaifer_request_errors_total{family="trade",method="trade",error="ValueError"} 1', text)
+        aggregator.reset()
+        self.assertEqual(aggregator.snapshot()['requests'], {})
+
+    def test_trace_is_thread_local(self):
+        trace = RequestTrace('GET', 'public', 'ticker')
+        trace.activate()
+        try:
+            self.assertIs(RequestTrace.current(), trace)
+        finally:
+            RequestTrace.deactivate()
+        self.assertIsNone(RequestTrace.current())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.method import Account, Market, Trade
+from zaifer.zaifapi.model import (ActiveOrder, Balance, DepthLevel, ModelConverter, ModelList, ModelMapping,
+                                  PublicTrade, Ticker)
+
+
+class ResponseModelTest(unittest.TestCase):
+
+    def test_fields_and_extra(self):
+        ticker = Ticker({'last': 100.0, 'high': 110.0, 'unknown': 1})
+        self.assertEqual(ticker.last, 100.0)
+        self.assertIsNone(ticker.volume)
+        self.assertEqual(ticker['unknown'], 1)
+        self.assertEqual(ticker.get('missing', 'default'), 'default')
+        with self.assertRaises(KeyError):
+            ticker['missing']
+        self.assertFalse(hasattr(ticker, '__dict__'))
+
+    def test_to_dict_round_trip(self):
+        payload = {'order_id': 1, 'currency_pair': CURRENCY_PAIR, 'action': 'bid', 'amount': 0.1,
+                   'price': 100.0, 'timestamp': '1500000000', 'comment': '', 'is_token': False}
+        order = ActiveOrder(payload)
+        self.assertEqual(order.to_dict(), payload)
+        self.assertEqual(order, ActiveOrder(payload))
+        self.assertNotEqual(order, Ticker(payload))
+
+    def test_values_override_payload(self):
+        self.assertEqual(ActiveOrder({'order_id': None}, order_id=5).order_id, 5)
+
+
+class ModelCollectionTest(unittest.TestCase):
+
+    def test_model_list_converts_lazily(self):
+        items = [{'tid': 1}, {'tid': 2}]
+        models = ModelList(items, PublicTrade)
+        self.assertIsInstance(models._items[0], dict)
+        self.assertEqual(models[0].tid, 1)
+        self.assertIs(models[0], models[0])
+        self.assertEqual([trade.tid for trade in models[0:2]], [1, 2])
+        self.assertEqual(len(models), 2)
+        # 元のリストは変更しない
+        self.assertEqual(items, [{'tid': 1}, {'tid': 2}])
+
+    def test_model_mapping_sets_key(self):
+        orders = ModelMapping({'10': {'price': 100.0}}, ActiveOrder, 'order_id')
+        self.assertEqual(list(orders), ['10'])
+        self.assertEqual(orders['10'].order_id, 10)
+        self.assertEqual(orders['10'].price, 100.0)
+
+    def test_depth(self):
+        depth = ModelConverter.depth({'asks': [[101.0, 0.1]], 'bids': None})
+        self.assertEqual(depth['asks'][0], DepthLevel(101.0, 0.1))
+        self.assertEqual(depth['asks'][0].price, 101.0)
+        self.assertEqual(len(depth['bids']), 0)
+
+    def test_active_orders_token_both(self):
+        res = ModelConverter.active_orders({'active_orders': {'1': {'price': 1.0}},
+                                            'token_active_orders': {'2': {'price': 2.0}}})
+        self.assertEqual(res['token_active_orders']['2'].order_id, 2)
+
+    def test_balances(self):
+        res = ModelConverter.balances({'funds': {'jpy': 100, 'btc': 1.0}, 'deposit': {'jpy': 150},
+                                       'trade_count': 3})
+        self.assertEqual(res['trade_count'], 3)
+        self.assertNotIn('funds', res)
+        self.assertEqual(res['balances']['jpy'], Balance(currency='jpy', funds=100, deposit=150))
+        self.assertIsNone(res['balances']['btc'].deposit)
+
+
+class ModelIntegrationTest(unittest.TestCase):
+
+    def test_methods_return_models(self):
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            market = Market(url_config)
+            ticker = market.get_ticker(CURRENCY_PAIR, model=True)
+            self.assertEqual(ticker.to_dict(), market.get_ticker(CURRENCY_PAIR))
+            trades = market.get_trade_history(CURRENCY_PAIR, model=True)
+            self.assertEqual(trades[0].to_dict(), market.get_trade_history(CURRENCY_PAIR)[0])
+            self.assertIsInstance(market.get_depth(CURRENCY_PAIR, model=True)['asks'][0], DepthLevel)
+
+            orders = Trade('test-key', 'secret', url_config).get_active_orders(model=True)
+            self.assertEqual(len(orders), 20)
+            self.assertTrue(all(orders[order_id].order_id == int(order_id) for order_id in orders))
+
+            info = Account('test-key', 'secret', url_config).get_info(model=True)
+            self.assertEqual(info['balances']['btc'].funds, 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from decimal import Decimal
+
+from benchmarks.mock_server import MockZaifServer
+from zaifer.zaifapi.async_connection import AsyncSessionPool, aiohttp
+from zaifer.zaifapi.async_method import AsyncAccount
+from zaifer.zaifapi.connection import NonceSequencer, fcntl
+
+
+class NonceSequencerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_strictly_increasing(self):
+        sequencer = NonceSequencer('key', self.directory.name)
+        nonces = [sequencer.generate() for _ in range(1000)]
+        self.assertTrue(all(a < b for a, b in zip(nonces, nonces[1:])))
+        self.assertIsInstance(nonces[0], Decimal)
+        self.assertAlmostEqual(float(nonces[-1]), time.time(), delta=5)
+
+    def test_unique_across_threads(self):
+        sequencer = NonceSequencer('key', self.directory.name)
+        nonces = []
+        lock = threading.Lock()
+
+        def generate():
+            values = [sequencer.generate() for _ in range(200)]
+            with lock:
+                nonces.extend(values)
+
+        threads = [threading.Thread(target=generate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(nonces)), 1600)
+
+    def test_shared_between_instances_of_same_key(self):
+        # 別プロセスのシーケンサーと同じく、採番ファイルを介して順序が保たれる
+        first = NonceSequencer('key', self.directory.name)
+        second = NonceSequencer('key', self.directory.name)
+        nonces = []
+        for _ in range(100):
+            nonces.append(first.generate())
+            nonces.append(second.generate())
+        self.assertTrue(all(a < b for a, b in zip(nonces, nonces[1:])))
+
+    def test_keys_are_independent(self):
+        first = NonceSequencer('key1', self.directory.name)
+        second = NonceSequencer('key2', self.directory.name)
+        first.resync()
+        self.assertLess(second.generate(), first.generate())
+
+    def test_resync_moves_ahead_of_clock(self):
+        sequencer = NonceSequencer('key', self.directory.name, resync_margin=60)
+        before = sequencer.generate()
+        sequencer.resync()
+        self.assertGreater(sequencer.generate() - before, 59)
+
+    def test_for_key_returns_shared_instance(self):
+        self.assertIs(NonceSequencer.for_key('test-key'), NonceSequencer.for_key('test-key'))
+
+
+@unittest.skipIf(aiohttp is None or fcntl is None, 'aiohttp and fcntl are required')
+class AsyncNonceTest(unittest.TestCase):
+
+    def test_waiting_for_file_lock_does_not_block_event_loop(self):
+        key = 'test-async-nonce-lock'
+        path = NonceSequencer.for_key(key)._path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # 他のプロセスが採番ファイルをロックしている状態を、0.5秒後に解除する
+        timer = threading.Timer(0.5, fcntl.flock, (fd, fcntl.LOCK_UN))
+        timer.start()
+
+        async def main():
+            url_config = server.url_config()
+            url_config.async_session_pool = AsyncSessionPool()
+            task = asyncio.ensure_future(AsyncAccount(key, 'secret', url_config).get_info2())
+            start = time.monotonic()
+            for _ in range(5):
+                await asyncio.sleep(0.01)
+            ticked = time.monotonic() - start
+            done_while_locked = task.done()
+            result = await task
+            await url_config.async_session_pool.close()
+            return ticked, done_while_locked, result
+
+        try:
+            with MockZaifServer() as server:
+                ticked, done_while_locked, result = asyncio.run(main())
+        finally:
+            timer.join()
+            os.close(fd)
+        self.assertLess(ticked, 0.4)
+        self.assertFalse(done_while_locked)
+        self.assertEqual(result['trade_count'], 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
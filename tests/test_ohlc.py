@@ -0,0 +1,95 @@
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.method import Chart
+from zaifer.zaifapi.ohlc import OhlcRangeFetcher
+
+
+class OhlcRangeFetcherTest(unittest.TestCase):
+
+    FROM_DATETIME = datetime(2020, 1, 1)
+
+    def test_split(self):
+        fetcher = OhlcRangeFetcher(None, candles_per_request=10)
+        to_datetime = self.FROM_DATETIME + timedelta(minutes=25)
+        chunks = fetcher.split('1', self.FROM_DATETIME, to_datetime)
+        self.assertEqual(chunks, [
+            (self.FROM_DATETIME, self.FROM_DATETIME + timedelta(minutes=10)),
+            (self.FROM_DATETIME + timedelta(minutes=10), self.FROM_DATETIME + timedelta(minutes=20)),
+            (self.FROM_DATETIME + timedelta(minutes=20), to_datetime)
+        ])
+        self.assertEqual(fetcher.split('D', to_datetime, self.FROM_DATETIME), [])
+
+    def test_invalid_period(self):
+        with self.assertRaises(ValueError):
+            OhlcRangeFetcher.period_seconds('2')
+
+    def test_merge_orders_and_removes_duplicates(self):
+        merged = OhlcRangeFetcher.merge([
+            {'ohlc_data': [{'time': 3, 'close': 1}, {'time': 4, 'close': 1}]},
+            {'ohlc_data': [{'time': 1, 'close': 2}, {'time': 3, 'close': 2}], 'extra': 'first'},
+            {'ohlc_data': None, 'extra': 'second'}
+        ])
+        self.assertEqual([candle['time'] for candle in merged['ohlc_data']], [1, 3, 4])
+        self.assertEqual(merged['extra'], 'first')
+
+    def test_fetch(self):
+        requests = []
+        lock = threading.Lock()
+
+        def get_ohlc(currency_pair, period, from_datetime, to_datetime):
+            with lock:
+                requests.append((from_datetime, to_datetime))
+            return {'ohlc_data': [{'time': int(from_datetime.timestamp())},
+                                  {'time': int(to_datetime.timestamp())}]}
+
+        fetcher = OhlcRangeFetcher(get_ohlc, max_workers=3, candles_per_request=10)
+        res = fetcher.fetch(CURRENCY_PAIR, '60', self.FROM_DATETIME, self.FROM_DATETIME + timedelta(hours=45))
+        self.assertEqual(len(requests), 5)
+        # 区間の境界のローソク足は1本にまとめられる
+        times = [candle['time'] for candle in res['ohlc_data']]
+        self.assertEqual(times, sorted(set(times)))
+        self.assertEqual(len(times), 6)
+
+    def test_fetch_retries_failed_chunk(self):
+        attempts = []
+
+        def get_ohlc(currency_pair, period, from_datetime, to_datetime):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError()
+            return {'ohlc_data': []}
+
+        fetcher = OhlcRangeFetcher(get_ohlc, retries=2, retry_delay=0.0)
+        self.assertEqual(fetcher.fetch(CURRENCY_PAIR, 'D', self.FROM_DATETIME,
+                                       self.FROM_DATETIME + timedelta(days=1)), {'ohlc_data': []})
+        self.assertEqual(len(attempts), 3)
+
+    def test_fetch_gives_up_after_retries(self):
+        def get_ohlc(currency_pair, period, from_datetime, to_datetime):
+            raise ConnectionError()
+
+        fetcher = OhlcRangeFetcher(get_ohlc, retries=1, retry_delay=0.0)
+        with self.assertRaises(ConnectionError):
+            fetcher.fetch(CURRENCY_PAIR, 'D', self.FROM_DATETIME, self.FROM_DATETIME + timedelta(days=1))
+
+
+class OhlcRangeIntegrationTest(unittest.TestCase):
+
+    def test_get_ohlc_range(self):
+        with MockZaifServer() as server:
+            chart = Chart(server.url_config())
+            to_datetime = datetime.now()
+            res = chart.get_ohlc_range(CURRENCY_PAIR, '60', to_datetime - timedelta(hours=1000), to_datetime,
+                                       candles_per_request=100)
+            self.assertEqual(server.statistics['requests'], 10)
+        # モックサーバーは区間に関係なく同じ1000本を返すため、重複が取り除かれる
+        times = [candle['time'] for candle in res['ohlc_data']]
+        self.assertEqual(len(times), 1000)
+        self.assertEqual(times, sorted(times))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.method import Market
+from zaifer.zaifapi.orderbook import DepthDiff, OrderBook
+
+DEPTH = {
+    'asks': [[103.0, 3.0], [101.0, 1.0], [102.0, 2.0]],
+    'bids': [[98.0, 2.0], [99.0, 1.0], [97.0, 3.0]]
+}
+
+
+class OrderBookTest(unittest.TestCase):
+
+    def test_best_and_levels(self):
+        book = OrderBook(DEPTH)
+        self.assertEqual(book.best_ask, (101.0, 1.0))
+        self.assertEqual(book.best_bid, (99.0, 1.0))
+        self.assertEqual(book.spread, 2.0)
+        self.assertEqual(book.mid_price, 100.0)
+        self.assertEqual(book.levels(OrderBook.ASKS), [(101.0, 1.0), (102.0, 2.0), (103.0, 3.0)])
+        self.assertEqual(book.levels(OrderBook.BIDS), [(99.0, 1.0), (98.0, 2.0), (97.0, 3.0)])
+
+    def test_empty(self):
+        book = OrderBook()
+        self.assertIsNone(book.best_ask)
+        self.assertIsNone(book.spread)
+        self.assertIsNone(book.mid_price)
+        self.assertEqual(book.cumulative_amount(OrderBook.BIDS), 0.0)
+        self.assertIsNone(book.vwap(OrderBook.ASKS, 1.0))
+
+    def test_cumulative_amount(self):
+        book = OrderBook(DEPTH)
+        self.assertEqual(book.cumulative_amount(OrderBook.ASKS), 6.0)
+        self.assertEqual(book.cumulative_amount(OrderBook.ASKS, price=102.0), 3.0)
+        self.assertEqual(book.cumulative_amount(OrderBook.ASKS, price=100.0), 0.0)
+        self.assertEqual(book.cumulative_amount(OrderBook.BIDS, price=98.0), 3.0)
+        self.assertEqual(book.cumulative_amount(OrderBook.BIDS, depth=1), 1.0)
+        self.assertEqual(book.cumulative_amount(OrderBook.ASKS, price=103.0, depth=2), 3.0)
+
+    def test_vwap(self):
+        book = OrderBook(DEPTH)
+        self.assertEqual(book.vwap(OrderBook.ASKS, 1.0), 101.0)
+        self.assertAlmostEqual(book.vwap(OrderBook.ASKS, 2.0), (101.0 + 102.0) / 2)
+        self.assertAlmostEqual(book.vwap(OrderBook.BIDS, 3.0), (99.0 + 98.0 * 2) / 3)
+        self.assertIsNone(book.vwap(OrderBook.ASKS, 7.0))
+        self.assertIsNone(book.vwap(OrderBook.ASKS, 0.0))
+
+    def test_update_notifies_diffs(self):
+        book = OrderBook(DEPTH)
+        received = []
+        book.subscribe(received.append)
+        diffs = book.update({
+            'asks': [[101.0, 0.5], [102.0, 2.0], [103.0, 3.0], [104.0, 4.0]],
+            'bids': [[98.0, 2.0], [97.0, 3.0]]
+        })
+        self.assertEqual(sorted(diffs), sorted([
+            DepthDiff(OrderBook.ASKS, 101.0, 0.5, 1.0),
+            DepthDiff(OrderBook.ASKS, 104.0, 4.0, 0.0),
+            DepthDiff(OrderBook.BIDS, 99.0, 0.0, 1.0)
+        ]))
+        self.assertEqual(received, [diffs])
+        self.assertEqual(book.best_bid, (98.0, 2.0))
+
+    def test_unchanged_update_does_not_notify(self):
+        book = OrderBook(DEPTH)
+        received = []
+        book.subscribe(received.append)
+        self.assertEqual(book.update(DEPTH), [])
+        book.unsubscribe(received.append)
+        book.update({'asks': [], 'bids': []})
+        self.assertEqual(received, [])
+
+
+class OrderBookIntegrationTest(unittest.TestCase):
+
+    def test_from_market_depth(self):
+        with MockZaifServer() as server:
+            depth = Market(server.url_config()).get_depth(CURRENCY_PAIR)
+        book = OrderBook(depth)
+        self.assertEqual(book.best_ask, tuple(min(depth['asks'])))
+        self.assertEqual(book.best_bid, tuple(max(depth['bids'])))
+        self.assertAlmostEqual(book.cumulative_amount(OrderBook.ASKS), sum(amount for _, amount in depth['asks']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import importlib
+import subprocess
+import sys
+import unittest
+
+import zaifer
+
+
+class LazyAttributeTest(unittest.TestCase):
+
+    def test_import_does_not_load_dependencies(self):
+        code = ('import sys, zaifer; '
+                'print(sorted(name for name in ("requests", "zaifer.zaifapi.method") if name in sys.modules))')
+        output = subprocess.check_output([sys.executable, '-c', code], universal_newlines=True)
+        self.assertEqual(output.strip(), '[]')
+
+    def test_attributes_resolve_to_modules(self):
+        for name, module_name in sorted(zaifer._LAZY_ATTRIBUTES.items()):
+            with self.subTest(name=name):
+                try:
+                    module = importlib.import_module('zaifer.zaifapi.' + module_name)
+                except ImportError:
+                    # 任意の依存パッケージが導入されていない
+                    continue
+                self.assertIs(getattr(zaifer, name), getattr(module, name))
+                self.assertIn(name, vars(zaifer))
+
+    def test_all_is_lazy(self):
+        self.assertEqual(set(zaifer.__all__) - set(zaifer._LAZY_ATTRIBUTES), set())
+        self.assertTrue(set(zaifer.__all__) <= set(dir(zaifer)))
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            zaifer.UnknownClient
+        self.assertFalse(hasattr(zaifer, 'zaifapi_unknown'))
+
+
+if __name__ == '__main__':
+    unittest.main()
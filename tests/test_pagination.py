@@ -0,0 +1,79 @@
+import unittest
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.method import MarginTrade, Trade
+from zaifer.zaifapi.pagination import HistoryIterator
+
+
+def create_fetch(size: int, requests: list):
+    '''
+    IDが1〜sizeの履歴をcount・from_id・end_id・orderで絞り込んで返す関数を作成します。
+    '''
+    def fetch(count, from_id, end_id, order):
+        requests.append((count, from_id, end_id, order))
+        ids = range(from_id or 1, min(end_id or size, size) + 1)
+        ids = list(ids) if order == 'ASC' else list(reversed(ids))
+        return {str(record_id): {'id': record_id} for record_id in ids[:count]}
+    return fetch
+
+
+class HistoryIteratorTest(unittest.TestCase):
+
+    def test_ascending(self):
+        requests = []
+        iterator = HistoryIterator(create_fetch(25, requests), page_size=10, prefetch=False)
+        self.assertEqual([record_id for record_id, _ in iterator], list(range(1, 26)))
+        self.assertEqual([request[1] for request in requests], [None, 11, 21])
+
+    def test_descending(self):
+        requests = []
+        iterator = HistoryIterator(create_fetch(25, requests), page_size=10, order='desc', prefetch=False)
+        self.assertEqual([record_id for record_id, _ in iterator], list(range(25, 0, -1)))
+        self.assertEqual([request[2] for request in requests], [None, 15, 5])
+
+    def test_prefetch_returns_same_records(self):
+        requests = []
+        with HistoryIterator(create_fetch(95, requests), page_size=10, prefetch=True) as iterator:
+            records = list(iterator)
+        self.assertEqual([record_id for record_id, _ in records], list(range(1, 96)))
+        self.assertEqual(len(requests), 10)
+
+    def test_resume_from_cursor(self):
+        iterator = HistoryIterator(create_fetch(30, []), page_size=10, prefetch=False)
+        first = [next(iterator)[0] for _ in range(12)]
+        resumed = HistoryIterator(create_fetch(30, []), page_size=10, from_id=iterator.cursor, prefetch=False)
+        self.assertEqual(first + [record_id for record_id, _ in resumed], list(range(1, 31)))
+
+    def test_empty(self):
+        self.assertEqual(list(HistoryIterator(lambda *args: {}, prefetch=False)), [])
+        self.assertEqual(list(HistoryIterator(lambda *args: [], prefetch=True)), [])
+
+    def test_invalid_order(self):
+        with self.assertRaises(ValueError):
+            HistoryIterator(lambda *args: {}, order='random')
+
+    def test_close_stops_iteration(self):
+        iterator = HistoryIterator(create_fetch(100, []), page_size=10)
+        next(iterator)
+        iterator.close()
+        self.assertEqual(list(iterator), [])
+
+
+class HistoryIteratorIntegrationTest(unittest.TestCase):
+
+    def test_iter_trade_history(self):
+        with MockZaifServer(history_size=2500) as server:
+            trade = Trade('test-key', 'secret', server.url_config())
+            ids = [record_id for record_id, _ in trade.iter_trade_history(CURRENCY_PAIR, page_size=1000)]
+        self.assertEqual(ids, list(range(1, 2501)))
+
+    def test_iter_positions_descending(self):
+        with MockZaifServer(history_size=1500) as server:
+            margin_trade = MarginTrade('test-key', 'secret', server.url_config())
+            ids = [record_id for record_id, _ in margin_trade.iter_positions(
+                'margin', order='DESC', page_size=400)]
+        self.assertEqual(ids, list(range(1500, 0, -1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
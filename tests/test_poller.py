@@ -0,0 +1,95 @@
+import threading
+import time
+import unittest
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.poller import MarketPoller, PollEvent
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class MarketPollerTest(unittest.TestCase):
+
+    def test_only_changes_are_reported(self):
+        events = []
+        with MockZaifServer() as server:
+            poller = MarketPoller(server.url_config(), min_interval=0.02, max_interval=0.05)
+            poller.subscribe('ticker', CURRENCY_PAIR, events.append)
+            poller.subscribe('depth', CURRENCY_PAIR, events.append)
+            poller.subscribe('ticker', CURRENCY_PAIR, events.append, group_id=1)
+            with poller:
+                self.assertTrue(wait_until(lambda: all(s['polls'] >= 5 for s in poller.statistics.values())))
+        # レスポンスは変化しないため、最初の取得のみ通知する
+        self.assertEqual({(event.endpoint, event.group_id) for event in events},
+                         {('depth', None), ('ticker', None), ('ticker', 1)})
+        self.assertEqual(len(events), 3)
+        self.assertIsInstance(events[0], PollEvent)
+        self.assertTrue(all(s['changes'] == 1 and s['interval'] == 0.05 for s in poller.statistics.values()))
+
+    def test_listener_exception_is_counted(self):
+        received = []
+
+        def failing_listener(event):
+            raise RuntimeError('listener failed')
+
+        with MockZaifServer() as server:
+            poller = MarketPoller(server.url_config(), min_interval=0.02, max_interval=0.05)
+            poller.subscribe('ticker', CURRENCY_PAIR, failing_listener)
+            poller.subscribe('ticker', CURRENCY_PAIR, received.append)
+            key = ('ticker', CURRENCY_PAIR, None)
+            with poller, self.assertLogs('zaifer.zaifapi.poller') as logs:
+                # 例外が発生しても、他の購読者への通知と取得は続ける
+                self.assertTrue(wait_until(lambda: poller.statistics[key]['polls'] >= 3))
+        statistics = poller.statistics[key]
+        self.assertEqual((statistics['listener_errors'], statistics['errors']), (1, 0))
+        self.assertEqual(len(received), 1)
+        self.assertIn('RuntimeError: listener failed', logs.output[0])
+
+    def test_error_listener_exception_is_counted(self):
+        errors = []
+        lock = threading.Lock()
+
+        def error_listener(endpoint, currency_pair, group_id, error):
+            with lock:
+                errors.append(error)
+            raise RuntimeError('error listener failed')
+
+        with MockZaifServer(error_rate=1.0) as server:
+            poller = MarketPoller(server.url_config(), min_interval=0.02, max_interval=0.05, error_listener=error_listener)
+            poller.subscribe('depth', CURRENCY_PAIR, lambda event: None)
+            key = ('depth', CURRENCY_PAIR, None)
+            with poller, self.assertLogs('zaifer.zaifapi.poller'):
+                self.assertTrue(wait_until(lambda: poller.statistics[key]['listener_errors'] >= 2))
+        statistics = poller.statistics[key]
+        self.assertEqual(statistics['errors'], statistics['listener_errors'])
+        self.assertEqual(len(errors), statistics['errors'])
+
+
+    def test_stop_honours_timeout(self):
+        with MockZaifServer(latency=1.0) as server:
+            poller = MarketPoller(server.url_config(), min_interval=0.01, max_interval=0.05)
+            poller.subscribe('ticker', CURRENCY_PAIR, lambda event: None)
+            poller.start()
+            self.assertTrue(wait_until(lambda: server.statistics['requests'] >= 1))
+            started = time.monotonic()
+            poller.stop(timeout=0.1)
+            # 応答を待たずに戻る
+            self.assertLess(time.monotonic() - started, 0.5)
+            self.assertEqual(poller.statistics[('ticker', CURRENCY_PAIR, None)]['polls'], 0)
+
+            poller.start()
+            self.assertTrue(wait_until(lambda: server.statistics['requests'] >= 2))
+            poller.stop()
+            # timeoutを指定しない場合は実行中の取得の終了を待つ
+            self.assertGreaterEqual(poller.statistics[('ticker', CURRENCY_PAIR, None)]['polls'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
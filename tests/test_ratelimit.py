@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from zaifer.zaifapi.ratelimit import RateLimiter, TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(rate=2.0, capacity=3.0)
+        now = time.monotonic()
+        self.assertEqual([bucket.reserve(now) for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(now), 0.5)
+        self.assertEqual(bucket.reserve(now + 0.5), 0.0)
+
+    def test_delay_does_not_consume(self):
+        bucket = TokenBucket(rate=1.0, capacity=1.0)
+        now = time.monotonic()
+        self.assertEqual(bucket.delay(now), 0.0)
+        self.assertEqual(bucket.delay(now), 0.0)
+        self.assertEqual(bucket.reserve(now), 0.0)
+        self.assertAlmostEqual(bucket.delay(now), 1.0)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_unknown_family_is_not_limited(self):
+        self.assertEqual(RateLimiter().acquire('unknown'), 0.0)
+
+    def test_limits_rate(self):
+        limiter = RateLimiter({'public': (20.0, 1.0)})
+        started = time.monotonic()
+        for _ in range(5):
+            limiter.acquire('public')
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+        statistics = limiter.statistics['public']
+        self.assertEqual(statistics['requests'], 5)
+        self.assertEqual(statistics['queue_depth'], 0)
+
+    def test_priority_of(self):
+        self.assertEqual(RateLimiter.priority_of({'method': 'cancel_order'}), RateLimiter.PRIORITY_CANCEL)
+        self.assertEqual(RateLimiter.priority_of({'method': 'trade'}), RateLimiter.PRIORITY_ORDER)
+        self.assertEqual(RateLimiter.priority_of({'method': 'get_info'}), RateLimiter.PRIORITY_READ)
+        self.assertEqual(RateLimiter.priority_of(None), RateLimiter.PRIORITY_READ)
+
+    def test_cancel_overtakes_queued_reads(self):
+        limiter = RateLimiter({'trade': (10.0, 1.0)})
+        limiter.acquire('trade')
+        order = []
+        lock = threading.Lock()
+
+        def acquire(name, priority):
+            limiter.acquire('trade', priority)
+            with lock:
+                order.append(name)
+
+        threads = [threading.Thread(target=acquire, args=('read{}'.format(i), RateLimiter.PRIORITY_READ))
+                   for i in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.02)
+        cancel = threading.Thread(target=acquire, args=('cancel', RateLimiter.PRIORITY_CANCEL))
+        cancel.start()
+        for thread in threads + [cancel]:
+            thread.join()
+        self.assertEqual(order[0], 'cancel')
+
+
+class AsyncRateLimiterTest(unittest.TestCase):
+
+    def test_limits_rate(self):
+        limiter = RateLimiter({'public': (50.0, 1.0)})
+
+        async def main():
+            started = time.monotonic()
+            await asyncio.gather(*[limiter.acquire_async('public') for _ in range(10)])
+            return time.monotonic() - started
+
+        self.assertGreaterEqual(asyncio.run(main()), 0.17)
+        self.assertEqual(limiter.statistics['public']['requests'], 10)
+
+    def test_waiters_do_not_occupy_executor(self):
+        limiter = RateLimiter({'public': (50.0, 1.0)})
+
+        async def main():
+            loop = asyncio.get_event_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+            waiters = asyncio.gather(*[limiter.acquire_async('public') for _ in range(20)])
+            await asyncio.sleep(0.01)
+            started = time.monotonic()
+            await loop.run_in_executor(None, lambda: None)
+            elapsed = time.monotonic() - started
+            await waiters
+            return elapsed
+
+        self.assertLess(asyncio.run(main()), 0.1)
+
+    def test_priority_is_shared_with_threads(self):
+        limiter = RateLimiter({'trade': (10.0, 1.0)})
+        limiter.acquire('trade')
+        order = []
+
+        async def acquire(name, priority, delay):
+            await asyncio.sleep(delay)
+            await limiter.acquire_async('trade', priority)
+            order.append(name)
+
+        async def main():
+            await asyncio.gather(acquire('read', RateLimiter.PRIORITY_READ, 0.0),
+                                 acquire('order', RateLimiter.PRIORITY_ORDER, 0.01),
+                                 acquire('cancel', RateLimiter.PRIORITY_CANCEL, 0.02))
+
+        asyncio.run(main())
+        self.assertEqual(order, ['cancel', 'order', 'read'])
+
+    def test_cancelled_waiter_leaves_queue(self):
+        limiter = RateLimiter({'trade': (1.0, 1.0)})
+        limiter.acquire('trade')
+
+        async def main():
+            task = asyncio.ensure_future(limiter.acquire_async('trade'))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(main())
+        self.assertEqual(limiter.statistics['trade']['queue_depth'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
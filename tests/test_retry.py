@@ -0,0 +1,97 @@
+import unittest
+from decimal import Decimal
+
+import requests
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.exception import (HttpStatusException, InvalidAPIKeyException,
+                                      NonceNotIcreasedException, TimeoutException,
+                                      TradeTemporarilyUnavailableException)
+from zaifer.zaifapi.method import Market, Trade
+from zaifer.zaifapi.retry import RetryPolicy
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_classify(self):
+        cases = [
+            (NonceNotIcreasedException('nonce not incremented'), RetryPolicy.REASON_NONCE),
+            (TradeTemporarilyUnavailableException('x'), RetryPolicy.REASON_TRADE_UNAVAILABLE),
+            (TimeoutException('time out'), RetryPolicy.REASON_TIMEOUT),
+            (HttpStatusException(429), RetryPolicy.REASON_THROTTLED),
+            (HttpStatusException(503), RetryPolicy.REASON_SERVER_ERROR),
+            (HttpStatusException(404), None),
+            (requests.exceptions.ConnectTimeout(), RetryPolicy.REASON_CONNECT),
+            (requests.exceptions.ReadTimeout(), RetryPolicy.REASON_TIMEOUT),
+            (requests.exceptions.ConnectionError(), RetryPolicy.REASON_CONNECTION),
+            (ConnectionResetError(), RetryPolicy.REASON_CONNECTION),
+            (InvalidAPIKeyException('no data found for the key'), None),
+            (ValueError(), None)
+        ]
+        for error, reason in cases:
+            self.assertEqual(RetryPolicy.classify(error), reason, repr(error))
+
+    def test_backoff_is_capped(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=0.1, max_delay=0.3)
+        for attempt in range(9):
+            delay = policy.next_delay(HttpStatusException(500), 'get_info', attempt)
+            self.assertGreaterEqual(delay, 0.0)
+            self.assertLessEqual(delay, min(0.3, 0.1 * 2 ** attempt))
+
+    def test_gives_up_after_max_attempts(self):
+        policy = RetryPolicy(max_attempts=3)
+        error = HttpStatusException(500)
+        self.assertIsNotNone(policy.next_delay(error, None, 0))
+        self.assertIsNotNone(policy.next_delay(error, None, 1))
+        self.assertIsNone(policy.next_delay(error, None, 2))
+        self.assertEqual(policy.statistics, {'retries': {'server_error': 2}, 'give_ups': {'server_error': 1}})
+
+    def test_non_idempotent_methods_retry_only_safe_reasons(self):
+        policy = RetryPolicy()
+        self.assertIsNone(policy.next_delay(HttpStatusException(500), 'trade', 0))
+        self.assertIsNone(policy.next_delay(TimeoutException('time out'), 'withdraw', 0))
+        self.assertIsNotNone(policy.next_delay(HttpStatusException(429), 'trade', 0))
+        self.assertIsNotNone(policy.next_delay(NonceNotIcreasedException('x'), 'trade', 0))
+        self.assertIsNotNone(policy.next_delay(HttpStatusException(500), 'cancel_order', 0))
+
+    def test_reasons_filter(self):
+        policy = RetryPolicy.nonce_only()
+        self.assertIsNone(policy.next_delay(HttpStatusException(500), None, 0))
+        self.assertEqual(policy.next_delay(NonceNotIcreasedException('x'), None, 0), 0.0)
+        self.assertIsNone(policy.next_delay(NonceNotIcreasedException('x'), None, 1))
+
+
+class RetryIntegrationTest(unittest.TestCase):
+
+    def test_public_calls_survive_errors(self):
+        with MockZaifServer(error_rate=0.3, error_kinds=('server_error', 'throttled')) as server:
+            url_config = server.url_config()
+            url_config.single_flight = None
+            url_config.retry_policy = RetryPolicy(max_attempts=20, base_delay=0.0, max_delay=0.0)
+            market = Market(url_config)
+            for _ in range(20):
+                self.assertIn('last', market.get_ticker(CURRENCY_PAIR))
+            self.assertGreater(server.statistics['errors'], 0)
+
+    def test_order_is_not_resent_after_server_error(self):
+        with MockZaifServer(error_rate=1.0, error_kinds=('server_error',)) as server:
+            url_config = server.url_config()
+            url_config.retry_policy = RetryPolicy(max_attempts=5, base_delay=0.0, max_delay=0.0)
+            trade = Trade('test-key', 'secret', url_config)
+            with self.assertRaises(HttpStatusException):
+                trade.open_order(CURRENCY_PAIR, 'bid', Decimal('4000000'), Decimal('0.01'))
+            self.assertEqual(server.statistics['requests'], 1)
+
+    def test_unavailable_trade_is_retried(self):
+        with MockZaifServer(error_rate=0.5, error_kinds=('trade_unavailable',), seed=3) as server:
+            url_config = server.url_config()
+            url_config.retry_policy = RetryPolicy(max_attempts=20, base_delay=0.0, max_delay=0.0)
+            trade = Trade('test-key', 'secret', url_config)
+            for _ in range(5):
+                self.assertIn('order_id', trade.open_order(CURRENCY_PAIR, 'bid', Decimal('4000000'),
+                                                           Decimal('0.01')))
+            self.assertGreater(server.statistics['errors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from zaifer.zaifapi.singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        single_flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+
+        def func():
+            calls.append(1)
+            started.set()
+            time.sleep(0.1)
+            return {'value': 1}
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            first = executor.submit(single_flight.do, 'key', func)
+            started.wait(1.0)
+            others = [executor.submit(single_flight.do, 'key', func) for _ in range(4)]
+            results = [first.result()] + [future.result() for future in others]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {'value': 1} for result in results))
+        self.assertEqual(single_flight.statistics, {'calls': 1, 'shared': 4, 'in_flight': 0})
+
+    def test_error_is_shared(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+
+        def func():
+            started.set()
+            time.sleep(0.05)
+            raise ValueError('failed')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(single_flight.do, 'key', func)
+            started.wait(1.0)
+            second = executor.submit(single_flight.do, 'key', func)
+            for future in (first, second):
+                with self.assertRaises(ValueError):
+                    future.result()
+
+    def test_callers_receive_independent_results(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+
+        def func():
+            started.set()
+            time.sleep(0.05)
+            return {'asks': [[1.0, 2.0]]}
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(single_flight.do, 'key', func)
+            started.wait(1.0)
+            second = executor.submit(single_flight.do, 'key', func)
+            first_result, second_result = first.result(), second.result()
+        first_result['asks'][0][0] = 9.0
+        self.assertEqual(second_result, {'asks': [[1.0, 2.0]]})
+
+    def test_sequential_calls_are_not_shared(self):
+        single_flight = SingleFlight()
+        self.assertEqual(single_flight.do('key', lambda: 1), 1)
+        self.assertEqual(single_flight.do('key', lambda: 2), 2)
+        self.assertEqual(single_flight.statistics['calls'], 2)
+
+
+class AsyncSingleFlightTest(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def main():
+            return await asyncio.gather(*[single_flight.do_async('key', func) for _ in range(5)])
+
+        self.assertEqual(asyncio.run(main()), ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(single_flight.statistics, {'calls': 1, 'shared': 4, 'in_flight': 0})
+
+    def test_callers_receive_independent_results(self):
+        single_flight = SingleFlight()
+
+        async def func():
+            await asyncio.sleep(0.01)
+            return {'bids': [[1.0, 2.0]]}
+
+        async def main():
+            return await asyncio.gather(*[single_flight.do_async('key', func) for _ in range(3)])
+
+        results = asyncio.run(main())
+        results[0]['bids'].clear()
+        results[1]['bids'][0][1] = 0.0
+        self.assertEqual(results[2], {'bids': [[1.0, 2.0]]})
+
+    def test_cancelling_first_caller_does_not_cancel_others(self):
+        single_flight = SingleFlight()
+
+        async def func():
+            await asyncio.sleep(0.05)
+            return 'value'
+
+        async def main():
+            first = asyncio.ensure_future(single_flight.do_async('key', func))
+            await asyncio.sleep(0)
+            others = [asyncio.ensure_future(single_flight.do_async('key', func)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            first.cancel()
+            results = await asyncio.gather(*others)
+            return first.cancelled(), results
+
+        cancelled, results = asyncio.run(main())
+        self.assertTrue(cancelled)
+        self.assertEqual(results, ['value'] * 3)
+
+    def test_cancelling_all_callers_cancels_call(self):
+        single_flight = SingleFlight()
+        finished = []
+
+        async def func():
+            await asyncio.sleep(0.05)
+            finished.append(1)
+
+        async def main():
+            tasks = [asyncio.ensure_future(single_flight.do_async('key', func)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await asyncio.sleep(0.1)
+            # 新しい呼び出しはキャンセルされた要求に合流しない
+            return await single_flight.do_async('key', lambda: asyncio.sleep(0, 'again'))
+
+        self.assertEqual(asyncio.run(main()), 'again')
+        self.assertEqual(finished, [])
+        self.assertEqual(single_flight.statistics['in_flight'], 0)
+
+    def test_error_is_shared(self):
+        single_flight = SingleFlight()
+
+        async def func():
+            await asyncio.sleep(0.01)
+            raise ValueError('failed')
+
+        async def main():
+            return await asyncio.gather(*[single_flight.do_async('key', func) for _ in range(3)],
+                                        return_exceptions=True)
+
+        results = asyncio.run(main())
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+        self.assertEqual(single_flight.statistics['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
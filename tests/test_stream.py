@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+import unittest
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi.connection import UrlConfigs
+from zaifer.zaifapi.stream import StreamDecoder
+
+if websockets is not None:
+    from zaifer.zaifapi.stream import AsyncStreamClient, StreamClient, StreamReplayServer
+
+
+def create_message(tids: list, price: float = 100.0) -> dict:
+    '''
+    指定した取引IDの約定を含むストリーミングAPIのメッセージを作成します。
+    '''
+    return {
+        'currency_pair': CURRENCY_PAIR,
+        'asks': [[price + 1, 0.1]],
+        'bids': [[price - 1, 0.2]],
+        'trades': [{'currenty_pair': CURRENCY_PAIR, 'tid': tid, 'price': price, 'amount': 0.01,
+                    'trade_type': 'bid', 'date': 1500000000 + tid} for tid in tids],
+        'last_price': {'action': 'bid', 'price': price},
+        'timestamp': '2020-01-01 00:00:00.000000'
+    }
+
+
+def create_url_config(url: str) -> UrlConfigs:
+    url_config = UrlConfigs()
+    url_config.stream_api_url = url
+    return url_config
+
+
+class StreamDecoderTest(unittest.TestCase):
+
+    def test_decode(self):
+        message = StreamDecoder().decode(create_message([2, 1]))
+        self.assertEqual(message.currency_pair, CURRENCY_PAIR)
+        self.assertEqual(message.depth, {'asks': [[101.0, 0.1]], 'bids': [[99.0, 0.2]]})
+        self.assertEqual(message.last_price, {'last_price': 100.0})
+        self.assertEqual(message.trades[0]['currency_pair'], CURRENCY_PAIR)
+        self.assertNotIn('currenty_pair', message.trades[0])
+
+    def test_new_trades(self):
+        decoder = StreamDecoder()
+        self.assertEqual([trade['tid'] for trade in decoder.decode(create_message([2, 1])).new_trades], [2, 1])
+        self.assertEqual([trade['tid'] for trade in decoder.decode(create_message([4, 3, 2])).new_trades], [4, 3])
+        self.assertEqual(decoder.decode(create_message([4, 3])).new_trades, [])
+        decoder.reset(CURRENCY_PAIR)
+        self.assertEqual(len(decoder.decode(create_message([4, 3])).new_trades), 2)
+
+    def test_decode_raw(self):
+        message = StreamDecoder().decode('{"currency_pair": "btc_jpy", "trades": null}')
+        self.assertEqual(message.depth, {'asks': [], 'bids': []})
+        self.assertEqual(message.trades, [])
+
+
+@unittest.skipIf(websockets is None, 'websockets is not installed')
+class AsyncStreamClientTest(unittest.TestCase):
+
+    MESSAGES = [create_message([i]) for i in range(1, 6)]
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_receive(self):
+        async def main(url):
+            client = AsyncStreamClient(CURRENCY_PAIR, create_url_config(url))
+            messages = []
+            async with client:
+                async for message in client:
+                    messages.append(message)
+                    if len(messages) == 3:
+                        break
+            return messages, client.statistics[CURRENCY_PAIR]
+
+        with StreamReplayServer(self.MESSAGES, interval=0.01) as server:
+            messages, statistics = asyncio.run(main(server.url))
+        self.assertEqual([message.trades[0]['tid'] for message in messages], [1, 2, 3])
+        self.assertEqual(statistics['connections'], 1)
+
+    def test_failing_listener_does_not_stop_others(self):
+        async def main(url):
+            client = AsyncStreamClient(CURRENCY_PAIR, create_url_config(url))
+            received = []
+
+            def failing_listener(message):
+                raise ValueError('failed')
+
+            client.subscribe(failing_listener)
+            client.subscribe(received.append)
+            async with client:
+                while len(received) < 3:
+                    await asyncio.sleep(0.01)
+            return received, client.statistics[CURRENCY_PAIR]
+
+        with StreamReplayServer(self.MESSAGES, interval=0.01) as server:
+            received, statistics = asyncio.run(asyncio.wait_for(main(server.url), 5.0))
+        self.assertGreaterEqual(len(received), 3)
+        self.assertGreaterEqual(statistics['listener_errors'], 3)
+        self.assertEqual(statistics['connections'], 1)
+
+    def test_reconnect_after_disconnect(self):
+        async def main(server):
+            client = AsyncStreamClient(CURRENCY_PAIR, create_url_config(server.url),
+                                       reconnect_delay=0.01, max_reconnect_delay=0.01)
+            async with client:
+                while client.statistics[CURRENCY_PAIR]['messages'] == 0:
+                    await asyncio.sleep(0.01)
+                await asyncio.get_event_loop().run_in_executor(None, server.drop_connections)
+                while client.statistics[CURRENCY_PAIR]['connections'] < 2:
+                    await asyncio.sleep(0.01)
+            return client.statistics[CURRENCY_PAIR]
+
+        with StreamReplayServer(self.MESSAGES, interval=0.01) as server:
+            statistics = asyncio.run(asyncio.wait_for(main(server), 5.0))
+        self.assertEqual(statistics['connections'], 2)
+
+    def test_reconnect_after_handshake_failure(self):
+        async def main(url):
+            client = AsyncStreamClient(CURRENCY_PAIR, create_url_config(url),
+                                       reconnect_delay=0.01, max_reconnect_delay=0.01)
+            async with client:
+                while client.statistics[CURRENCY_PAIR]['errors'] < 3:
+                    await asyncio.sleep(0.01)
+                # 受信用のタスクは終了せず、再接続を続ける
+                running = not any(task.done() for task in client._tasks)
+            return running
+
+        # WebSocketに対応しないHTTPサーバーへの接続はハンドシェイクで失敗する
+        with MockZaifServer() as server:
+            running = asyncio.run(asyncio.wait_for(main(server.base_url.replace('http', 'ws') + '/stream'), 5.0))
+        self.assertTrue(running)
+
+
+@unittest.skipIf(websockets is None, 'websockets is not installed')
+class StreamClientTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self.addCleanup(logging.disable, logging.NOTSET)
+
+    def test_failing_listener_does_not_stop_queue(self):
+        def failing_listener(message):
+            raise ValueError('failed')
+
+        messages = [create_message([i]) for i in range(1, 6)]
+        with StreamReplayServer(messages, interval=0.01) as server:
+            client = StreamClient(CURRENCY_PAIR, create_url_config(server.url))
+            client.subscribe(failing_listener)
+            with client:
+                tids = [client.get(timeout=5.0).trades[0]['tid'] for _ in range(3)]
+                statistics = client.statistics[CURRENCY_PAIR]
+        self.assertEqual(tids, [1, 2, 3])
+        self.assertGreaterEqual(statistics['listener_errors'], 3)
+
+
+    def test_full_queue_counts_dropped_messages(self):
+        messages = [create_message([i]) for i in range(1, 9)]
+        with StreamReplayServer(messages, interval=0.01, repeat=False) as server:
+            client = StreamClient(CURRENCY_PAIR, create_url_config(server.url), max_queue_size=2)
+            client.start()
+            try:
+                deadline = time.monotonic() + 5.0
+                while client.statistics[CURRENCY_PAIR]['dropped'] < 6 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                # 古いメッセージを破棄し、最新の2件を残す
+                tids = [client.get(timeout=5.0).trades[0]['tid'] for _ in range(2)]
+                statistics = client.statistics[CURRENCY_PAIR]
+            finally:
+                client.stop()
+        self.assertEqual(tids, [7, 8])
+        self.assertEqual((statistics['messages'], statistics['dropped']), (8, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
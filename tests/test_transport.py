@@ -0,0 +1,209 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from benchmarks.mock_server import CURRENCY_PAIR, MockZaifServer
+from zaifer.zaifapi import transport as transport_module
+from zaifer.zaifapi.connection import SessionPool, UrlConfigs
+from zaifer.zaifapi.exception import ReplayMissException
+from zaifer.zaifapi.method import Market, Trade
+from zaifer.zaifapi.transport import (Http2Transport, RecordingTransport, ReplayTransport, TransportLog,
+                                      TransportResponse, request_key)
+
+if aiohttp is not None:
+    from zaifer.zaifapi.async_method import AsyncMarket, AsyncTrade
+
+
+class TransportLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.path = os.path.join(self._directory.name, 'test.log')
+
+    def test_append_and_read(self):
+        log = TransportLog(self.path)
+        for i in range(3):
+            log.append(0.1, 'GET /{}?'.format(i), 200, b'{}', timestamp=100.0 + i)
+        log.close()
+        records = list(TransportLog(self.path).read())
+        self.assertEqual([record.key for record in records], ['GET /0?', 'GET /1?', 'GET /2?'])
+        self.assertEqual(records[0].content, b'{}')
+        self.assertEqual([record.key for record in TransportLog(self.path).read(since=101.0)],
+                         ['GET /1?', 'GET /2?'])
+
+    def test_offset_of_uses_index(self):
+        log = TransportLog(self.path, index_interval=10)
+        for i in range(100):
+            log.append(0.0, 'GET /{}?'.format(i), 200, b'', timestamp=float(i))
+        log.close()
+        offset = log.offset_of(55.0)
+        self.assertGreater(offset, len(TransportLog.MAGIC))
+        records = list(log.read(offset, 55.0))
+        self.assertEqual(records[0].timestamp, 55.0)
+        self.assertEqual(len(records), 45)
+
+    def test_truncated_record_is_ignored(self):
+        log = TransportLog(self.path)
+        log.append(0.0, 'GET /?', 200, b'0123456789')
+        log.close()
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        self.assertEqual(list(log.read()), [])
+
+    def test_not_a_log(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'garbage')
+        with self.assertRaises(ValueError):
+            list(TransportLog(self.path).read())
+
+    def test_request_key_ignores_nonce_and_order(self):
+        self.assertEqual(request_key('POST', '/tapi', data='nonce=1&method=get_info&b=2'),
+                         request_key('POST', '/tapi', data='b=2&method=get_info&nonce=2'))
+        self.assertEqual(request_key('GET', '/history', params={'to': 2, 'from': 1}), 'GET /history?from=1&to=2')
+
+
+class RecordReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self._directory.cleanup)
+        self.path = os.path.join(self._directory.name, 'market.log')
+
+    def record(self):
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            url_config.single_flight = None
+            with RecordingTransport(self.path) as transport:
+                url_config.transport = transport
+                market = Market(url_config)
+                depth = market.get_depth(CURRENCY_PAIR)
+                ticker = market.get_ticker(CURRENCY_PAIR)
+                order = Trade('test-key', 'secret', url_config).get_active_orders()
+            replay_url_config = server.url_config()
+        replay_url_config.single_flight = None
+        return replay_url_config, depth, ticker, order
+
+    def test_replay(self):
+        url_config, depth, ticker, orders = self.record()
+        with ReplayTransport(self.path) as transport:
+            url_config.transport = transport
+            market = Market(url_config)
+            # 記録と異なる順序で要求しても、要求ごとに記録した順に返す
+            self.assertEqual(market.get_ticker(CURRENCY_PAIR), ticker)
+            self.assertEqual(market.get_depth(CURRENCY_PAIR), depth)
+            self.assertEqual(Trade('test-key', 'secret', url_config).get_active_orders(), orders)
+            with self.assertRaises(ReplayMissException):
+                market.get_ticker(CURRENCY_PAIR)
+            transport.seek()
+            self.assertEqual(market.get_ticker(CURRENCY_PAIR), ticker)
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            ReplayTransport(self.path, timing='fast')
+        with self.assertRaises(ValueError):
+            ReplayTransport(self.path, speed=0)
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_async_replay_uses_transport(self):
+        url_config, depth, ticker, orders = self.record()
+
+        async def main():
+            market = AsyncMarket(url_config)
+            return (await market.get_depth(CURRENCY_PAIR), await market.get_ticker(CURRENCY_PAIR),
+                    await AsyncTrade('test-key', 'secret', url_config).get_active_orders())
+
+        # 記録したサーバーは停止しているため、トランスポートを経由しない要求は失敗する
+        with ReplayTransport(self.path) as transport:
+            url_config.transport = transport
+            self.assertEqual(asyncio.run(main()), (depth, ticker, orders))
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncBlockingTransportTest(unittest.TestCase):
+
+    def test_requests_run_off_the_event_loop(self):
+        loop_threads = []
+
+        class Transport():
+            def request(self, base_url, http_method, url, **kwargs):
+                loop_threads.append(threading.current_thread())
+                return TransportResponse(200, b'{"last": 1.0}')
+
+        url_config = UrlConfigs()
+        url_config.transport = Transport()
+
+        async def main():
+            loop_threads.append(threading.current_thread())
+            return await AsyncMarket(url_config).get_ticker(CURRENCY_PAIR)
+
+        self.assertEqual(asyncio.run(main()), {'last': 1.0})
+        self.assertEqual(len(loop_threads), 2)
+        self.assertIsNot(loop_threads[0], loop_threads[1])
+
+
+class Http2TransportTest(unittest.TestCase):
+
+    @unittest.skipIf(transport_module.httpx is None or transport_module.h2 is None, 'httpx[http2] is not installed')
+    def test_requests_against_local_server(self):
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            url_config.transport = transport = Http2Transport()
+            # 最初の要求まで接続を作成しない
+            self.assertIsNone(transport._client)
+            market = Market(url_config)
+            self.assertIn('last', market.get_ticker(CURRENCY_PAIR))
+            self.assertIn('order_id', Trade('test-key', 'secret', url_config).cancel_order(1))
+
+            # 閉じた後は次の要求で接続し直す
+            transport.close()
+            self.assertIsNone(transport._client)
+            self.assertIn('asks', market.get_depth(CURRENCY_PAIR))
+            transport.close()
+
+            # 平文のHTTPではHTTP/1.1で通信する
+            self.assertEqual(transport.statistics, {'HTTP/1.1': 3})
+            self.assertEqual(server.statistics['requests'], 3)
+
+    @unittest.skipIf(transport_module.httpx is None or transport_module.h2 is None or aiohttp is None,
+                     'httpx[http2] or aiohttp is not installed')
+    def test_async_requests_against_local_server(self):
+        with MockZaifServer() as server:
+            url_config = server.url_config()
+            url_config.transport = transport = Http2Transport()
+
+            async def main():
+                try:
+                    return await AsyncMarket(url_config).get_ticker(CURRENCY_PAIR)
+                finally:
+                    await transport.close_async()
+
+            self.assertIn('last', asyncio.run(main()))
+            self.assertIsNone(transport._client)
+        self.assertEqual(transport.statistics, {'HTTP/1.1': 1})
+
+    def test_fallback_requests_are_counted(self):
+        with MockZaifServer() as server, mock.patch.object(transport_module, 'httpx', None):
+            url_config = server.url_config()
+            session_pool = SessionPool()
+            url_config.transport = transport = Http2Transport(fallback=session_pool)
+            self.assertFalse(transport.http2_enabled)
+            self.assertFalse(transport.supports_async)
+            market = Market(url_config)
+            for _ in range(2):
+                self.assertIn('last', market.get_ticker(CURRENCY_PAIR))
+            transport.close()
+            self.assertEqual(transport.statistics, {'HTTP/1.1': 2})
+            self.assertEqual(session_pool.statistics['requests'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
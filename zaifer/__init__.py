@@ -1,6 +1,4 @@
-from zaifer.zaifapi.connection import *
-from zaifer.zaifapi.exception import *
-from zaifer.zaifapi.method import *
+import importlib
 
 __copyright__ = 'Copyright (C) 2018 Yusuke Oya'
 __version__ = '1.2.0'
@@ -9,12 +7,170 @@ __author__ = 'Yusuke Oya'
 __author_email__ = 'curio@antique-cafe.net'
 __url__ = 'http://antique-cafe.net'
 
+# 公開する名前と、その名前を定義しているモジュール(zaifer.zaifapi以下)
+# モジュールは名前が参照されたときに読み込むため、requestsなどの依存パッケージは必要になるまで読み込まれない
+_LAZY_ATTRIBUTES = {
+    'AsyncHttpConnection': 'async_connection',
+    'AsyncSessionPool': 'async_connection',
+    'AsyncAccount': 'async_method',
+    'AsyncChart': 'async_method',
+    'AsyncMarginMarket': 'async_method',
+    'AsyncMarginTrade': 'async_method',
+    'AsyncMarket': 'async_method',
+    'AsyncTrade': 'async_method',
+    'BatchExecutor': 'batch',
+    'BatchResult': 'batch',
+    'AccountRequestBuilder': 'builder',
+    'ChartRequestBuilder': 'builder',
+    'MarginMarketRequestBuilder': 'builder',
+    'MarginTradeRequestBuilder': 'builder',
+    'MarketRequestBuilder': 'builder',
+    'RequestSpec': 'builder',
+    'TradeRequestBuilder': 'builder',
+    'ResponseCache': 'cache',
+    'CandleStore': 'candle_store',
+    'ColumnarConverter': 'columnar',
+    'HttpConnection': 'connection',
+    'NonceGenerator': 'connection',
+    'NonceSequencer': 'connection',
+    'ResponseParser': 'connection',
+    'SessionPool': 'connection',
+    'UrlConfigs': 'connection',
+    'JsonDecoder': 'decoder',
+    'HttpStatusException': 'exception',
+    'InvalidAPIKeyException': 'exception',
+    'InvalidAPISecretException': 'exception',
+    'InvalidAmountException': 'exception',
+    'NonceNotIcreasedException': 'exception',
+    'NonceOutOfRangeException': 'exception',
+    'OrderNotFoundException': 'exception',
+    'ReplayMissException': 'exception',
+    'TimeoutException': 'exception',
+    'TradeTemporarilyUnavailableException': 'exception',
+    'Fill': 'exchange',
+    'MatchingEngine': 'exchange',
+    'SimulatedExchange': 'exchange',
+    'SimulatedOrder': 'exchange',
+    'SimulatedPosition': 'exchange',
+    'KeyPool': 'keypool',
+    'KeyPoolConnection': 'keypool',
+    'Account': 'method',
+    'AirFXMarket': 'method',
+    'AirFXTrade': 'method',
+    'Chart': 'method',
+    'MarginMarket': 'method',
+    'MarginTrade': 'method',
+    'Market': 'method',
+    'Trade': 'method',
+    'Instrumentation': 'metrics',
+    'MetricsAggregator': 'metrics',
+    'RequestTrace': 'metrics',
+    'TRACED_POOL_CLASSES': 'metrics',
+    'TracedHTTPConnection': 'metrics',
+    'TracedHTTPConnectionPool': 'metrics',
+    'TracedHTTPSConnection': 'metrics',
+    'TracedHTTPSConnectionPool': 'metrics',
+    'ActiveOrder': 'model',
+    'Balance': 'model',
+    'DepthLevel': 'model',
+    'ModelConverter': 'model',
+    'ModelList': 'model',
+    'ModelMapping': 'model',
+    'Position': 'model',
+    'PublicTrade': 'model',
+    'ResponseModel': 'model',
+    'Ticker': 'model',
+    'OhlcRangeFetcher': 'ohlc',
+    'DepthDiff': 'orderbook',
+    'OrderBook': 'orderbook',
+    'HistoryIterator': 'pagination',
+    'MarketPoller': 'poller',
+    'PollEvent': 'poller',
+    'RateLimiter': 'ratelimit',
+    'TokenBucket': 'ratelimit',
+    'RetryPolicy': 'retry',
+    'HmacSigner': 'signer',
+    'SingleFlight': 'singleflight',
+    'AsyncStreamClient': 'stream',
+    'StreamClient': 'stream',
+    'StreamDecoder': 'stream',
+    'StreamMessage': 'stream',
+    'StreamReplayServer': 'stream',
+    'Http2Transport': 'transport',
+    'RecordingTransport': 'transport',
+    'ReplayTransport': 'transport',
+    'TransportLog': 'transport',
+    'TransportRecord': 'transport',
+    'TransportResponse': 'transport',
+    'request_key': 'transport',
+    'NumericConverter': 'utils',
+    'TimeConverter': 'utils'
+}
+
 __all__ = [
     'UrlConfigs',
+    'SessionPool',
+    'TransportLog',
+    'RecordingTransport',
+    'ReplayTransport',
+    'Http2Transport',
+    'MatchingEngine',
+    'SimulatedExchange',
+    'KeyPool',
+    'HmacSigner',
+    'BatchResult',
+    'RateLimiter',
+    'RetryPolicy',
+    'ResponseCache',
+    'SingleFlight',
+    'JsonDecoder',
+    'Instrumentation',
+    'RequestTrace',
+    'MetricsAggregator',
+    'HistoryIterator',
+    'OhlcRangeFetcher',
+    'CandleStore',
+    'ColumnarConverter',
+    'OrderBook',
+    'Ticker',
+    'PublicTrade',
+    'DepthLevel',
+    'ActiveOrder',
+    'Position',
+    'Balance',
+    'StreamClient',
+    'AsyncStreamClient',
+    'StreamReplayServer',
+    'MarketPoller',
+    'PollEvent',
     'Chart',
     'Account',
     'Market',
     'Trade',
     'AirFXMarket',
-    'AirFXTrade'
+    'AirFXTrade',
+    'AsyncSessionPool',
+    'AsyncHttpConnection',
+    'AsyncChart',
+    'AsyncAccount',
+    'AsyncMarket',
+    'AsyncTrade',
+    'AsyncMarginMarket',
+    'AsyncMarginTrade'
 ]
+
+
+def __getattr__(name: str):
+    '''
+    公開する名前が参照されたときに、その名前を定義しているモジュールを読み込みます。
+    '''
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    value = getattr(importlib.import_module('zaifer.zaifapi.' + module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,344 @@
+import asyncio
+import threading
+import weakref
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from zaifer.zaifapi.builder import RequestSpec
+from zaifer.zaifapi.connection import (HttpConnection, ResponseParser,
+                                       UrlConfigs)
+from zaifer.zaifapi.exception import HttpStatusException
+from zaifer.zaifapi.metrics import RequestTrace
+from zaifer.zaifapi.ratelimit import RateLimiter
+from zaifer.zaifapi.retry import RetryPolicy
+
+
+class AsyncSessionPool():
+    '''
+    イベントループごとにaiohttpのセッションを保持し、接続を共有します。
+    '''
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_size: int = 100, keep_alive_timeout: float = 30.0):
+        '''
+        コンストラクタ
+        pool_size :
+            同時に保持する接続の最大数
+        keep_alive_timeout :
+            アイドル状態の接続を破棄するまでの秒数
+        '''
+        if aiohttp is None:
+            raise ImportError('aiohttp is required to use the asyncio API.')
+        self._pool_size = pool_size
+        self._keep_alive_timeout = keep_alive_timeout
+        self._sessions = weakref.WeakKeyDictionary()
+        self._locks = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def shared(cls) -> 'AsyncSessionPool':
+        '''
+        プロセス内で共有される既定のセッションプールを取得します。
+        '''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get_session(self) -> 'aiohttp.ClientSession':
+        '''
+        実行中のイベントループに対応するセッションを取得します。
+        '''
+        loop = asyncio.get_event_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_size, keepalive_timeout=self._keep_alive_timeout)
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    def get_lock(self, key: str) -> asyncio.Lock:
+        '''
+        APIキーごとの要求を直列化するロックを取得します。
+        '''
+        loop = asyncio.get_event_loop()
+        locks = self._locks.setdefault(loop, {})
+        lock = locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            locks[key] = lock
+        return lock
+
+    async def close(self):
+        '''
+        実行中のイベントループに対応するセッションを破棄します。
+        '''
+        loop = asyncio.get_event_loop()
+        session = self._sessions.pop(loop, None)
+        if session is not None:
+            await session.close()
+
+
+class AsyncHttpConnection(HttpConnection):
+    '''
+    asyncioによるZaifAPIへの接続を表します。
+    '''
+
+    def __init__(self, base_url: str = None, key: str = None, secret: str = None,
+                 url_config: UrlConfigs = None, transport=None):
+        '''
+        コンストラクタ
+        transport :
+            HTTP要求を送信するトランスポート。Noneの場合はurl_configの設定に従います。
+            asyncioに対応していないトランスポート(ReplayTransportなど)はスレッドで実行し、
+            トランスポートを設定しない場合はaiohttpで送信します。
+        '''
+        url_config = UrlConfigs() if url_config is None else url_config
+        super().__init__(base_url, key, secret, url_config, transport)
+        self._async_session_pool = url_config.async_session_pool \
+            if url_config.async_session_pool is not None else AsyncSessionPool.shared()
+        self._async_transport = None
+        self._blocking_transport = None
+        if getattr(self._transport, 'supports_async', False):
+            self._async_transport = self._transport
+        elif self._transport is not self._session_pool:
+            self._blocking_transport = self._transport
+
+    async def post(self, method: str, params: dict) -> dict:
+        '''
+        POST要求を送信します。
+        '''
+        # 引数を検証
+        self._validate_credentials()
+        method = '' if method is None else method
+        params = {} if params is None else dict(params)
+
+        # POST要求を作成
+        url = self._base_url + method
+
+        # ノンスの順序を保つため、同一キーの要求は直列化する
+        async with self._async_session_pool.get_lock(self._key):
+
+            # ノンスが指定されている場合は、署名し直せないため再試行しない
+            if 'nonce' in params:
+                res, error = await self._post_once(url, params)
+                if res is None:
+                    raise error
+                return res
+
+            attempt = 0
+            while True:
+                # 試行ごとに新しいノンスを付与
+                params['nonce'] = await self._run_blocking(self._nonce_sequencer.generate)
+                res, error = await self._post_once(url, params)
+                if error is None:
+                    return res
+
+                # 再試行しない場合は、レスポンスまたは例外をそのまま返す
+                delay = self._retry_policy.next_delay(error, params.get('method'), attempt)
+                if delay is None:
+                    if res is not None:
+                        return res
+                    raise error
+
+                # ノンスが拒否された場合は、採番を再同期する
+                if RetryPolicy.classify(error) == RetryPolicy.REASON_NONCE:
+                    await self._run_blocking(self._nonce_sequencer.resync)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    @staticmethod
+    async def _run_blocking(func):
+        '''
+        ファイルロックを待つ可能性がある処理を、イベントループを止めないよう別スレッドで実行します。
+        '''
+        return await asyncio.get_event_loop().run_in_executor(None, func)
+
+    async def _post_once(self, url: str, params: dict) -> tuple:
+        '''
+        POST要求を1回送信し、(レスポンス, エラー)を返します。
+        送信に失敗した場合、レスポンスはNoneとなります。
+        '''
+        # 送信レートを制限
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire_async(
+                self._endpoint_family, RateLimiter.priority_of(params))
+
+        trace = None if self._instrumentation is None \
+            else self._begin_trace('POST', params.get('method'))
+        try:
+            res = await self._send_post(url, params, trace)
+            error = ResponseParser.error_of(res)
+        except Exception as e:
+            res, error = None, e
+        if trace is not None:
+            if res is not None:
+                trace.mark('parse')
+            self._end_trace(trace, error)
+        return res, error
+
+    async def _send_post(self, url: str, params: dict, trace: RequestTrace = None) -> dict:
+        '''
+        署名したPOST要求を送信します。
+        '''
+        # 認証情報を作成
+        encoded_params = RequestSpec.encode_params(params)
+        if trace is not None:
+            trace.mark('build')
+        http_headers = self._create_http_headers(encoded_params)
+        http_headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if trace is not None:
+            trace.mark('sign')
+
+        # POST要求を送信
+        if self._async_transport is not None:
+            response = await self._async_transport.request_async(
+                self._base_url, 'POST', url, data=encoded_params, headers=http_headers)
+            content = self._content_of(trace, response)
+        elif self._blocking_transport is not None:
+            response = await self._run_blocking(lambda: self._blocking_transport.request(
+                self._base_url, 'POST', url, data=encoded_params, headers=http_headers))
+            content = self._content_of(trace, response)
+        else:
+            session = self._async_session_pool.get_session()
+            async with session.post(url, data=encoded_params, headers=http_headers) as response:
+                content = await self._read(trace, response)
+
+        # レスポンスを取得
+        res = self._trade_decoder.decode(content)
+        if trace is not None:
+            trace.mark('decode')
+        return res
+
+    async def get(self, method: str, params: dict) -> dict:
+        '''
+        GET要求を送信します。
+        '''
+        # 引数を検証
+        method = '' if method is None else method
+        params = {} if params is None else params
+
+        # GET要求を作成
+        url = self._base_url + method
+
+        # キャッシュを経由して取得
+        cache = self._response_cache
+        ttl = None if cache is None else cache.ttl_of(method)
+        if ttl is None:
+            return await self._get_coalesced(url, params)
+
+        key = cache.key_of(self._base_url, method, params)
+        state, value = cache.lookup(key)
+        if state == cache.FRESH:
+            return value
+        if state == cache.STALE:
+            if cache.begin_refresh(key):
+                asyncio.ensure_future(self._refresh(key, url, params, ttl))
+            return value
+        value = await self._get_coalesced(url, params)
+        cache.store(key, value, ttl)
+        return value
+
+    async def _refresh(self, key: tuple, url: str, params: dict, ttl: float):
+        '''
+        キャッシュしたレスポンスをバックグラウンドで再取得します。
+        '''
+        try:
+            value = await self._get_coalesced(url, params)
+        except Exception as e:
+            self._response_cache.end_refresh(key, None, ttl, e)
+        else:
+            self._response_cache.end_refresh(key, value, ttl)
+
+    async def _get_coalesced(self, url: str, params: dict) -> dict:
+        '''
+        同時に発行された同一のGET要求をまとめて送信します。
+        '''
+        if self._single_flight is None:
+            return await self._get_with_retry(url, params)
+        key = (url, tuple(sorted(params.items())))
+        return await self._single_flight.do_async(key, lambda: self._get_with_retry(url, params))
+
+    async def _get_with_retry(self, url: str, params: dict) -> dict:
+        '''
+        失敗した場合は再試行しながらGET要求を送信します。
+        '''
+        attempt = 0
+        while True:
+            trace = None if self._instrumentation is None \
+                else self._begin_trace('GET', self._api_method_of(url))
+            try:
+                res = await self._send_get(url, params, trace)
+                if trace is not None:
+                    self._end_trace(trace)
+                return res
+            except Exception as e:
+                if trace is not None:
+                    self._end_trace(trace, e)
+                delay = self._retry_policy.next_delay(e, None, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_get(self, url: str, params: dict, trace: RequestTrace = None) -> dict:
+        '''
+        GET要求を送信します。
+        '''
+        # 送信レートを制限
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire_async(self._endpoint_family)
+        if trace is not None:
+            trace.mark('build')
+
+        # GET要求を送信
+        if self._async_transport is not None:
+            response = await self._async_transport.request_async(self._base_url, 'GET', url, params=params)
+            content = self._content_of(trace, response)
+        elif self._blocking_transport is not None:
+            response = await self._run_blocking(lambda: self._blocking_transport.request(
+                self._base_url, 'GET', url, params=params))
+            content = self._content_of(trace, response)
+        else:
+            session = self._async_session_pool.get_session()
+            async with session.get(url, params=params) as response:
+                content = await self._read(trace, response)
+
+        # レスポンスを取得
+        res = self._market_decoder.decode(content)
+        if trace is not None:
+            trace.mark('decode')
+        return res
+
+    @staticmethod
+    async def _read(trace: RequestTrace, response: 'aiohttp.ClientResponse') -> bytes:
+        '''
+        レスポンスの本文を受信します。
+        計測中の場合、ヘッダーを受信するまでの所要時間は接続・送信を含めてttfbとして記録します。
+        '''
+        if trace is not None:
+            trace.mark('ttfb')
+            trace.status = response.status
+        if response.status != 200:
+            raise HttpStatusException(response.status)
+        content = await response.read()
+        if trace is not None:
+            trace.mark('read')
+        return content
+
+    @staticmethod
+    def _content_of(trace: RequestTrace, response) -> bytes:
+        '''
+        トランスポートから受信したレスポンスの本文を取得します。
+        '''
+        if trace is not None:
+            trace.mark('ttfb')
+            trace.status = response.status_code
+        if response.status_code != 200:
+            raise HttpStatusException(response.status_code)
+        return response.content
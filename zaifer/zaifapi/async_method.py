@@ -0,0 +1,396 @@
+from datetime import datetime
+from decimal import Decimal
+
+from zaifer.zaifapi.async_connection import AsyncHttpConnection
+from zaifer.zaifapi.builder import (AccountRequestBuilder, ChartRequestBuilder,
+                                    MarginMarketRequestBuilder,
+                                    MarginTradeRequestBuilder,
+                                    MarketRequestBuilder, TradeRequestBuilder)
+from zaifer.zaifapi.columnar import ColumnarConverter
+from zaifer.zaifapi.connection import ResponseParser, UrlConfigs
+from zaifer.zaifapi.model import ModelConverter
+
+
+class AsyncChart():
+    '''
+    チャート情報をasyncioで取得します。
+    '''
+
+    def __init__(self, url_config: UrlConfigs = UrlConfigs()):
+        '''
+        コンストラクタ
+        '''
+        self._connection = AsyncHttpConnection(url_config.chart_api_url, url_config=url_config)
+        self._decoder = url_config.market_decoder
+
+    async def get_ohlc(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime,
+                       columnar: bool = False) -> dict:
+        '''
+        チャート情報を取得します。
+        period :
+            1分足:1、5分足:5、15分足:15、30分足:30、1時間足:60、4時間足:240、8時間足:480、12時間足:720、1日足:D、1週足:W
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        '''
+        res = await self._connection.get(*ChartRequestBuilder.get_ohlc(
+            currency_pair, period, from_datetime, to_datetime))
+        res = ResponseParser.parse_chart(res, self._decoder)
+        return ColumnarConverter.ohlc(res) if columnar else res
+
+
+class AsyncAccount():
+    '''
+    アカウント情報をasyncioで取得します。
+
+    対応ドキュメント：現物取引API
+    https://zaif-api-document.readthedocs.io/ja/latest/TradingAPI.html
+    '''
+
+    def __init__(self, key, secret, url_config: UrlConfigs = UrlConfigs()):
+        '''
+        コンストラクタ
+        '''
+        self._connection = AsyncHttpConnection(url_config.trade_api_url, key, secret, url_config)
+
+    async def get_info(self, model: bool = False) -> dict:
+        '''
+        残高情報を取得します。
+        model :
+            Trueを指定した場合、funds・depositを通貨ごとのBalance(balances)に置き換えて返します。
+        '''
+        res = await self._connection.post(*AccountRequestBuilder.get_info())
+        res = ResponseParser.parse(res)
+        return ModelConverter.balances(res) if model else res
+
+    async def get_info2(self, model: bool = False) -> dict:
+        '''
+        残高情報を取得します。(軽量版)
+        model :
+            Trueを指定した場合、funds・depositを通貨ごとのBalance(balances)に置き換えて返します。
+        '''
+        res = await self._connection.post(*AccountRequestBuilder.get_info2())
+        res = ResponseParser.parse(res)
+        return ModelConverter.balances(res) if model else res
+
+    async def get_personal_info(self) -> dict:
+        '''
+        チャット情報を取得します。
+        '''
+        res = await self._connection.post(*AccountRequestBuilder.get_personal_info())
+        return ResponseParser.parse(res)
+
+    async def get_id_info(self) -> dict:
+        '''
+        アカウント情報を取得します。
+        '''
+        res = await self._connection.post(*AccountRequestBuilder.get_id_info())
+        return ResponseParser.parse(res)
+
+    async def withdraw(self, currency: str, address: str, amount: Decimal,
+                       message: str = None, opt_fee: Decimal = None) -> dict:
+        '''
+        出金を依頼します。
+        '''
+        res = await self._connection.post(*AccountRequestBuilder.withdraw(
+            currency, address, amount, message, opt_fee))
+        return ResponseParser.parse(res)
+
+    async def get_deposit_history(self, currency: str, since: datetime = None, end: datetime = None,
+                                  _from: int = None, count: int = None,
+                                  from_id: int = None, end_id: int = None, order: str = None) -> dict:
+        '''
+        入金履歴を取得します。
+        '''
+        res = await self._connection.post(*AccountRequestBuilder.get_deposit_history(
+            currency, since, end, _from, count, from_id, end_id, order))
+        return ResponseParser.parse(res)
+
+    async def get_withdraw_history(self, currency: str, since: datetime = None, end: datetime = None,
+                                   _from: int = None, count: int = None,
+                                   from_id: int = None, end_id: int = None, order: str = None) -> dict:
+        '''
+        出金履歴を取得します。
+        '''
+        res = await self._connection.post(*AccountRequestBuilder.get_withdraw_history(
+            currency, since, end, _from, count, from_id, end_id, order))
+        return ResponseParser.parse(res)
+
+
+class AsyncMarket():
+    '''
+    現物取引のマーケット情報をasyncioで取得します。
+
+    対応ドキュメント：現物公開API
+    https://zaif-api-document.readthedocs.io/ja/latest/PublicAPI.html
+    '''
+
+    def __init__(self, url_config: UrlConfigs = UrlConfigs()):
+        '''
+        コンストラクタ
+        '''
+        self._connection = AsyncHttpConnection(url_config.public_api_url, url_config=url_config)
+
+    async def get_currencies(self, currency: str) -> dict:
+        '''
+        通貨情報を取得します。
+        '''
+        return await self._connection.get(*MarketRequestBuilder.get_currencies(currency))
+
+    async def get_currency_pairs(self, currency_pair: str) -> dict:
+        '''
+        通貨ペア情報を取得します。
+        '''
+        return await self._connection.get(*MarketRequestBuilder.get_currency_pairs(currency_pair))
+
+    async def get_last_price(self, currency_pair: str) -> dict:
+        '''
+        現在の終値を取得します。
+        '''
+        return await self._connection.get(*MarketRequestBuilder.get_last_price(currency_pair))
+
+    async def get_ticker(self, currency_pair: str, model: bool = False) -> dict:
+        '''
+        ティッカーを取得します。
+        model :
+            Trueを指定した場合、Tickerで返します。
+        '''
+        res = await self._connection.get(*MarketRequestBuilder.get_ticker(currency_pair))
+        return ModelConverter.ticker(res) if model else res
+
+    async def get_trade_history(self, currency_pair: str, columnar: bool = False,
+                                model: bool = False) -> dict:
+        '''
+        全ユーザーの取引履歴を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、PublicTradeのリストで返します。
+        '''
+        res = await self._connection.get(*MarketRequestBuilder.get_trade_history(currency_pair))
+        if columnar:
+            return ColumnarConverter.trades(res)
+        return ModelConverter.trades(res) if model else res
+
+    async def get_depth(self, currency_pair: str, columnar: bool = False,
+                        model: bool = False) -> dict:
+        '''
+        板情報を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、DepthLevelのリストで返します。
+        '''
+        res = await self._connection.get(*MarketRequestBuilder.get_depth(currency_pair))
+        if columnar:
+            return ColumnarConverter.depth(res)
+        return ModelConverter.depth(res) if model else res
+
+
+class AsyncTrade():
+    '''
+    現物取引の注文情報をasyncioで取得・送信します。
+
+    対応ドキュメント：現物取引API
+    https://zaif-api-document.readthedocs.io/ja/latest/TradingAPI.html
+    '''
+
+    def __init__(self, key, secret, url_config: UrlConfigs = UrlConfigs()):
+        '''
+        コンストラクタ
+        '''
+        self._connection = AsyncHttpConnection(url_config.trade_api_url, key, secret, url_config)
+
+    async def get_trade_history(self, currency_pair: str = None, since: datetime = None, end: datetime = None,
+                                _from: int = None, count: int = None,
+                                from_id: int = None, end_id: int = None,
+                                order: str = None, is_token: bool = None) -> dict:
+        '''
+        ユーザー自身の取引履歴を取得します。
+        '''
+        res = await self._connection.post(*TradeRequestBuilder.get_trade_history(
+            currency_pair, since, end, _from, count, from_id, end_id, order, is_token))
+        return ResponseParser.parse(res)
+
+    async def get_active_orders(self, currency_pair: str = None, is_token: bool = None, is_token_both: bool = None,
+                                model: bool = False) -> dict:
+        '''
+        現在有効な注文一覧を取得します（未約定注文一覧）。
+        model :
+            Trueを指定した場合、ActiveOrderの辞書で返します。
+        '''
+        res = await self._connection.post(*TradeRequestBuilder.get_active_orders(
+            currency_pair, is_token, is_token_both))
+        res = ResponseParser.parse(res)
+        return ModelConverter.active_orders(res) if model else res
+
+    async def open_order(self, currency_pair: str, action: str, price: Decimal, amount: Decimal, limit: Decimal = None, comment: str = None) -> dict:
+        '''
+        新規注文を送信します。
+        '''
+        res = await self._connection.post(*TradeRequestBuilder.open_order(
+            currency_pair, action, price, amount, limit, comment))
+        return ResponseParser.parse(res)
+
+    async def cancel_order(self, order_id: int, currency_pair: str = None, is_token: bool = None) -> dict:
+        '''
+        キャンセル注文を送信します。
+        '''
+        res = await self._connection.post(*TradeRequestBuilder.cancel_order(
+            order_id, currency_pair, is_token))
+        return ResponseParser.parse(res)
+
+
+class AsyncMarginMarket():
+    '''
+    証拠金取引(信用取引およびAirFX)のマーケット情報をasyncioで取得します。
+
+    対応ドキュメント：なし
+    '''
+
+    def __init__(self, url_config: UrlConfigs = UrlConfigs()):
+        '''
+        コンストラクタ
+        '''
+        self._connection = AsyncHttpConnection(url_config.margin_public_api_url, url_config=url_config)
+
+    async def get_groups(self, group_id: str) -> dict:
+        """
+        先物取引のグループIDを取得します。
+
+        Parameters
+        ----------
+        group_id : str
+            数字を指定した場合、対応するグループIDのみを取得します。
+            'all'を指定した場合、取引が終了したものを含むすべてのグループIDを取得します。
+            'active'を指定した場合、現在取引可能なグループIDのみを取得します。
+        """
+        return await self._connection.get(*MarginMarketRequestBuilder.get_groups(group_id))
+
+    async def get_last_price(self, group_id: int, currency_pair: str) -> dict:
+        '''
+        現在の終値を取得します。
+        '''
+        return await self._connection.get(*MarginMarketRequestBuilder.get_last_price(
+            group_id, currency_pair))
+
+    async def get_ticker(self, group_id: int, currency_pair: str, model: bool = False) -> dict:
+        '''
+        ティッカーを取得します。
+        model :
+            Trueを指定した場合、Tickerで返します。
+        '''
+        res = await self._connection.get(*MarginMarketRequestBuilder.get_ticker(
+            group_id, currency_pair))
+        return ModelConverter.ticker(res) if model else res
+
+    async def get_trade_history(self, group_id: int, currency_pair: str, columnar: bool = False,
+                                model: bool = False) -> dict:
+        '''
+        全ユーザの取引履歴を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、PublicTradeのリストで返します。
+        '''
+        res = await self._connection.get(*MarginMarketRequestBuilder.get_trade_history(
+            group_id, currency_pair))
+        if columnar:
+            return ColumnarConverter.trades(res)
+        return ModelConverter.trades(res) if model else res
+
+    async def get_depth(self, group_id: int, currency_pair: str, columnar: bool = False,
+                        model: bool = False) -> dict:
+        '''
+        板情報を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、DepthLevelのリストで返します。
+        '''
+        res = await self._connection.get(*MarginMarketRequestBuilder.get_depth(
+            group_id, currency_pair))
+        if columnar:
+            return ColumnarConverter.depth(res)
+        return ModelConverter.depth(res) if model else res
+
+    async def get_swap_history(self, group_id: int, currency_pair: str) -> dict:
+        '''
+        確定したスワップポイントの履歴を取得します。
+        '''
+        return await self._connection.get(*MarginMarketRequestBuilder.get_swap_history(
+            group_id, currency_pair))
+
+
+class AsyncMarginTrade():
+    '''
+    証拠金取引(信用取引およびAirFX)の注文情報をasyncioで取得・送信します。
+
+    対応ドキュメント：信用取引API, AirFXAPI
+    https://zaif-api-document.readthedocs.io/ja/latest/MarginTradingAPI.html
+    https://zaif-api-document.readthedocs.io/ja/latest/AirFXAPI.html
+    '''
+
+    def __init__(self, key, secret, url_config: UrlConfigs = UrlConfigs()):
+        '''
+        コンストラクタ
+        '''
+        self._connection = AsyncHttpConnection(
+            url_config.margin_trade_api_url, key, secret, url_config)
+
+    async def get_positions(self, _type: str, group_id: int = None, currency_pair: str = None,
+                            since: datetime = None, end: datetime = None, _from: int = None, count: int = None,
+                            from_id: int = None, end_id: int = None, order: str = None,
+                            model: bool = False) -> dict:
+        """
+        証拠金取引のユーザー自身の取引履歴を取得します。
+        model :
+            Trueを指定した場合、Positionの辞書で返します。
+        """
+        res = await self._connection.post(*MarginTradeRequestBuilder.get_positions(
+            _type, group_id, currency_pair, since, end, _from, count, from_id, end_id, order))
+        res = ResponseParser.parse(res)
+        return ModelConverter.positions(res) if model else res
+
+    async def get_position_history(self, _type: str, group_id: int, order_id: int) -> dict:
+        '''
+        証拠金取引のユーザー自身の取引履歴の明細を取得します。
+        '''
+        res = await self._connection.post(*MarginTradeRequestBuilder.get_position_history(
+            _type, group_id, order_id))
+        return ResponseParser.parse(res)
+
+    async def get_active_positions(self, _type: str, group_id: int = None, currency_pair: str = None,
+                                   model: bool = False) -> dict:
+        '''
+        証拠金取引の現在有効な注文一覧を取得します（未約定注文一覧）。
+        model :
+            Trueを指定した場合、Positionの辞書で返します。
+        '''
+        res = await self._connection.post(*MarginTradeRequestBuilder.get_active_positions(
+            _type, group_id, currency_pair))
+        res = ResponseParser.parse(res)
+        return ModelConverter.positions(res) if model else res
+
+    async def create_position(self, _type: str, group_id: int, currency_pair: str, action: str, price: Decimal, amount: Decimal, leverage: Decimal, limit: Decimal = None, stop: Decimal = None) -> dict:
+        '''
+        証拠金取引の新規注文を送信します。
+        '''
+        res = await self._connection.post(*MarginTradeRequestBuilder.create_position(
+            _type, group_id, currency_pair, action, price, amount, leverage, limit, stop))
+        return ResponseParser.parse(res)
+
+    async def update_position(self, _type: str, group_id: int, order_id: int, price: Decimal, limit: Decimal = None, stop: Decimal = None) -> dict:
+        '''
+        証拠金取引の修正注文を送信します。
+        '''
+        res = await self._connection.post(*MarginTradeRequestBuilder.update_position(
+            _type, group_id, order_id, price, limit, stop))
+        return ResponseParser.parse(res)
+
+    async def cancel_position(self, _type: str, group_id: int, order_id: int) -> dict:
+        '''
+        証拠金取引のキャンセル注文を送信します。
+        '''
+        res = await self._connection.post(*MarginTradeRequestBuilder.cancel_position(
+            _type, group_id, order_id))
+        return ResponseParser.parse(res)
@@ -0,0 +1,69 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BatchResult(namedtuple('BatchResult', ['request', 'result', 'error'])):
+    '''
+    一括送信した要求1件分の結果を表します。
+    失敗した場合、resultはNoneとなり、errorに送出された例外が設定されます。
+    '''
+
+    __slots__ = ()
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchExecutor():
+    '''
+    複数の要求を並列に送信し、要求ごとの結果または例外を要求と同じ順序で返します。
+
+    ノンスの制約によりAPIキーごとに同時に処理できる要求は1つのため、
+    並列数は既定でKeyPoolのAPIキーの数(KeyPoolを使用しない場合は1)とします。
+    送信レートの制限はUrlConfigs.rate_limiterに従います。
+    '''
+
+    def __init__(self, max_workers: int = 1):
+        '''
+        コンストラクタ
+        max_workers :
+            同時に送信する要求の最大数
+        '''
+        if max_workers < 1:
+            raise ValueError('max_workers must be at least 1.')
+        self._max_workers = max_workers
+
+    @classmethod
+    def for_connection(cls, connection, max_workers: int = None) -> 'BatchExecutor':
+        '''
+        接続に応じた並列数で送信する一括送信を作成します。
+        '''
+        if max_workers is None:
+            key_pool = getattr(connection, 'key_pool', None)
+            max_workers = len(key_pool) if key_pool is not None else 1
+        return cls(max_workers)
+
+    @property
+    def max_workers(self) -> int:
+        return self._max_workers
+
+    def map(self, func, requests) -> list:
+        '''
+        要求ごとにfuncを呼び出し、BatchResultのリストを返します。
+        '''
+        requests = list(requests)
+        if self._max_workers == 1 or len(requests) <= 1:
+            return [self._call(func, request) for request in requests]
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(requests))) as executor:
+            return list(executor.map(lambda request: self._call(func, request), requests))
+
+    @staticmethod
+    def _call(func, request) -> BatchResult:
+        '''
+        要求を1件送信します。
+        '''
+        try:
+            return BatchResult(request, func(request), None)
+        except Exception as e:
+            return BatchResult(request, None, e)
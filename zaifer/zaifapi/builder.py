@@ -0,0 +1,482 @@
+import re
+from datetime import datetime
+from decimal import Decimal
+from urllib.parse import quote_plus, urlencode
+
+from zaifer.zaifapi.utils import NumericConverter, TimeConverter
+
+
+class RequestSpec():
+    '''
+    非公開APIのメソッドごとの要求の定義を表します。
+
+    定義はパラメータ名・変換関数・省略可否を引数の順に並べたもので、
+    作成時に引数から要求を組み立てる処理と、項目ごとのエンコード済みの接頭辞へコンパイルされます。
+    '''
+
+    # エンコードせずに送信できる文字のみからなる値
+    _SAFE_VALUE = re.compile(r'[A-Za-z0-9_.\-~]*\Z')
+
+    # エンコード結果を保持する文字列の最大数
+    _MAX_ENCODED_VALUES = 4096
+
+    _registry = {}
+
+    def __init__(self, method: str, fields: tuple = ()):
+        '''
+        コンストラクタ
+        method :
+            APIのメソッド名
+        fields :
+            (パラメータ名, 変換関数, 省略可否)を引数の順に並べたもの
+        '''
+        self._method = method
+        self._fields = tuple((name, convert, optional) for name, convert, optional in fields)
+        self._prefixes = {
+            name: quote_plus(name) + '='
+            for name in ('method', 'nonce') + tuple(name for name, _, _ in self._fields)
+        }
+        self._encoded_values = {}
+        RequestSpec._registry[method] = self
+
+    @classmethod
+    def of(cls, method: str) -> 'RequestSpec':
+        '''
+        メソッド名に対応する定義を取得します。定義されていない場合はNoneを返します。
+        '''
+        return cls._registry.get(method)
+
+    @property
+    def method(self) -> str:
+        return self._method
+
+    def build(self, *args) -> dict:
+        '''
+        引数からパラメータを作成します。省略可能な項目は値がNoneの場合は含めません。
+        '''
+        params = {'method': self._method}
+        for (name, convert, optional), value in zip(self._fields, args):
+            if value is None and optional:
+                continue
+            params[name] = value if convert is None else convert(value)
+        return params
+
+    def encode(self, params: dict) -> str:
+        '''
+        パラメータをurlencodeと同じ形式にエンコードします。
+        '''
+        prefixes = self._prefixes
+        encoded_values = self._encoded_values
+        parts = []
+        for name, value in params.items():
+            prefix = prefixes.get(name)
+            if prefix is None:
+                prefix = quote_plus(str(name)) + '='
+            if type(value) is str:
+                # 通貨ペアや売買種別など、繰り返し送信される文字列はエンコード結果を再利用する
+                encoded = encoded_values.get(value)
+                if encoded is None:
+                    encoded = self._quote(value)
+                    if len(encoded_values) < self._MAX_ENCODED_VALUES:
+                        encoded_values[value] = encoded
+            elif type(value) is int:
+                encoded = str(value)
+            elif isinstance(value, (bytes, bytearray)):
+                encoded = quote_plus(value)
+            else:
+                encoded = self._quote(str(value))
+            parts.append(prefix + encoded)
+        return '&'.join(parts)
+
+    @classmethod
+    def _quote(cls, text: str) -> str:
+        '''
+        値をエンコードします。エンコードが不要な場合はそのまま返します。
+        '''
+        return text if cls._SAFE_VALUE.match(text) else quote_plus(text)
+
+    @classmethod
+    def encode_params(cls, params: dict) -> str:
+        '''
+        パラメータのメソッドに対応する定義でエンコードします。定義がない場合はurlencodeを使用します。
+        '''
+        spec = cls._registry.get(params.get('method'))
+        return urlencode(params) if spec is None else spec.encode(params)
+
+
+def _required(name: str, convert=None) -> tuple:
+    '''
+    必須の項目を定義します。
+    '''
+    return name, convert, False
+
+
+def _optional(name: str, convert=None) -> tuple:
+    '''
+    省略可能な項目を定義します。
+    '''
+    return name, convert, True
+
+
+def _unixtime_str(value: datetime) -> str:
+    '''
+    日時をunixtime(秒)の文字列に変換します。
+    '''
+    return str(int(TimeConverter.datetime_to_unixtime(value)))
+
+
+# 履歴取得APIに共通する範囲指定の項目(since, end, from, count, from_id, end_id, orderの順)
+_HISTORY_FIELDS = (
+    _optional('since', _unixtime_str),
+    _optional('end', _unixtime_str),
+    _optional('from', str),
+    _optional('count', str),
+    _optional('from_id', str),
+    _optional('end_id', str),
+    _optional('order')
+)
+
+_GET_INFO = RequestSpec('get_info')
+_GET_INFO2 = RequestSpec('get_info2')
+_GET_PERSONAL_INFO = RequestSpec('get_personal_info')
+_GET_ID_INFO = RequestSpec('get_id_info')
+_WITHDRAW = RequestSpec('withdraw', (
+    _required('currency'),
+    _required('address'),
+    _required('amount'),
+    _optional('message'),
+    _optional('opt_fee')
+))
+_DEPOSIT_HISTORY = RequestSpec('deposit_history', (_required('currency'),) + _HISTORY_FIELDS)
+_WITHDRAW_HISTORY = RequestSpec('withdraw_history', (_required('currency'),) + _HISTORY_FIELDS)
+_TRADE_HISTORY = RequestSpec('trade_history', (_optional('currency_pair'),) + _HISTORY_FIELDS + (
+    _optional('is_token'),
+))
+_ACTIVE_ORDERS = RequestSpec('active_orders', (
+    _optional('currency_pair'),
+    _optional('is_token', str),
+    _optional('is_token_both', str)
+))
+_TRADE = RequestSpec('trade', (
+    _required('currency_pair'),
+    _required('action'),
+    _required('price', NumericConverter.decimal_to_str),
+    _required('amount', NumericConverter.decimal_to_str),
+    _optional('limit'),
+    _optional('comment')
+))
+_CANCEL_ORDER = RequestSpec('cancel_order', (
+    _required('order_id'),
+    _optional('currency_pair'),
+    _optional('is_token')
+))
+_GET_POSITIONS = RequestSpec('get_positions', (
+    _required('type'),
+    _optional('group_id'),
+    _optional('currency_pair')
+) + _HISTORY_FIELDS)
+_POSITION_HISTORY = RequestSpec('position_history', (
+    _required('type'),
+    _optional('group_id'),
+    _required('leverage_id')
+))
+_ACTIVE_POSITIONS = RequestSpec('active_positions', (
+    _required('type'),
+    _optional('group_id'),
+    _optional('currency_pair')
+))
+_CREATE_POSITION = RequestSpec('create_position', (
+    _required('type'),
+    _optional('group_id'),
+    _required('currency_pair'),
+    _required('action'),
+    _required('price'),
+    _required('amount'),
+    _required('leverage'),
+    _optional('limit'),
+    _optional('stop')
+))
+_CHANGE_POSITION = RequestSpec('change_position', (
+    _required('type'),
+    _optional('group_id'),
+    _required('leverage_id'),
+    _required('price'),
+    _optional('limit'),
+    _optional('stop')
+))
+_CANCEL_POSITION = RequestSpec('cancel_position', (
+    _required('type'),
+    _optional('group_id'),
+    _required('leverage_id')
+))
+
+
+class ChartRequestBuilder():
+    '''
+    チャートAPIの要求を作成します。
+    '''
+
+    @staticmethod
+    def get_ohlc(currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime) -> tuple:
+        '''
+        チャート情報の要求を作成します。
+        '''
+        params = {
+            'symbol': currency_pair,
+            'resolution': period,
+            'from': _unixtime_str(from_datetime),
+            'to': _unixtime_str(to_datetime)
+        }
+        return '/history', params
+
+
+class AccountRequestBuilder():
+    '''
+    アカウント情報の要求を作成します。
+    '''
+
+    @staticmethod
+    def get_info() -> tuple:
+        '''
+        残高情報の要求を作成します。
+        '''
+        return None, _GET_INFO.build()
+
+    @staticmethod
+    def get_info2() -> tuple:
+        '''
+        残高情報(軽量版)の要求を作成します。
+        '''
+        return None, _GET_INFO2.build()
+
+    @staticmethod
+    def get_personal_info() -> tuple:
+        '''
+        チャット情報の要求を作成します。
+        '''
+        return None, _GET_PERSONAL_INFO.build()
+
+    @staticmethod
+    def get_id_info() -> tuple:
+        '''
+        アカウント情報の要求を作成します。
+        '''
+        return None, _GET_ID_INFO.build()
+
+    @staticmethod
+    def withdraw(currency: str, address: str, amount: Decimal,
+                 message: str = None, opt_fee: Decimal = None) -> tuple:
+        '''
+        出金依頼の要求を作成します。
+        '''
+        return None, _WITHDRAW.build(currency, address, amount, message, opt_fee)
+
+    @staticmethod
+    def get_deposit_history(currency: str, since: datetime = None, end: datetime = None,
+                            _from: int = None, count: int = None,
+                            from_id: int = None, end_id: int = None, order: str = None) -> tuple:
+        '''
+        入金履歴の要求を作成します。
+        '''
+        return None, _DEPOSIT_HISTORY.build(
+            currency, since, end, _from, count, from_id, end_id, order)
+
+    @staticmethod
+    def get_withdraw_history(currency: str, since: datetime = None, end: datetime = None,
+                             _from: int = None, count: int = None,
+                             from_id: int = None, end_id: int = None, order: str = None) -> tuple:
+        '''
+        出金履歴の要求を作成します。
+        '''
+        return None, _WITHDRAW_HISTORY.build(
+            currency, since, end, _from, count, from_id, end_id, order)
+
+
+class MarketRequestBuilder():
+    '''
+    現物公開APIの要求を作成します。
+    '''
+
+    @staticmethod
+    def get_currencies(currency: str) -> tuple:
+        '''
+        通貨情報の要求を作成します。
+        '''
+        return '/currencies/{}'.format(currency), None
+
+    @staticmethod
+    def get_currency_pairs(currency_pair: str) -> tuple:
+        '''
+        通貨ペア情報の要求を作成します。
+        '''
+        return '/currency_pairs/{}'.format(currency_pair), None
+
+    @staticmethod
+    def get_last_price(currency_pair: str) -> tuple:
+        '''
+        現在の終値の要求を作成します。
+        '''
+        return '/last_price/{}'.format(currency_pair), None
+
+    @staticmethod
+    def get_ticker(currency_pair: str) -> tuple:
+        '''
+        ティッカーの要求を作成します。
+        '''
+        return '/ticker/{}'.format(currency_pair), None
+
+    @staticmethod
+    def get_trade_history(currency_pair: str) -> tuple:
+        '''
+        全ユーザーの取引履歴の要求を作成します。
+        '''
+        return '/trades/{}'.format(currency_pair), None
+
+    @staticmethod
+    def get_depth(currency_pair: str) -> tuple:
+        '''
+        板情報の要求を作成します。
+        '''
+        return '/depth/{}'.format(currency_pair), None
+
+
+class TradeRequestBuilder():
+    '''
+    現物取引APIの要求を作成します。
+    '''
+
+    @staticmethod
+    def get_trade_history(currency_pair: str = None, since: datetime = None, end: datetime = None,
+                          _from: int = None, count: int = None,
+                          from_id: int = None, end_id: int = None,
+                          order: str = None, is_token: bool = None) -> tuple:
+        '''
+        ユーザー自身の取引履歴の要求を作成します。
+        '''
+        return None, _TRADE_HISTORY.build(
+            currency_pair, since, end, _from, count, from_id, end_id, order, is_token)
+
+    @staticmethod
+    def get_active_orders(currency_pair: str = None, is_token: bool = None, is_token_both: bool = None) -> tuple:
+        '''
+        現在有効な注文一覧の要求を作成します。
+        '''
+        return None, _ACTIVE_ORDERS.build(currency_pair, is_token, is_token_both)
+
+    @staticmethod
+    def open_order(currency_pair: str, action: str, price: Decimal, amount: Decimal,
+                   limit: Decimal = None, comment: str = None) -> tuple:
+        '''
+        新規注文の要求を作成します。
+        '''
+        return None, _TRADE.build(currency_pair, action, price, amount, limit, comment)
+
+    @staticmethod
+    def cancel_order(order_id: int, currency_pair: str = None, is_token: bool = None) -> tuple:
+        '''
+        キャンセル注文の要求を作成します。
+        '''
+        return None, _CANCEL_ORDER.build(order_id, currency_pair, is_token)
+
+
+class MarginMarketRequestBuilder():
+    '''
+    証拠金取引の公開APIの要求を作成します。
+    '''
+
+    @staticmethod
+    def get_groups(group_id: str) -> tuple:
+        '''
+        先物取引のグループIDの要求を作成します。
+        '''
+        return '/groups/{}'.format(str(group_id)), None
+
+    @staticmethod
+    def get_last_price(group_id: int, currency_pair: str) -> tuple:
+        '''
+        現在の終値の要求を作成します。
+        '''
+        return '/last_price/{}/{}'.format(str(group_id), currency_pair), None
+
+    @staticmethod
+    def get_ticker(group_id: int, currency_pair: str) -> tuple:
+        '''
+        ティッカーの要求を作成します。
+        '''
+        return '/ticker/{}/{}'.format(str(group_id), currency_pair), None
+
+    @staticmethod
+    def get_trade_history(group_id: int, currency_pair: str) -> tuple:
+        '''
+        全ユーザーの取引履歴の要求を作成します。
+        '''
+        return '/trades/{}/{}'.format(str(group_id), currency_pair), None
+
+    @staticmethod
+    def get_depth(group_id: int, currency_pair: str) -> tuple:
+        '''
+        板情報の要求を作成します。
+        '''
+        return '/depth/{}/{}'.format(str(group_id), currency_pair), None
+
+    @staticmethod
+    def get_swap_history(group_id: int, currency_pair: str) -> tuple:
+        '''
+        確定したスワップポイントの履歴の要求を作成します。
+        '''
+        return '/swap_history/{}/{}'.format(str(group_id), currency_pair), None
+
+
+class MarginTradeRequestBuilder():
+    '''
+    証拠金取引APIの要求を作成します。
+    '''
+
+    @staticmethod
+    def get_positions(_type: str, group_id: int = None, currency_pair: str = None,
+                      since: datetime = None, end: datetime = None, _from: int = None, count: int = None,
+                      from_id: int = None, end_id: int = None, order: str = None) -> tuple:
+        '''
+        証拠金取引のユーザー自身の取引履歴の要求を作成します。
+        '''
+        return None, _GET_POSITIONS.build(
+            _type, group_id, currency_pair, since, end, _from, count, from_id, end_id, order)
+
+    @staticmethod
+    def get_position_history(_type: str, group_id: int, order_id: int) -> tuple:
+        '''
+        証拠金取引のユーザー自身の取引履歴の明細の要求を作成します。
+        '''
+        return None, _POSITION_HISTORY.build(_type, group_id, order_id)
+
+    @staticmethod
+    def get_active_positions(_type: str, group_id: int = None, currency_pair: str = None) -> tuple:
+        '''
+        証拠金取引の現在有効な注文一覧の要求を作成します。
+        '''
+        return None, _ACTIVE_POSITIONS.build(_type, group_id, currency_pair)
+
+    @staticmethod
+    def create_position(_type: str, group_id: int, currency_pair: str, action: str,
+                        price: Decimal, amount: Decimal, leverage: Decimal,
+                        limit: Decimal = None, stop: Decimal = None) -> tuple:
+        '''
+        証拠金取引の新規注文の要求を作成します。
+        '''
+        return None, _CREATE_POSITION.build(
+            _type, group_id, currency_pair, action, price, amount, leverage, limit, stop)
+
+    @staticmethod
+    def update_position(_type: str, group_id: int, order_id: int, price: Decimal,
+                        limit: Decimal = None, stop: Decimal = None) -> tuple:
+        '''
+        証拠金取引の修正注文の要求を作成します。
+        '''
+        return None, _CHANGE_POSITION.build(_type, group_id, order_id, price, limit, stop)
+
+    @staticmethod
+    def cancel_position(_type: str, group_id: int, order_id: int) -> tuple:
+        '''
+        証拠金取引のキャンセル注文の要求を作成します。
+        '''
+        return None, _CANCEL_POSITION.build(_type, group_id, order_id)
@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import OrderedDict
+
+from zaifer.zaifapi.decoder import JsonDecoder
+
+
+class ResponseCache():
+    '''
+    公開APIのレスポンスを有効期限付きでキャッシュします。
+
+    有効期限はエンドポイントごとに設定し、保持件数を超えた場合は
+    最も長く参照されていないレスポンスから破棄します(LRU)。
+    stale_while_revalidate を指定すると、期限切れ後もその秒数の間は
+    古いレスポンスを返しつつ、バックグラウンドで再取得します。
+    レスポンスは複製して保持・返却するため、呼び出し元が変更してもキャッシュには影響しません。
+    '''
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+    MISS = 'miss'
+
+    # エンドポイント(パスの前方一致)ごとの既定の有効期限(秒)
+    DEFAULT_TTLS = {
+        '/currencies/': 3600.0,
+        '/currency_pairs/': 3600.0,
+        '/groups/': 3600.0,
+        '/last_price/': 1.0,
+        '/ticker/': 1.0,
+        '/trades/': 1.0,
+        '/depth/': 1.0
+    }
+
+    def __init__(self, max_entries: int = 1024, ttls: dict = None, stale_while_revalidate: float = 0.0):
+        '''
+        コンストラクタ
+        max_entries :
+            保持するレスポンスの最大件数
+        ttls :
+            エンドポイント(パスの前方一致)ごとの有効期限(秒)
+        stale_while_revalidate :
+            期限切れのレスポンスを返しながら再取得する猶予(秒)
+        '''
+        self._max_entries = max_entries
+        self._ttls = dict(self.DEFAULT_TTLS, **({} if ttls is None else ttls))
+        self._stale_while_revalidate = stale_while_revalidate
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._statistics = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'refresh_errors': 0
+        }
+
+    def ttl_of(self, method: str) -> float:
+        '''
+        エンドポイントの有効期限を取得します。キャッシュしない場合はNoneを返します。
+        '''
+        for prefix, ttl in self._ttls.items():
+            if method.startswith(prefix):
+                return ttl
+        return None
+
+    @staticmethod
+    def key_of(base_url: str, method: str, params: dict) -> tuple:
+        '''
+        キャッシュのキーを作成します。
+        '''
+        return (base_url, method, tuple(sorted(params.items())) if params else ())
+
+    def lookup(self, key: tuple) -> tuple:
+        '''
+        キャッシュを検索し、(状態, レスポンス)を返します。
+        状態はFRESH(有効)、STALE(期限切れだが再取得中に利用可能)、MISS(利用不可)のいずれかです。
+        '''
+        now = time.monotonic()
+        state, value = self.MISS, None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if now < expires:
+                    state = self.FRESH
+                    self._statistics['hits'] += 1
+                elif now < expires + self._stale_while_revalidate:
+                    state = self.STALE
+                    self._statistics['stale_hits'] += 1
+            if state == self.MISS:
+                self._statistics['misses'] += 1
+                return self.MISS, None
+            self._entries.move_to_end(key)
+        return state, JsonDecoder.copy(value)
+
+    def store(self, key: tuple, value, ttl: float):
+        '''
+        レスポンスの複製をキャッシュします。
+        '''
+        value = JsonDecoder.copy(value)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._statistics['evictions'] += 1
+
+    def get_or_load(self, base_url: str, method: str, params: dict, loader):
+        '''
+        キャッシュからレスポンスを取得し、存在しない場合はloaderで取得してキャッシュします。
+        '''
+        ttl = self.ttl_of(method)
+        if ttl is None:
+            return loader()
+
+        key = self.key_of(base_url, method, params)
+        state, value = self.lookup(key)
+        if state == self.FRESH:
+            return value
+        if state == self.STALE:
+            if self.begin_refresh(key):
+                threading.Thread(
+                    target=self._refresh, args=(key, loader, ttl), daemon=True).start()
+            return value
+
+        value = loader()
+        self.store(key, value, ttl)
+        return value
+
+    def begin_refresh(self, key: tuple) -> bool:
+        '''
+        再取得を開始します。既に再取得中の場合はFalseを返します。
+        '''
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: tuple, value, ttl: float, error: Exception = None):
+        '''
+        再取得を終了し、取得したレスポンスをキャッシュします。
+        '''
+        if error is None:
+            self.store(key, value, ttl)
+        with self._lock:
+            self._refreshing.discard(key)
+            if error is not None:
+                self._statistics['refresh_errors'] += 1
+
+    def invalidate(self, method_prefix: str = None, base_url: str = None):
+        '''
+        キャッシュを破棄します。
+        method_prefix :
+            指定した場合、パスが前方一致するレスポンスのみを破棄します。
+        base_url :
+            指定した場合、接続先が一致するレスポンスのみを破棄します。
+        '''
+        with self._lock:
+            for key in list(self._entries):
+                if base_url is not None and key[0] != base_url:
+                    continue
+                if method_prefix is not None and not key[1].startswith(method_prefix):
+                    continue
+                del self._entries[key]
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        キャッシュのヒット数・ミス数を取得します。
+        '''
+        with self._lock:
+            return dict(self._statistics, entries=len(self._entries))
+
+    def _refresh(self, key: tuple, loader, ttl: float):
+        '''
+        バックグラウンドでレスポンスを再取得します。
+        '''
+        try:
+            value = loader()
+        except Exception as e:
+            self.end_refresh(key, None, ttl, e)
+        else:
+            self.end_refresh(key, value, ttl)
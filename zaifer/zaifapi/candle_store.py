@@ -0,0 +1,251 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+from zaifer.zaifapi.ohlc import OhlcRangeFetcher
+from zaifer.zaifapi.utils import TimeConverter
+
+# マップされたままのファイルを置き換えられるか(Windowsでは置き換えられない)
+_CAN_REPLACE_MAPPED_FILE = os.name != 'nt'
+
+
+class CandleStore():
+    '''
+    通貨ペア・足の種類ごとのローソク足を、列ごとの固定長バイナリとしてファイルに保存します。
+
+    ファイルは小さなヘッダーと、time(int64, unixtime秒)、open、high、low、close、volume(float64)の
+    各列を容量分ずつ並べた構成で、メモリマップして読み書きします。
+    read はデータをコピーせず、ファイルを直接参照するmemoryviewを返します。
+    Windowsでは、容量を超えて追加する前にread で取得したmemoryviewを解放する必要があります。
+    '''
+
+    COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+    _MAGIC = b'ZFCANDL1'
+    _VERSION = 1
+    _HEADER = struct.Struct('<8sIIQQ32x')
+    _ITEM_SIZE = 8
+    _INITIAL_CAPACITY = 4096
+
+    def __init__(self, directory: str, currency_pair: str, period: str, chart=None):
+        '''
+        コンストラクタ
+        directory :
+            ファイルを保存するディレクトリ
+        chart :
+            syncで使用するChart
+        '''
+        self._currency_pair = currency_pair
+        self._period = str(period)
+        self._period_seconds = OhlcRangeFetcher.period_seconds(period)
+        self._chart = chart
+        self._path = os.path.join(directory, '{}_{}.candles'.format(currency_pair, self._period))
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._count = 0
+        self._capacity = 0
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_time(self) -> int:
+        '''
+        保存されている最新のローソク足の時刻(unixtime秒)を取得します。保存されていない場合はNoneを返します。
+        '''
+        if self._count == 0:
+            return None
+        return self._column('time')[self._count - 1]
+
+    def sync(self, since: datetime = None, max_workers: int = 4) -> int:
+        '''
+        保存されている最新のローソク足より新しい、確定済みのローソク足を取得して追加します。
+        追加した本数を返します。
+        since :
+            保存されているローソク足がない場合に取得を開始する日時
+        '''
+        if self._chart is None:
+            raise ValueError('chart is required to sync candles.')
+
+        last_time = self.last_time
+        if last_time is None:
+            if since is None:
+                raise ValueError('since is required for an empty store.')
+            start = int(TimeConverter.datetime_to_unixtime(since))
+        else:
+            start = last_time + self._period_seconds
+
+        # 確定していない最新のローソク足は保存しない
+        stop = int(time.time()) // self._period_seconds * self._period_seconds
+        if start >= stop:
+            return 0
+        res = self._chart.get_ohlc_range(
+            self._currency_pair, self._period,
+            TimeConverter.unixtime_to_datetime(start), TimeConverter.unixtime_to_datetime(stop),
+            max_workers=max_workers)
+        candles = [candle for candle in res.get('ohlc_data') or []
+                   if self._time_of(candle) + self._period_seconds <= stop]
+        return self.append(candles)
+
+    def append(self, candles: list) -> int:
+        '''
+        保存されている最新のローソク足より新しいローソク足を時刻順に追加します。
+        追加した本数を返します。
+        '''
+        with self._lock:
+            last_time = self.last_time
+            rows = []
+            for candle in candles:
+                candle_time = self._time_of(candle)
+                if last_time is not None and candle_time <= last_time:
+                    continue
+                rows.append((candle_time, float(candle['open']), float(candle['high']),
+                             float(candle['low']), float(candle['close']), float(candle['volume'])))
+                last_time = candle_time
+            if not rows:
+                return 0
+
+            self._reserve(self._count + len(rows))
+            for index, name in enumerate(self.COLUMNS):
+                packed = struct.pack('<{}{}'.format(len(rows), 'q' if index == 0 else 'd'),
+                                     *[row[index] for row in rows])
+                offset = self._offset(index) + self._count * self._ITEM_SIZE
+                self._mmap[offset:offset + len(packed)] = packed
+
+            # 列を書き込んでから件数を更新する
+            self._count += len(rows)
+            self._write_header()
+            self._mmap.flush()
+            return len(rows)
+
+    def read(self, from_datetime: datetime = None, to_datetime: datetime = None) -> dict:
+        '''
+        期間内のローソク足を列ごとのmemoryviewとして取得します。
+        '''
+        with self._lock:
+            times = self._column('time')
+            start, stop = 0, self._count
+            if from_datetime is not None:
+                start = bisect.bisect_left(
+                    times, int(TimeConverter.datetime_to_unixtime(from_datetime)), 0, stop)
+            if to_datetime is not None:
+                stop = bisect.bisect_right(
+                    times, int(TimeConverter.datetime_to_unixtime(to_datetime)), start, stop)
+            return {name: self._column(name)[start:stop] for name in self.COLUMNS}
+
+    def close(self):
+        '''
+        ファイルを閉じます。read で取得したmemoryviewは、参照が残っている間は有効です。
+        '''
+        with self._lock:
+            self._mmap = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> 'CandleStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _open(self):
+        '''
+        ファイルを開きます。存在しない場合は作成します。
+        '''
+        if not os.path.exists(self._path):
+            self._create(self._path, self._INITIAL_CAPACITY)
+        self._file = open(self._path, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        magic, version, period_seconds, count, capacity = self._HEADER.unpack_from(self._mmap, 0)
+        if magic != self._MAGIC or version != self._VERSION:
+            raise ValueError('{} is not a candle store.'.format(self._path))
+        if period_seconds != self._period_seconds:
+            raise ValueError('{} was created for a different period.'.format(self._path))
+        self._count = count
+        self._capacity = capacity
+
+    def _create(self, path: str, capacity: int):
+        '''
+        空のファイルを作成します。
+        '''
+        with open(path, 'wb') as fp:
+            fp.write(self._HEADER.pack(self._MAGIC, self._VERSION, self._period_seconds, 0, capacity))
+            fp.truncate(self._HEADER.size + len(self.COLUMNS) * capacity * self._ITEM_SIZE)
+
+    def _reserve(self, count: int):
+        '''
+        指定した件数を保存できるよう、必要に応じて容量を倍増させたファイルに作り直します。
+        '''
+        if count <= self._capacity:
+            return
+        capacity = self._capacity
+        while capacity < count:
+            capacity *= 2
+
+        # 新しいファイルに列を移し替えてから置き換える
+        temporary_path = self._path + '.tmp'
+        self._create(temporary_path, capacity)
+        with open(temporary_path, 'r+b') as fp:
+            fp.seek(0)
+            fp.write(self._HEADER.pack(self._MAGIC, self._VERSION, self._period_seconds,
+                                       self._count, capacity))
+            for index in range(len(self.COLUMNS)):
+                fp.seek(self._HEADER.size + index * capacity * self._ITEM_SIZE)
+                offset = self._offset(index)
+                fp.write(self._mmap[offset:offset + self._count * self._ITEM_SIZE])
+
+        # マップを開いたままではファイルを置き換えられない環境があるため、先にマップを閉じる
+        try:
+            self._mmap.close()
+        except BufferError:
+            # read で取得したmemoryviewが古いマップを参照している
+            if not _CAN_REPLACE_MAPPED_FILE:
+                os.remove(temporary_path)
+                raise BufferError('release the memoryviews returned by read before appending to {}.'.format(
+                    self._path))
+        self._mmap = None
+        self._file.close()
+        os.replace(temporary_path, self._path)
+        self._open()
+
+    def _write_header(self):
+        '''
+        ヘッダーを書き込みます。
+        '''
+        self._HEADER.pack_into(self._mmap, 0, self._MAGIC, self._VERSION,
+                               self._period_seconds, self._count, self._capacity)
+
+    def _offset(self, index: int) -> int:
+        '''
+        列の開始位置を取得します。
+        '''
+        return self._HEADER.size + index * self._capacity * self._ITEM_SIZE
+
+    def _column(self, name: str) -> memoryview:
+        '''
+        列全体を参照するmemoryviewを取得します。
+        '''
+        index = self.COLUMNS.index(name)
+        offset = self._offset(index)
+        view = memoryview(self._mmap)[offset:offset + self._count * self._ITEM_SIZE]
+        return view.cast('q' if index == 0 else 'd')
+
+    @staticmethod
+    def _time_of(candle: dict) -> int:
+        '''
+        ローソク足の時刻をunixtime秒で取得します。ミリ秒で表されている場合は秒に変換します。
+        '''
+        candle_time = int(candle['time'])
+        return candle_time // 1000 if candle_time > 100000000000 else candle_time
@@ -0,0 +1,77 @@
+from operator import itemgetter
+
+
+class ColumnarConverter():
+    '''
+    チャート情報・取引履歴・板情報を、列ごとのnumpy配列に変換します。
+    '''
+
+    OHLC_COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+    TRADE_COLUMNS = ('tid', 'date', 'price', 'amount')
+
+    # 売買種別の符号
+    SIDE_BID = 1
+    SIDE_ASK = -1
+
+    _ohlc_getter = itemgetter(*OHLC_COLUMNS)
+    _trade_getter = itemgetter(*TRADE_COLUMNS)
+    _trade_type_getter = itemgetter('trade_type')
+
+    @staticmethod
+    def ohlc(response: dict) -> dict:
+        '''
+        チャート情報を、time(int64)、open、high、low、close、volume(float64)の配列に変換します。
+        '''
+        np = ColumnarConverter._numpy()
+        columns = ColumnarConverter._to_columns(
+            response.get('ohlc_data') or [], ColumnarConverter._ohlc_getter, len(ColumnarConverter.OHLC_COLUMNS))
+        result = dict(zip(ColumnarConverter.OHLC_COLUMNS, columns))
+        result['time'] = result['time'].astype(np.int64)
+        return result
+
+    @staticmethod
+    def trades(response: list) -> dict:
+        '''
+        取引履歴を、tid、date(int64)、price、amount(float64)、side(int8, 買い:1、売り:-1)の配列に変換します。
+        '''
+        np = ColumnarConverter._numpy()
+        columns = ColumnarConverter._to_columns(
+            response, ColumnarConverter._trade_getter, len(ColumnarConverter.TRADE_COLUMNS))
+        result = dict(zip(ColumnarConverter.TRADE_COLUMNS, columns))
+        result['tid'] = result['tid'].astype(np.int64)
+        result['date'] = result['date'].astype(np.int64)
+        trade_types = np.array(list(map(ColumnarConverter._trade_type_getter, response)), dtype=object)
+        result['side'] = np.where(
+            trade_types == 'bid', ColumnarConverter.SIDE_BID, ColumnarConverter.SIDE_ASK).astype(np.int8)
+        return result
+
+    @staticmethod
+    def depth(response: dict) -> dict:
+        '''
+        板情報を、asks・bidsそれぞれ(価格, 数量)を行とする(n, 2)のfloat64配列に変換します。
+        '''
+        np = ColumnarConverter._numpy()
+        return {
+            side: np.array(response.get(side) or [], dtype=np.float64).reshape(-1, 2)
+            for side in ('asks', 'bids')
+        }
+
+    @staticmethod
+    def _to_columns(records: list, getter, width: int) -> list:
+        '''
+        辞書のリストから指定した項目を取り出し、列ごとの連続した配列に変換します。
+        '''
+        np = ColumnarConverter._numpy()
+        rows = np.array(list(map(getter, records)), dtype=np.float64).reshape(-1, width)
+        return list(np.ascontiguousarray(rows.T))
+
+    @staticmethod
+    def _numpy():
+        '''
+        numpyを取得します。起動を軽くするため、列ごとの出力を使用するときに読み込みます。
+        '''
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('numpy is required to use the columnar output mode.')
+        return numpy
@@ -1,14 +1,35 @@
 import hashlib
 import hmac
-import json
+import os
+import tempfile
+import threading
 import time
 from datetime import datetime
 from decimal import Decimal
-from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
 
+from zaifer.zaifapi.builder import RequestSpec
+from zaifer.zaifapi.cache import ResponseCache
+from zaifer.zaifapi.decoder import JsonDecoder
 from zaifer.zaifapi.exception import *
+from zaifer.zaifapi.metrics import (TRACED_POOL_CLASSES, Instrumentation,
+                                    RequestTrace)
+from zaifer.zaifapi.ratelimit import RateLimiter
+from zaifer.zaifapi.retry import RetryPolicy
+from zaifer.zaifapi.signer import HmacSigner
+from zaifer.zaifapi.singleflight import SingleFlight
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 
 
 class HttpConnection():
@@ -16,38 +37,118 @@ class HttpConnection():
     ZaifAPIへの接続を表します。
     '''
 
-    def __init__(self, base_url: str = None, key: str = None, secret: str = None):
+    def __init__(self, base_url: str = None, key: str = None, secret: str = None,
+                 url_config: 'UrlConfigs' = None, transport=None):
         '''
         コンストラクタ
+        transport :
+            HTTP要求を送信するトランスポート。Noneの場合はurl_configの設定に従います。
         '''
+        url_config = UrlConfigs() if url_config is None else url_config
         self._base_url = base_url
         self._key = key
         self._secret = secret
+        self._signer = None if key is None or secret is None else HmacSigner(key, secret)
+        self._session_pool = url_config.session_pool
+        if transport is None:
+            transport = url_config.transport \
+                if url_config.transport is not None else url_config.session_pool
+        self._transport = transport
+        self._nonce_sequencer = None if key is None else NonceSequencer.for_key(key)
+        self._rate_limiter = url_config.rate_limiter
+        self._endpoint_family = url_config.endpoint_family(base_url)
+        self._retry_policy = url_config.retry_policy
+        self._response_cache = url_config.response_cache
+        self._single_flight = url_config.single_flight
+        self._market_decoder = url_config.market_decoder
+        self._trade_decoder = url_config.trade_decoder
+        self._instrumentation = url_config.instrumentation
 
     def post(self, method: str, params: dict) -> dict:
         '''
         POST要求を送信します。
         '''
         # 引数を検証
+        self._validate_credentials()
         method = '' if method is None else method
-        params = {} if params is None else params
+        params = {} if params is None else dict(params)
 
         # POST要求を作成
         url = self._base_url + method
 
+        # ノンスが指定されている場合は、署名し直せないため再試行しない
+        if 'nonce' in params:
+            res, error = self._post_once(url, params)
+            if res is None:
+                raise error
+            return res
+
+        attempt = 0
+        while True:
+            # 試行ごとに新しいノンスを付与
+            params['nonce'] = self._nonce_sequencer.generate()
+            res, error = self._post_once(url, params)
+            if error is None:
+                return res
+
+            # 再試行しない場合は、レスポンスまたは例外をそのまま返す
+            delay = self._retry_policy.next_delay(error, params.get('method'), attempt)
+            if delay is None:
+                if res is not None:
+                    return res
+                raise error
+
+            # ノンスが拒否された場合は、採番を再同期する
+            if RetryPolicy.classify(error) == RetryPolicy.REASON_NONCE:
+                self._nonce_sequencer.resync()
+            time.sleep(delay)
+            attempt += 1
+
+    def _post_once(self, url: str, params: dict) -> tuple:
+        '''
+        POST要求を1回送信し、(レスポンス, エラー)を返します。
+        送信に失敗した場合、レスポンスはNoneとなります。
+        '''
+        # 送信レートを制限
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(
+                self._endpoint_family, RateLimiter.priority_of(params))
+
+        trace = None if self._instrumentation is None \
+            else self._begin_trace('POST', params.get('method'))
+        try:
+            res = self._send_post(url, params, trace)
+            error = ResponseParser.error_of(res)
+        except Exception as e:
+            res, error = None, e
+        if trace is not None:
+            if res is not None:
+                trace.mark('parse')
+            self._end_trace(trace, error)
+        return res, error
+
+    def _send_post(self, url: str, params: dict, trace: RequestTrace = None) -> dict:
+        '''
+        署名したPOST要求を送信します。
+        '''
         # 認証情報を作成
-        encoded_params = urlencode(params)
+        encoded_params = RequestSpec.encode_params(params)
+        if trace is not None:
+            trace.mark('build')
         http_headers = self._create_http_headers(encoded_params)
+        if trace is not None:
+            trace.mark('sign')
 
         # POST要求を送信
-        response = requests.post(
-            url, data=encoded_params, headers=http_headers)
+        response = self._request(trace, 'POST', url, data=encoded_params, headers=http_headers)
 
         # レスポンスを取得
         if response.status_code != 200:
-            raise Exception(
-                'return status code is {}'.format(response.status_code))
-        return json.loads(response.text)
+            raise HttpStatusException(response.status_code)
+        res = self._trade_decoder.decode(response.content)
+        if trace is not None:
+            trace.mark('decode')
+        return res
 
     def get(self, method: str, params: dict) -> dict:
         '''
@@ -60,19 +161,115 @@ class HttpConnection():
         # GET要求を作成
         url = self._base_url + method
 
+        # キャッシュを経由して取得
+        if self._response_cache is not None:
+            return self._response_cache.get_or_load(
+                self._base_url, method, params, lambda: self._get_coalesced(url, params))
+        return self._get_coalesced(url, params)
+
+    def _get_coalesced(self, url: str, params: dict) -> dict:
+        '''
+        同時に発行された同一のGET要求をまとめて送信します。
+        '''
+        if self._single_flight is None:
+            return self._get_with_retry(url, params)
+        key = (url, tuple(sorted(params.items())))
+        return self._single_flight.do(key, lambda: self._get_with_retry(url, params))
+
+    def _get_with_retry(self, url: str, params: dict) -> dict:
+        '''
+        失敗した場合は再試行しながらGET要求を送信します。
+        '''
+        attempt = 0
+        while True:
+            trace = None if self._instrumentation is None \
+                else self._begin_trace('GET', self._api_method_of(url))
+            try:
+                res = self._send_get(url, params, trace)
+                if trace is not None:
+                    self._end_trace(trace)
+                return res
+            except Exception as e:
+                if trace is not None:
+                    self._end_trace(trace, e)
+                delay = self._retry_policy.next_delay(e, None, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    def _send_get(self, url: str, params: dict, trace: RequestTrace = None) -> dict:
+        '''
+        GET要求を送信します。
+        '''
+        # 送信レートを制限
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire(self._endpoint_family)
+        if trace is not None:
+            trace.mark('build')
+
         # GET要求を送信
-        response = requests.get(url, params=params)
+        response = self._request(trace, 'GET', url, params=params)
 
         # レスポンスを取得
         if response.status_code != 200:
-            raise Exception(
-                'return status code is {}'.format(response.status_code))
-        return json.loads(response.text)
+            raise HttpStatusException(response.status_code)
+        res = self._market_decoder.decode(response.content)
+        if trace is not None:
+            trace.mark('decode')
+        return res
+
+    def _request(self, trace: RequestTrace, http_method: str, url: str, **kwargs) -> requests.Response:
+        '''
+        HTTP要求を送信します。計測中の場合は、接続・送信・受信の所要時間を記録します。
+        '''
+        if trace is None:
+            return self._transport.request(self._base_url, http_method, url, **kwargs)
+        trace.activate()
+        try:
+            response = self._transport.request(self._base_url, http_method, url, **kwargs)
+        finally:
+            RequestTrace.deactivate()
+        trace.status = response.status_code
+        trace.mark('read')
+        return response
+
+    def _begin_trace(self, http_method: str, api_method: str) -> RequestTrace:
+        '''
+        HTTP要求の計測を開始します。
+        '''
+        trace = RequestTrace(http_method, self._endpoint_family, api_method)
+        self._instrumentation.before_request(trace)
+        return trace
+
+    def _end_trace(self, trace: RequestTrace, error: Exception = None):
+        '''
+        HTTP要求の計測を終了します。
+        '''
+        trace.finish(error)
+        self._instrumentation.after_request(trace)
+
+    def _api_method_of(self, url: str) -> str:
+        '''
+        公開APIのURLから、APIのメソッド名(パスの先頭)を取得します。
+        '''
+        return url[len(self._base_url):].strip('/').split('/', 1)[0]
+
+    def _validate_credentials(self):
+        '''
+        取引APIの呼び出しに必要なAPI Key・API Secretが指定されているか検証します。
+        '''
+        if self._key is None:
+            raise InvalidAPIKeyException('API key is required to call the private API.')
+        if self._secret is None:
+            raise InvalidAPISecretException('API secret is required to call the private API.')
 
     def _create_http_headers(self, params: str) -> dict:
         '''
         HTTPヘッダーを作成します。
         '''
+        if self._signer is not None:
+            return self._signer.create_http_headers(params)
         return self._create_signature(self._key, self._secret, params)
 
     def _create_signature(self, key: str, secret: str, params: str) -> dict:
@@ -88,6 +285,161 @@ class HttpConnection():
         }
 
 
+class SessionPool():
+    '''
+    ベースURLごとにHTTPセッションを保持し、接続を再利用します。
+
+    セッションはスレッド間で共有され、アイドル時間が keep_alive_timeout を超えた場合、
+    または max_requests_per_connection 回のリクエストを送信した場合に作り直されます。
+    計測(UrlConfigs.instrumentation)中の要求には計測に対応した接続プールのセッションを別に保持し、
+    計測しない要求は標準の接続プールを使用します。
+    '''
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_size: int = 10, keep_alive_timeout: float = 30.0,
+                 max_requests_per_connection: int = 1000):
+        '''
+        コンストラクタ
+        pool_size :
+            ホストごとに保持する接続の最大数
+        keep_alive_timeout :
+            アイドル状態の接続を破棄するまでの秒数
+        max_requests_per_connection :
+            接続を作り直すまでに送信する最大リクエスト数
+        '''
+        self._pool_size = pool_size
+        self._keep_alive_timeout = keep_alive_timeout
+        self._max_requests_per_connection = max_requests_per_connection
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._created_sessions = 0
+        self._recycled_sessions = 0
+        self._retired_requests = 0
+        self._retired_connections = 0
+
+    @classmethod
+    def shared(cls) -> 'SessionPool':
+        '''
+        プロセス内で共有される既定のセッションプールを取得します。
+        '''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
+
+    @property
+    def keep_alive_timeout(self) -> float:
+        return self._keep_alive_timeout
+
+    @property
+    def max_requests_per_connection(self) -> int:
+        return self._max_requests_per_connection
+
+    def request(self, base_url: str, http_method: str, url: str, **kwargs) -> requests.Response:
+        '''
+        ベースURLに対応するセッションを使用してHTTP要求を送信します。
+        '''
+        session = self._acquire(base_url, RequestTrace.current() is not None)
+        return session.request(http_method, url, **kwargs)
+
+    def close(self):
+        '''
+        保持しているすべてのセッションを破棄します。
+        '''
+        with self._lock:
+            for key in list(self._entries):
+                self._retire(key)
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        接続の再利用状況を取得します。
+        '''
+        with self._lock:
+            requests_count = self._retired_requests
+            new_connections = self._retired_connections
+            for entry in self._entries.values():
+                requests_count += entry['requests']
+                new_connections += self._count_connections(entry['session'])
+            return {
+                'sessions': self._created_sessions,
+                'recycled_sessions': self._recycled_sessions,
+                'requests': requests_count,
+                'new_connections': new_connections,
+                'reused_connections': max(requests_count - new_connections, 0)
+            }
+
+    def _acquire(self, base_url: str, traced: bool = False) -> requests.Session:
+        '''
+        ベースURLに対応するセッションを取得します。
+        traced :
+            計測に対応した接続プールのセッションを取得するか
+        '''
+        key = (base_url, traced)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry['last_used'] > self._keep_alive_timeout \
+                        or entry['requests'] >= self._max_requests_per_connection:
+                    self._retire(key)
+                    self._recycled_sessions += 1
+                    entry = None
+            if entry is None:
+                entry = {
+                    'session': self._create_session(traced),
+                    'last_used': now,
+                    'requests': 0
+                }
+                self._entries[key] = entry
+                self._created_sessions += 1
+            entry['last_used'] = now
+            entry['requests'] += 1
+            return entry['session']
+
+    def _create_session(self, traced: bool) -> requests.Session:
+        '''
+        接続プールを設定したセッションを作成します。
+        '''
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self._pool_size)
+        if traced:
+            # 計測中の要求の接続・送信・受信を区切れるよう、計測に対応した接続プールを使用する
+            adapter.poolmanager.pool_classes_by_scheme = TRACED_POOL_CLASSES
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _retire(self, key: tuple):
+        '''
+        セッションを破棄し、統計情報を引き継ぎます。
+        '''
+        entry = self._entries.pop(key)
+        self._retired_requests += entry['requests']
+        self._retired_connections += self._count_connections(entry['session'])
+        entry['session'].close()
+
+    @staticmethod
+    def _count_connections(session: requests.Session) -> int:
+        '''
+        セッションが確立した接続数を取得します。
+        '''
+        count = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    count += pool.num_connections
+        return count
+
+
 class UrlConfigs():
     '''
     ZaifAPIの接続情報を表します。
@@ -100,6 +452,17 @@ class UrlConfigs():
         self._margin_public_api_url = 'https://api.zaif.jp/fapi/1'
         self._margin_trade_api_url = 'https://api.zaif.jp/tlapi'
         self._chart_api_url = 'https://zaif.jp/zaif_chart_api/v1'
+        self._stream_api_url = 'wss://ws.zaif.jp/stream'
+        self._session_pool = SessionPool.shared()
+        self._async_session_pool = None
+        self._rate_limiter = None
+        self._retry_policy = RetryPolicy.nonce_only()
+        self._response_cache = None
+        self._single_flight = SingleFlight.shared()
+        self._market_decoder = JsonDecoder()
+        self._trade_decoder = JsonDecoder()
+        self._instrumentation = None
+        self._transport = None
 
     @property
     def public_api_url(self) -> str:
@@ -141,6 +504,111 @@ class UrlConfigs():
     def chart_api_url(self, value: str):
         self._chart_api_url = value
 
+    @property
+    def stream_api_url(self) -> str:
+        return self._stream_api_url
+
+    @stream_api_url.setter
+    def stream_api_url(self, value: str):
+        self._stream_api_url = value
+
+    @property
+    def session_pool(self) -> SessionPool:
+        return self._session_pool
+
+    @session_pool.setter
+    def session_pool(self, value: SessionPool):
+        self._session_pool = value
+
+    @property
+    def transport(self):
+        '''
+        HTTP要求を送信するトランスポートを取得します。Noneの場合はsession_poolを使用します。
+        トランスポートはSessionPool.requestと同じ引数で要求を受け取り、
+        status_codeとcontent(bytes)を持つレスポンスを返すオブジェクトです。
+        '''
+        return self._transport
+
+    @transport.setter
+    def transport(self, value):
+        self._transport = value
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self._rate_limiter
+
+    @rate_limiter.setter
+    def rate_limiter(self, value: RateLimiter):
+        self._rate_limiter = value
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        return self._retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, value: RetryPolicy):
+        self._retry_policy = value
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        return self._response_cache
+
+    @response_cache.setter
+    def response_cache(self, value: ResponseCache):
+        self._response_cache = value
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        return self._single_flight
+
+    @single_flight.setter
+    def single_flight(self, value: SingleFlight):
+        self._single_flight = value
+
+    @property
+    def market_decoder(self) -> JsonDecoder:
+        return self._market_decoder
+
+    @market_decoder.setter
+    def market_decoder(self, value: JsonDecoder):
+        self._market_decoder = value
+
+    @property
+    def trade_decoder(self) -> JsonDecoder:
+        return self._trade_decoder
+
+    @trade_decoder.setter
+    def trade_decoder(self, value: JsonDecoder):
+        self._trade_decoder = value
+
+    @property
+    def instrumentation(self) -> Instrumentation:
+        return self._instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, value: Instrumentation):
+        self._instrumentation = value
+
+    def endpoint_family(self, base_url: str) -> str:
+        '''
+        接続先のエンドポイント種別(public, trade, margin, chart)を取得します。
+        '''
+        return {
+            self._public_api_url: 'public',
+            self._margin_public_api_url: 'public',
+            self._trade_api_url: 'trade',
+            self._margin_trade_api_url: 'margin',
+            self._chart_api_url: 'chart'
+        }.get(base_url)
+
+    @property
+    def async_session_pool(self) -> 'AsyncSessionPool':
+        return self._async_session_pool
+
+    @async_session_pool.setter
+    def async_session_pool(self, value: 'AsyncSessionPool'):
+        self._async_session_pool = value
+
 
 class NonceGenerator():
     '''
@@ -159,33 +627,154 @@ class NonceGenerator():
         return Decimal(datetime_part + '.' + second_part)
 
 
+class NonceSequencer():
+    '''
+    APIキーごとに狭義単調増加するノンスを発行します。
+
+    採番状態はファイルロックした一時ファイルに保存されるため、
+    同一ホスト上のスレッド間およびプロセス間で同じAPIキーを共有しても
+    ノンスが重複・逆転しません。ノンスは現在時刻(マイクロ秒単位)を下限として採番されます。
+    '''
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, key: str, directory: str = None, resync_margin: float = 1.0):
+        '''
+        コンストラクタ
+        directory :
+            採番ファイルを保存するディレクトリ(省略時は一時ディレクトリ)
+        resync_margin :
+            再同期時に現在時刻より進める秒数
+        '''
+        directory = tempfile.gettempdir() if directory is None else directory
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+        self._path = os.path.join(directory, 'zaifer-nonce-{}'.format(digest))
+        self._resync_margin = int(resync_margin * 1000000)
+        self._lock = threading.Lock()
+        self._fd = None
+        self._pid = None
+
+    @classmethod
+    def for_key(cls, key: str) -> 'NonceSequencer':
+        '''
+        APIキーに対応する共有のシーケンサーを取得します。
+        '''
+        with cls._instances_lock:
+            sequencer = cls._instances.get(key)
+            if sequencer is None:
+                sequencer = cls(key)
+                cls._instances[key] = sequencer
+            return sequencer
+
+    def generate(self) -> Decimal:
+        '''
+        ノンスを生成します。
+        '''
+        return Decimal(self._advance(1)).scaleb(-6)
+
+    def resync(self):
+        '''
+        採番を現在時刻より先へ進め、拒否されたノンスを確実に上回るようにします。
+        '''
+        self._advance(self._resync_margin)
+
+    def _advance(self, step: int) -> int:
+        '''
+        採番ファイルをロックして、次のノンス(マイクロ秒単位)を採番します。
+        '''
+        with self._lock:
+            fd = self._open()
+            self._lock_file(fd)
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                data = os.read(fd, 32).strip()
+                last = int(data) if data else 0
+                value = max(last + step, int(time.time() * 1000000))
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, '{:020d}'.format(value).encode('ascii'))
+            finally:
+                self._unlock_file(fd)
+            return value
+
+    def _open(self) -> int:
+        '''
+        採番ファイルを開きます。
+        '''
+        # fork後は親プロセスとロックを共有しないよう開き直す
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    @staticmethod
+    def _lock_file(fd: int):
+        '''
+        採番ファイルを排他ロックします。
+        '''
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 32)
+
+    @staticmethod
+    def _unlock_file(fd: int):
+        '''
+        採番ファイルのロックを解除します。
+        '''
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 32)
+
+
 class ResponseParser():
     '''
     レスポンスをパースします。
     '''
 
+    # エラーメッセージに対応する例外
+    _EXCEPTIONS = {
+        'no data found for the key': InvalidAPIKeyException,
+        'signature mismatch': InvalidAPISecretException,
+        'order not found': OrderNotFoundException,
+        'nonce not incremented': NonceNotIcreasedException,
+        'nonce out of range': NonceOutOfRangeException,
+        'trade temporarily unavailable.': TradeTemporarilyUnavailableException,
+        'invalid amount parameter': InvalidAmountException,
+        'time out': TimeoutException
+    }
+
     @staticmethod
     def parse(response: dict) -> dict:
         '''
         レスポンスをパースします。
         '''
+        error = ResponseParser.error_of(response)
+        if error is not None:
+            raise error
+        return response['return']
+
+    @staticmethod
+    def error_of(response: dict) -> Exception:
+        '''
+        レスポンスが表すエラーを取得します。エラーでない場合はNoneを返します。
+        '''
         if response['success'] == 0:
-            if response['error'] == 'no data found for the key':
-                raise InvalidAPIKeyException(response['error'])
-            elif response['error'] == 'signature mismatch':
-                raise InvalidAPISecretException(response['error'])
-            elif response['error'] == 'order not found':
-                raise OrderNotFoundException(response['error'])
-            elif response['error'] == 'nonce not incremented':
-                raise NonceNotIcreasedException(response['error'])
-            elif response['error'] == 'nonce out of range':
-                raise NonceOutOfRangeException(response['error'])
-            elif response['error'] == 'trade temporarily unavailable.':
-                raise TradeTemporarilyUnavailableException(response['error'])
-            elif response['error'] == 'invalid amount parameter':
-                raise InvalidAmountException(response['error'])
-            elif response['error'] == 'time out':
-                raise TimeoutException(response['error'])
-            raise Exception(response['error'])
+            exception_class = ResponseParser._EXCEPTIONS.get(response['error'], Exception)
+            return exception_class(response['error'])
+        return None
 
-        return response['return']
+    @staticmethod
+    def parse_chart(response, decoder: JsonDecoder = None) -> dict:
+        '''
+        チャートAPIのレスポンスをパースします。
+        decoder :
+            2重にエンコードされた中身のデコードに使用するJsonDecoder
+        '''
+        # NOTE:取得に成功した場合、なぜか2度エンコードされているのでデコードも2度する
+        if isinstance(response, str):
+            return (decoder or JsonDecoder()).decode(response)
+        return response
@@ -0,0 +1,92 @@
+import importlib
+import json
+from decimal import Decimal
+
+
+class JsonDecoder():
+    '''
+    レスポンスの本文(bytes)をJSONとしてデコードします。
+
+    orjson、simdjson、ujsonのいずれかが導入されている場合はそれを使用し、
+    導入されていない場合は標準のjsonを使用します。
+    decimal を指定した場合は、小数を丸めずにDecimalとしてデコードします(標準のjsonを使用します)。
+    '''
+
+    # 優先して使用するデコーダー
+    BACKENDS = ('orjson', 'simdjson', 'ujson', 'json')
+
+    _decimal_decoder = json.JSONDecoder(parse_float=Decimal)
+
+    def __init__(self, backend: str = None, decimal: bool = False):
+        '''
+        コンストラクタ
+        backend :
+            使用するデコーダー('orjson'、'simdjson'、'ujson'、'json')。Noneの場合は導入されているものから選択します。
+        decimal :
+            小数をDecimalとしてデコードするか
+        '''
+        if backend is not None and backend not in self.BACKENDS:
+            raise ValueError('unsupported backend: {}'.format(backend))
+        self._decimal = decimal
+        if decimal:
+            self._backend = 'json'
+            self._loads = self._loads_decimal
+        else:
+            self._backend, self._loads = self._resolve(backend)
+
+    @property
+    def backend(self) -> str:
+        return self._backend
+
+    @property
+    def decimal(self) -> bool:
+        return self._decimal
+
+    def decode(self, content):
+        '''
+        本文をデコードします。
+        '''
+        return self._loads(content)
+
+    @staticmethod
+    def copy(value):
+        '''
+        デコードした値を複製します。辞書とリストは入れ子まで複製し、文字列・数値は変更できないため共有します。
+        '''
+        return _copy_value(value)
+
+    @classmethod
+    def _resolve(cls, backend: str) -> tuple:
+        '''
+        デコーダーを読み込みます。
+        '''
+        for name in cls.BACKENDS if backend is None else (backend,):
+            try:
+                module = importlib.import_module(name)
+            except ImportError:
+                if backend is not None:
+                    raise
+                continue
+            return name, module.loads
+        return 'json', json.loads
+
+    @classmethod
+    def _loads_decimal(cls, content):
+        '''
+        小数をDecimalとしてデコードします。
+        '''
+        if isinstance(content, (bytes, bytearray)):
+            content = content.decode('utf-8')
+        return cls._decimal_decoder.decode(content)
+
+
+def _copy_value(value):
+    '''
+    辞書とリストを入れ子まで複製します。
+    '''
+    value_type = type(value)
+    if value_type is dict:
+        return {name: _copy_value(item) for name, item in value.items()}
+    if value_type is list:
+        return [_copy_value(item) for item in value]
+    return value
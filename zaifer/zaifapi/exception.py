@@ -46,3 +46,23 @@ class TimeoutException(Exception):
     '''
     リクエストがタイムアウトしました。
     '''
+
+
+class HttpStatusException(Exception):
+    '''
+    HTTPステータスコードが正常ではありません。
+    '''
+
+    def __init__(self, status_code: int):
+        super().__init__('return status code is {}'.format(status_code))
+        self.status_code = status_code
+
+
+class ReplayMissException(Exception):
+    '''
+    再生する記録に、要求に一致するレスポンスがありません。
+    '''
+
+    def __init__(self, key: str):
+        super().__init__('no recorded response for {}'.format(key))
+        self.key = key
@@ -0,0 +1,675 @@
+import bisect
+import itertools
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from decimal import Decimal
+from urllib.parse import unquote_plus
+
+from zaifer.zaifapi.transport import TransportResponse
+
+Fill = namedtuple('Fill', ['maker', 'taker', 'price', 'amount'])
+Fill.__doc__ = '''
+約定を表します。makerは板にあった注文、takerは約定させた注文です。
+'''
+
+
+class SimulatedOrder():
+    '''
+    模擬取引所の注文を表します。
+    ownerは注文の種類('spot'、'margin')で、板情報・約定履歴から作成した注文はNoneです。
+    '''
+
+    __slots__ = ('order_id', 'currency_pair', 'action', 'price', 'amount', 'remains',
+                 'timestamp', 'comment', 'owner', 'position')
+
+    def __init__(self, order_id: int, currency_pair: str, action: str, price: Decimal, amount: Decimal,
+                 timestamp: float, comment: str = '', owner: str = None, position=None):
+        self.order_id = order_id
+        self.currency_pair = currency_pair
+        self.action = action
+        self.price = price
+        self.amount = amount
+        self.remains = amount
+        self.timestamp = timestamp
+        self.comment = comment
+        self.owner = owner
+        self.position = position
+
+
+class SimulatedPosition():
+    '''
+    模擬取引所の証拠金取引の注文(ポジション)を表します。
+    '''
+
+    __slots__ = ('leverage_id', 'type', 'group_id', 'currency_pair', 'action', 'price', 'amount',
+                 'amount_done', 'cost', 'leverage', 'deposit', 'refunded', 'timestamp', 'timestamp_closed',
+                 'order')
+
+    def __init__(self, leverage_id: int, _type: str, group_id: int, currency_pair: str, action: str,
+                 price: Decimal, amount: Decimal, leverage: Decimal, deposit: Decimal, timestamp: float):
+        self.leverage_id = leverage_id
+        self.type = _type
+        self.group_id = group_id
+        self.currency_pair = currency_pair
+        self.action = action
+        self.price = price
+        self.amount = amount
+        self.amount_done = Decimal(0)
+        self.cost = Decimal(0)
+        self.leverage = leverage
+        self.deposit = deposit
+        self.refunded = Decimal(0)
+        self.timestamp = timestamp
+        self.timestamp_closed = None
+        self.order = None
+
+    @property
+    def price_avg(self) -> Decimal:
+        return self.cost / self.amount_done if self.amount_done else Decimal(0)
+
+
+class _PriceLevel():
+    '''
+    板の価格帯を表します。注文は到着順に保持し、取り消した注文は約定時に読み飛ばします。
+    '''
+
+    __slots__ = ('orders', 'amount', 'live')
+
+    def __init__(self):
+        self.orders = deque()
+        self.amount = Decimal(0)
+        self.live = 0
+
+
+class MatchingEngine():
+    '''
+    1つの通貨ペアの板を保持し、価格・時間優先で注文を約定させます。
+
+    価格帯は、買い板は価格、売り板は価格の符号を反転した値を昇順に並べた配列で保持するため、
+    最良気配は常に配列の末尾にあり、O(1)で参照・削除できます。
+    '''
+
+    BID = 'bid'
+    ASK = 'ask'
+
+    def __init__(self, currency_pair: str, trades_size: int = 150):
+        '''
+        コンストラクタ
+        currency_pair :
+            通貨ペア
+        trades_size :
+            保持する約定履歴の件数
+        '''
+        self._currency_pair = currency_pair
+        self._levels = {self.BID: {}, self.ASK: {}}
+        self._keys = {self.BID: [], self.ASK: []}
+        self._trades = deque(maxlen=trades_size)
+        self._trade_ids = itertools.count(1)
+        self.last_price = None
+
+    @property
+    def currency_pair(self) -> str:
+        return self._currency_pair
+
+    @property
+    def trades(self) -> list:
+        '''
+        約定履歴を新しい順に取得します(Market.get_trade_historyと同じ形式)。
+        '''
+        return list(self._trades)
+
+    def best(self, side: str) -> Decimal:
+        '''
+        最良気配の価格を取得します。注文がない場合はNoneを返します。
+        '''
+        keys = self._keys[side]
+        if not keys:
+            return None
+        return keys[-1] if side == self.BID else -keys[-1]
+
+    def submit(self, order: SimulatedOrder, timestamp: float, rest: bool = True) -> list:
+        '''
+        注文を約定させ、約定(Fill)のリストを返します。
+        restを指定した場合、約定しなかった数量は板に残します。
+        '''
+        is_bid = order.action == self.BID
+        side = self.ASK if is_bid else self.BID
+        keys = self._keys[side]
+        levels = self._levels[side]
+        fills = []
+        while order.remains > 0 and keys:
+            price = -keys[-1] if is_bid else keys[-1]
+            if (price > order.price) if is_bid else (price < order.price):
+                break
+            level = levels[price]
+            orders = level.orders
+            while orders and order.remains > 0:
+                maker = orders[0]
+                if maker.remains <= 0:
+                    orders.popleft()
+                    continue
+                amount = maker.remains if maker.remains < order.remains else order.remains
+                maker.remains -= amount
+                order.remains -= amount
+                level.amount -= amount
+                fills.append(Fill(maker, order, price, amount))
+                if maker.remains == 0:
+                    orders.popleft()
+                    level.live -= 1
+            if level.live == 0:
+                keys.pop()
+                del levels[price]
+
+        if fills:
+            self._record(fills, order.action, timestamp)
+        if rest and order.remains > 0:
+            self._rest(order)
+        return fills
+
+    def cancel(self, order: SimulatedOrder) -> Decimal:
+        '''
+        板に残っている注文を取り消し、取り消した数量を返します。
+        '''
+        remains = order.remains
+        if remains <= 0:
+            return Decimal(0)
+        order.remains = Decimal(0)
+        levels = self._levels[order.action]
+        level = levels.get(order.price)
+        if level is None:
+            return remains
+        level.amount -= remains
+        level.live -= 1
+        if level.live == 0:
+            self._remove_level(order.action, order.price)
+        elif len(level.orders) > 2 * level.live:
+            # 取り消した注文が多くなった場合は詰める
+            level.orders = deque(o for o in level.orders if o.remains > 0)
+        return remains
+
+    def clear(self, owner: str = None):
+        '''
+        指定した種類の注文をすべて板から取り除きます。取り除いた注文のリストを返します。
+        '''
+        removed = []
+        for side in (self.BID, self.ASK):
+            for level in list(self._levels[side].values()):
+                for order in level.orders:
+                    if order.remains > 0 and order.owner == owner:
+                        removed.append(order)
+        for order in removed:
+            self.cancel(order)
+        return removed
+
+    def depth(self, size: int = 150) -> dict:
+        '''
+        板情報を取得します(Market.get_depthと同じ形式)。
+        '''
+        result = {}
+        for name, side in (('asks', self.ASK), ('bids', self.BID)):
+            levels = self._levels[side]
+            entries = []
+            for key in reversed(self._keys[side]):
+                price = key if side == self.BID else -key
+                entries.append([price, levels[price].amount])
+                if len(entries) >= size:
+                    break
+            result[name] = entries
+        return result
+
+    def _rest(self, order: SimulatedOrder):
+        '''
+        注文を板に残します。
+        '''
+        levels = self._levels[order.action]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = _PriceLevel()
+            bisect.insort(self._keys[order.action], order.price if order.action == self.BID else -order.price)
+        level.orders.append(order)
+        level.amount += order.remains
+        level.live += 1
+
+    def _remove_level(self, side: str, price: Decimal):
+        '''
+        価格帯を取り除きます。
+        '''
+        del self._levels[side][price]
+        keys = self._keys[side]
+        key = price if side == self.BID else -price
+        index = bisect.bisect_left(keys, key)
+        if index < len(keys) and keys[index] == key:
+            keys.pop(index)
+
+    def _record(self, fills: list, trade_type: str, timestamp: float):
+        '''
+        約定履歴を記録します。
+        '''
+        for fill in fills:
+            self._trades.appendleft({
+                'date': int(timestamp),
+                'price': fill.price,
+                'amount': fill.amount,
+                'tid': next(self._trade_ids),
+                'currency_pair': self._currency_pair,
+                'trade_type': trade_type
+            })
+        self.last_price = fills[-1].price
+
+
+class SimulatedExchange():
+    '''
+    取引所を模擬するトランスポートです。UrlConfigs.transportに設定すると、
+    通信を行わずに次のAPIへ応答します。
+
+        公開API :   depth、trades、last_price、ticker
+        現物取引API : trade、cancel_order、active_orders、get_info、get_info2
+        証拠金取引API : create_position、cancel_position、active_positions、get_positions
+
+    板は seed_depth で記録した板情報から作成し、seed_trades で記録した約定履歴を流すと、
+    その価格で板に残っている注文が約定します。APIキーの区別はなく、残高は1つのアカウントで管理します。
+    get_positions は、約定せずに取り消した(cancel_position)ポジションの履歴を返します。
+    同期版・asyncio版(AsyncHttpConnection)のどちらからも使用できます。
+    '''
+
+    # 応答する要求のAPIのメソッド
+    PUBLIC_METHODS = ('depth', 'trades', 'last_price', 'ticker')
+
+    def __init__(self, balances: dict = None, clock=None, trades_size: int = 150):
+        '''
+        コンストラクタ
+        balances :
+            通貨ごとの初期残高
+        clock :
+            現在時刻(UNIX時間)を返す関数(既定はtime.time)。ReplayTransportと組み合わせる場合などに指定します。
+        trades_size :
+            通貨ペアごとに保持する約定履歴の件数
+        '''
+        self._funds = {currency: Decimal(str(amount)) for currency, amount in (balances or {}).items()}
+        self._deposit = dict(self._funds)
+        self._clock = clock if clock is not None else time.time
+        self._trades_size = trades_size
+        self._engines = {}
+        self._orders = {}
+        self._positions = {}
+        self._closed_positions = []
+        self._order_ids = itertools.count(1)
+        self._trade_count = 0
+        self._lock = threading.RLock()
+
+    def engine(self, currency_pair: str) -> MatchingEngine:
+        '''
+        通貨ペアの板を取得します。
+        '''
+        engine = self._engines.get(currency_pair)
+        if engine is None:
+            engine = self._engines[currency_pair] = MatchingEngine(currency_pair, self._trades_size)
+        return engine
+
+    @property
+    def balances(self) -> dict:
+        '''
+        通貨ごとの残高を取得します。fundsは利用可能な残高、depositは注文中の資金を含む残高です。
+        '''
+        with self._lock:
+            return {'funds': dict(self._funds), 'deposit': dict(self._deposit)}
+
+    def seed_depth(self, currency_pair: str, depth: dict):
+        '''
+        記録した板情報(Market.get_depthのレスポンス)で、板の他のユーザーの注文を置き換えます。
+        '''
+        with self._lock:
+            engine = self.engine(currency_pair)
+            engine.clear(None)
+            timestamp = self._clock()
+            for side, action in (('asks', MatchingEngine.ASK), ('bids', MatchingEngine.BID)):
+                for price, amount in depth.get(side) or []:
+                    order = SimulatedOrder(0, currency_pair, action, Decimal(str(price)), Decimal(str(amount)),
+                                           timestamp)
+                    self._settle(engine.submit(order, timestamp))
+            if engine.last_price is None:
+                bid, ask = engine.best(MatchingEngine.BID), engine.best(MatchingEngine.ASK)
+                if bid is not None and ask is not None:
+                    engine.last_price = (bid + ask) / 2
+
+    def seed_trades(self, currency_pair: str, trades: list) -> list:
+        '''
+        記録した約定履歴(Market.get_trade_historyのレスポンス)を古い順に流し、
+        その価格・数量で板に残っている注文を約定させます。約定(Fill)のリストを返します。
+        '''
+        with self._lock:
+            engine = self.engine(currency_pair)
+            fills = []
+            for trade in sorted(trades, key=lambda t: (t.get('date', 0), t.get('tid', 0))):
+                order = SimulatedOrder(0, currency_pair, trade['trade_type'], Decimal(str(trade['price'])),
+                                       Decimal(str(trade['amount'])), trade.get('date', self._clock()))
+                trade_fills = engine.submit(order, order.timestamp, rest=False)
+                self._settle(trade_fills)
+                fills.extend(trade_fills)
+                engine.last_price = order.price
+            return fills
+
+    @property
+    def supports_async(self) -> bool:
+        return True
+
+    def request(self, base_url: str, http_method: str, url: str, params: dict = None, data: str = None,
+                **kwargs) -> TransportResponse:
+        '''
+        HTTP要求に応答します。
+        '''
+        with self._lock:
+            if http_method == 'GET':
+                status_code, body = self._handle_get(url[len(base_url):], params or {})
+            else:
+                status_code, body = self._handle_post(self._parse_form(data or ''))
+            return TransportResponse(status_code, json.dumps(body, default=float).encode('utf-8'))
+
+    async def request_async(self, base_url: str, http_method: str, url: str, params: dict = None,
+                            data: str = None, **kwargs) -> TransportResponse:
+        '''
+        asyncio版(AsyncHttpConnection)からのHTTP要求に応答します。通信を行わないため、そのまま応答します。
+        '''
+        return self.request(base_url, http_method, url, params, data, **kwargs)
+
+    @staticmethod
+    def _parse_form(data: str) -> dict:
+        '''
+        POST要求の本文(application/x-www-form-urlencoded)をパースします。
+        '''
+        params = {}
+        for pair in data.split('&'):
+            name, _, value = pair.partition('=')
+            if '%' in value or '+' in value:
+                value = unquote_plus(value)
+            if name:
+                params[name] = value
+        return params
+
+    def _handle_get(self, path: str, params: dict) -> tuple:
+        '''
+        公開APIの要求に応答します。
+        '''
+        parts = [part for part in path.split('/') if part]
+        if len(parts) < 2 or parts[0] not in self.PUBLIC_METHODS:
+            return 404, {'error': 'not found'}
+        engine = self.engine(parts[-1])
+        if parts[0] == 'depth':
+            return 200, engine.depth()
+        if parts[0] == 'trades':
+            return 200, engine.trades
+        if parts[0] == 'last_price':
+            return 200, {'last_price': engine.last_price}
+        trades = engine.trades
+        volume = sum(trade['amount'] for trade in trades)
+        return 200, {
+            'last': engine.last_price,
+            'high': max((trade['price'] for trade in trades), default=engine.last_price),
+            'low': min((trade['price'] for trade in trades), default=engine.last_price),
+            'vwap': sum(trade['price'] * trade['amount'] for trade in trades) / volume if volume else engine.last_price,
+            'volume': volume,
+            'bid': engine.best(MatchingEngine.BID),
+            'ask': engine.best(MatchingEngine.ASK)
+        }
+
+    def _handle_post(self, params: dict) -> tuple:
+        '''
+        取引APIの要求に応答します。
+        '''
+        handler = getattr(self, '_api_' + params.get('method', ''), None)
+        if handler is None:
+            return 200, {'success': 0, 'error': 'invalid method'}
+        try:
+            return 200, {'success': 1, 'return': handler(params)}
+        except _ExchangeError as e:
+            return 200, {'success': 0, 'error': str(e)}
+
+    def _api_trade(self, params: dict) -> dict:
+        currency_pair = params['currency_pair']
+        action = self._action_of(params)
+        price = Decimal(params['price'])
+        amount = self._amount_of(params)
+        base, quote = currency_pair.split('_')
+
+        # 注文に必要な資金を確保
+        if action == MatchingEngine.BID:
+            self._lock_funds(quote, price * amount)
+        else:
+            self._lock_funds(base, amount)
+
+        timestamp = self._clock()
+        order = SimulatedOrder(next(self._order_ids), currency_pair, action, price, amount, timestamp,
+                               params.get('comment', ''), 'spot')
+        self._settle(self.engine(currency_pair).submit(order, timestamp))
+        if order.remains > 0:
+            self._orders[order.order_id] = order
+        return {
+            'received': amount - order.remains,
+            'remains': order.remains,
+            'order_id': order.order_id if order.remains > 0 else 0,
+            'funds': self._funds
+        }
+
+    def _api_cancel_order(self, params: dict) -> dict:
+        order = self._orders.pop(int(params['order_id']), None)
+        if order is None:
+            raise _ExchangeError('order not found')
+        remains = self.engine(order.currency_pair).cancel(order)
+        base, quote = order.currency_pair.split('_')
+        if order.action == MatchingEngine.BID:
+            self._funds[quote] += order.price * remains
+        else:
+            self._funds[base] += remains
+        return {'order_id': order.order_id, 'funds': self._funds}
+
+    def _api_active_orders(self, params: dict) -> dict:
+        currency_pair = params.get('currency_pair')
+        return {
+            str(order.order_id): {
+                'currency_pair': order.currency_pair,
+                'action': order.action,
+                'amount': order.remains,
+                'price': order.price,
+                'timestamp': str(int(order.timestamp)),
+                'comment': order.comment
+            }
+            for order in self._orders.values()
+            if currency_pair is None or order.currency_pair == currency_pair
+        }
+
+    def _api_get_info2(self, params: dict) -> dict:
+        return {
+            'funds': self._funds,
+            'deposit': self._deposit,
+            'rights': {'info': 1, 'trade': 1, 'withdraw': 0, 'personal_info': 0, 'id_info': 0},
+            'open_orders': len(self._orders),
+            'server_time': int(self._clock())
+        }
+
+    def _api_get_info(self, params: dict) -> dict:
+        info = self._api_get_info2(params)
+        info['trade_count'] = self._trade_count
+        return info
+
+    def _api_create_position(self, params: dict) -> dict:
+        currency_pair = params['currency_pair']
+        action = self._action_of(params)
+        price = Decimal(params['price'])
+        amount = self._amount_of(params)
+        leverage = Decimal(params['leverage'])
+        if leverage <= 0:
+            raise _ExchangeError('invalid leverage parameter')
+
+        # 証拠金を確保
+        deposit = price * amount / leverage
+        quote = currency_pair.split('_')[1]
+        self._lock_funds(quote, deposit)
+
+        timestamp = self._clock()
+        position = SimulatedPosition(next(self._order_ids), params.get('type'), int(params.get('group_id', 0)),
+                                     currency_pair, action, price, amount, leverage, deposit, timestamp)
+        order = SimulatedOrder(position.leverage_id, currency_pair, position.action, price, amount, timestamp,
+                               owner='margin', position=position)
+        position.order = order
+        self._positions[position.leverage_id] = position
+        self._settle(self.engine(currency_pair).submit(order, timestamp))
+        return {
+            'leverage_id': position.leverage_id,
+            'timestamp': str(int(timestamp)),
+            'term_end': 0,
+            'remains': order.remains,
+            'price_avg': position.price_avg,
+            'amount_done': position.amount_done,
+            'funds': self._funds
+        }
+
+    def _api_cancel_position(self, params: dict) -> dict:
+        position = self._positions.get(int(params['leverage_id']))
+        if position is None:
+            raise _ExchangeError('order not found')
+
+        # 約定していない数量を取り消し、その分の証拠金を返却
+        remains = self.engine(position.currency_pair).cancel(position.order)
+        refunded = position.deposit * remains / position.amount if position.amount else Decimal(0)
+        self._funds[position.currency_pair.split('_')[1]] += refunded
+        position.deposit -= refunded
+        position.refunded += refunded
+        position.amount = position.amount_done
+        timestamp = self._clock()
+        if position.amount_done == 0:
+            # 約定していないポジションは取り消し、履歴に残す
+            del self._positions[position.leverage_id]
+            position.timestamp_closed = timestamp
+            self._closed_positions.append(position)
+        return {
+            'leverage_id': position.leverage_id,
+            'fee_spent': 0,
+            'timestamp_closed': str(int(timestamp)),
+            'price_avg': position.price_avg,
+            'amount': position.amount,
+            'close_avg': 0,
+            'close_done': 0,
+            'deposit_jpy': position.deposit,
+            'refunded_jpy': refunded
+        }
+
+    def _api_active_positions(self, params: dict) -> dict:
+        currency_pair = params.get('currency_pair')
+        return {
+            str(position.leverage_id): {
+                'group_id': position.group_id,
+                'currency_pair': position.currency_pair,
+                'action': position.action,
+                'amount': position.amount,
+                'price': position.price,
+                'timestamp': str(int(position.timestamp)),
+                'leverage': position.leverage,
+                'price_avg': position.price_avg,
+                'amount_done': position.amount_done,
+                'deposit': position.deposit
+            }
+            for position in self._positions.values()
+            if currency_pair is None or position.currency_pair == currency_pair
+        }
+
+    def _api_get_positions(self, params: dict) -> dict:
+        '''
+        取り消したポジションの履歴を、currency_pair・since・end・from・count・from_id・end_id・orderで絞り込みます。
+        '''
+        currency_pair = params.get('currency_pair')
+        since = float(params.get('since') or 0)
+        end = float(params['end']) if params.get('end') else None
+        from_id = int(params.get('from_id') or 0)
+        end_id = int(params['end_id']) if params.get('end_id') else None
+        positions = [
+            position for position in self._closed_positions
+            if (currency_pair is None or position.currency_pair == currency_pair)
+            and since <= position.timestamp and (end is None or position.timestamp <= end)
+            and from_id <= position.leverage_id and (end_id is None or position.leverage_id <= end_id)
+        ]
+        if params.get('order', 'DESC') == 'DESC':
+            positions.reverse()
+        start = int(params.get('from') or 0)
+        result = {}
+        for position in positions[start:start + int(params.get('count') or 1000)]:
+            quote = position.currency_pair.split('_')[1]
+            result[str(position.leverage_id)] = {
+                'group_id': position.group_id,
+                'currency_pair': position.currency_pair,
+                'action': position.action,
+                'amount': position.amount,
+                'price': position.price,
+                'leverage': position.leverage,
+                'fee_spent': 0,
+                'timestamp': str(int(position.timestamp)),
+                'timestamp_closed': str(int(position.timestamp_closed)),
+                'price_avg': position.price_avg,
+                'amount_done': position.amount_done,
+                'close_avg': 0,
+                'close_done': 0,
+                'deposit_' + quote: position.deposit,
+                'refunded_' + quote: position.refunded,
+                'swap': 0
+            }
+        return result
+
+    def _action_of(self, params: dict) -> str:
+        action = params.get('action')
+        if action not in (MatchingEngine.BID, MatchingEngine.ASK):
+            raise _ExchangeError('invalid action parameter')
+        return action
+
+    def _amount_of(self, params: dict) -> Decimal:
+        amount = Decimal(params['amount'])
+        if amount <= 0:
+            raise _ExchangeError('invalid amount parameter')
+        return amount
+
+    def _lock_funds(self, currency: str, amount: Decimal):
+        '''
+        注文に必要な資金を、利用可能な残高から確保します。
+        '''
+        funds = self._funds.get(currency, Decimal(0))
+        if funds < amount:
+            raise _ExchangeError('insufficient funds')
+        self._funds[currency] = funds - amount
+
+    def _settle(self, fills: list):
+        '''
+        約定した注文の残高・ポジションを更新します。
+        '''
+        for fill in fills:
+            for order in (fill.maker, fill.taker):
+                if order.owner == 'spot':
+                    self._settle_spot(order, fill.price, fill.amount)
+                elif order.owner == 'margin':
+                    order.position.amount_done += fill.amount
+                    order.position.cost += fill.price * fill.amount
+
+    def _settle_spot(self, order: SimulatedOrder, price: Decimal, amount: Decimal):
+        '''
+        現物取引の注文の約定を残高に反映します。
+        '''
+        base, quote = order.currency_pair.split('_')
+        zero = Decimal(0)
+        if order.action == MatchingEngine.BID:
+            self._funds[base] = self._funds.get(base, zero) + amount
+            self._deposit[base] = self._deposit.get(base, zero) + amount
+            self._deposit[quote] = self._deposit.get(quote, zero) - price * amount
+            # 指値より安く約定した分は返却
+            self._funds[quote] += (order.price - price) * amount
+        else:
+            self._deposit[base] = self._deposit.get(base, zero) - amount
+            self._funds[quote] = self._funds.get(quote, zero) + price * amount
+            self._deposit[quote] = self._deposit.get(quote, zero) + price * amount
+        if order.remains == 0:
+            self._orders.pop(order.order_id, None)
+        self._trade_count += 1
+
+
+class _ExchangeError(Exception):
+    '''
+    模擬取引所がエラーとして応答するメッセージです。
+    '''
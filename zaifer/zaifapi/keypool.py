@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict
+
+from zaifer.zaifapi.connection import HttpConnection, UrlConfigs
+
+
+class KeyPool():
+    '''
+    複数のAPIキーを束ね、非公開APIの呼び出しを負荷の低いキーへ振り分けます。
+
+    ノンスの制約によりAPIキーごとに同時に処理できる要求は1つのため、
+    各キーの要求は直列化し、空いているキーへ新しい要求を割り当てます。
+    注文の取消・変更は、その注文を発注したキーへ送信します。
+    '''
+
+    # 発注結果から注文IDを記録するメソッドと、そのIDを指定するパラメータ
+    _ORDER_METHODS = {
+        'trade': 'order_id',
+        'create_position': 'leverage_id'
+    }
+
+    # 発注したキーへ固定して送信するメソッドと、注文IDを指定するパラメータ
+    _STICKY_METHODS = {
+        'cancel_order': 'order_id',
+        'cancel_position': 'leverage_id',
+        'change_position': 'leverage_id',
+        'position_history': 'leverage_id'
+    }
+
+    def __init__(self, credentials: list, affinity_size: int = 10000):
+        '''
+        コンストラクタ
+        credentials :
+            (key, secret)のリスト
+        affinity_size :
+            発注したキーを記憶しておく注文数の上限
+        '''
+        if not credentials:
+            raise ValueError('credentials must contain at least one key.')
+        self._credentials = [(key, secret) for key, secret in credentials]
+        self._affinity_size = affinity_size
+        self._affinity = OrderedDict()
+        self._condition = threading.Condition()
+        self._states = [{
+            'in_flight': 0,
+            'waiting': 0,
+            'requests': 0,
+            'sticky_requests': 0,
+            'errors': 0,
+            'busy_time': 0.0
+        } for _ in self._credentials]
+
+    def __len__(self) -> int:
+        return len(self._credentials)
+
+    def create_connection(self, base_url: str, url_config: UrlConfigs = None) -> 'KeyPoolConnection':
+        '''
+        キープールを使用するZaifAPIへの接続を作成します。
+        '''
+        return KeyPoolConnection(self, base_url, url_config)
+
+    @property
+    def credentials(self) -> list:
+        return list(self._credentials)
+
+    @property
+    def statistics(self) -> list:
+        '''
+        APIキーごとの利用状況を取得します。
+        '''
+        with self._condition:
+            statistics = []
+            for (key, _), state in zip(self._credentials, self._states):
+                requests_count = state['requests']
+                statistics.append({
+                    'key': key[:8],
+                    'in_flight': state['in_flight'],
+                    'waiting': state['waiting'],
+                    'requests': requests_count,
+                    'sticky_requests': state['sticky_requests'],
+                    'errors': state['errors'],
+                    'busy_time': state['busy_time'],
+                    'average_latency': state['busy_time'] / requests_count if requests_count else 0.0
+                })
+            return statistics
+
+    def _acquire(self, params: dict) -> int:
+        '''
+        要求を送信するAPIキーを選択し、そのキーを占有します。
+        '''
+        with self._condition:
+            index = self._find_sticky_key(params)
+            if index is not None:
+                # 注文を発注したキーが空くまで待つ
+                state = self._states[index]
+                state['waiting'] += 1
+                try:
+                    while state['in_flight'] > 0:
+                        self._condition.wait()
+                finally:
+                    state['waiting'] -= 1
+                state['sticky_requests'] += 1
+            else:
+                # 空いたキーのうち、最も負荷の低いキーを待機後に選び直す
+                index = self._find_idle_key()
+                while index is None:
+                    self._condition.wait()
+                    index = self._find_idle_key()
+                state = self._states[index]
+            state['in_flight'] += 1
+            return index
+
+    def _release(self, index: int, params: dict, response: dict, elapsed: float):
+        '''
+        APIキーの占有を解除し、発注したキーを記録します。
+        '''
+        with self._condition:
+            state = self._states[index]
+            state['in_flight'] -= 1
+            state['requests'] += 1
+            state['busy_time'] += elapsed
+            if response is None or response.get('success') == 0:
+                state['errors'] += 1
+            else:
+                self._remember_order(index, params, response)
+            self._condition.notify_all()
+
+    def _find_idle_key(self) -> int:
+        '''
+        空いているAPIキーのうち、最も負荷の低いキーを検索します。
+        取消・変更の要求が待っているキーは、その要求に譲ります。
+        '''
+        idle = [index for index, state in enumerate(self._states)
+                if state['in_flight'] == 0 and state['waiting'] == 0]
+        if not idle:
+            return None
+        return min(idle, key=self._load_of)
+
+    def _load_of(self, index: int) -> tuple:
+        '''
+        APIキーの負荷を取得します。
+        '''
+        state = self._states[index]
+        return (state['in_flight'] + state['waiting'], state['requests'])
+
+    def _find_sticky_key(self, params: dict) -> int:
+        '''
+        注文を発注したAPIキーを検索します。
+        '''
+        param = self._STICKY_METHODS.get(params.get('method'))
+        if param is None or param not in params:
+            return None
+        return self._affinity.get((param, str(params[param])))
+
+    def _remember_order(self, index: int, params: dict, response: dict):
+        '''
+        注文を発注したAPIキーを記録します。
+        '''
+        param = self._ORDER_METHODS.get(params.get('method'))
+        if param is None:
+            return
+        order_id = response.get('return', {}).get(param)
+        if not order_id:
+            return
+        self._affinity[(param, str(order_id))] = index
+        while len(self._affinity) > self._affinity_size:
+            self._affinity.popitem(last=False)
+
+
+class KeyPoolConnection():
+    '''
+    キープールを使用するZaifAPIへの接続を表します。
+    '''
+
+    def __init__(self, key_pool: KeyPool, base_url: str, url_config: UrlConfigs = None):
+        '''
+        コンストラクタ
+        '''
+        self._key_pool = key_pool
+        self._connections = [
+            HttpConnection(base_url, key, secret, url_config)
+            for key, secret in key_pool.credentials
+        ]
+
+    @property
+    def key_pool(self) -> KeyPool:
+        return self._key_pool
+
+    def post(self, method: str, params: dict) -> dict:
+        '''
+        負荷の低いAPIキーでPOST要求を送信します。
+        '''
+        params = {} if params is None else params
+        index = self._key_pool._acquire(params)
+        response = None
+        started = time.monotonic()
+        try:
+            response = self._connections[index].post(method, params)
+            return response
+        finally:
+            self._key_pool._release(
+                index, params, response, time.monotonic() - started)
+
+    def get(self, method: str, params: dict) -> dict:
+        '''
+        GET要求を送信します。
+        '''
+        return self._connections[0].get(method, params)
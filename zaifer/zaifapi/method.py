@@ -1,11 +1,18 @@
-import json
-import time
 from datetime import datetime
 from decimal import Decimal
 
-from zaifer.zaifapi.connection import (HttpConnection, NonceGenerator,
-                                       ResponseParser, UrlConfigs)
-from zaifer.zaifapi.utils import NumericConverter
+from zaifer.zaifapi.batch import BatchExecutor
+from zaifer.zaifapi.builder import (AccountRequestBuilder, ChartRequestBuilder,
+                                    MarginMarketRequestBuilder,
+                                    MarginTradeRequestBuilder,
+                                    MarketRequestBuilder, TradeRequestBuilder)
+from zaifer.zaifapi.columnar import ColumnarConverter
+from zaifer.zaifapi.connection import (HttpConnection, ResponseParser,
+                                       UrlConfigs)
+from zaifer.zaifapi.keypool import KeyPool
+from zaifer.zaifapi.model import ModelConverter
+from zaifer.zaifapi.ohlc import OhlcRangeFetcher
+from zaifer.zaifapi.pagination import HistoryIterator
 
 
 class Chart():
@@ -17,26 +24,33 @@ class Chart():
         '''
         コンストラクタ
         '''
-        self._connection = HttpConnection(url_config.chart_api_url)
+        self._connection = HttpConnection(url_config.chart_api_url, url_config=url_config)
+        self._decoder = url_config.market_decoder
 
-    def get_ohlc(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime) -> dict:
+    def get_ohlc(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime,
+                 columnar: bool = False) -> dict:
         '''
         チャート情報を取得します。
         period :
             1分足:1、5分足:5、15分足:15、30分足:30、1時間足:60、4時間足:240、8時間足:480、12時間足:720、1日足:D、1週足:W
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
         '''
-        params = {
-            'symbol': currency_pair,
-            'resolution': period,
-            'from': str(int(time.mktime(from_datetime.timetuple()))),
-            'to': str(int(time.mktime(to_datetime.timetuple())))
-        }
-        res = self._connection.get('/history', params)
-        # NOTE:取得に成功した場合、なぜか2度エンコードされているのでデコードも2度する
-        if isinstance(res, str):
-            return json.loads(res)
-        else:
-            return res
+        res = self._connection.get(*ChartRequestBuilder.get_ohlc(
+            currency_pair, period, from_datetime, to_datetime))
+        res = ResponseParser.parse_chart(res, self._decoder)
+        return ColumnarConverter.ohlc(res) if columnar else res
+
+    def get_ohlc_range(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime,
+                       max_workers: int = 4, candles_per_request: int = 1000, retries: int = 2,
+                       columnar: bool = False) -> dict:
+        '''
+        長期間のチャート情報を区間に分割して並列に取得します。
+        戻り値の形式はget_ohlcと同じで、ローソク足は時刻順に重複なく並びます。
+        '''
+        fetcher = OhlcRangeFetcher(self.get_ohlc, max_workers, candles_per_request, retries)
+        res = fetcher.fetch(currency_pair, period, from_datetime, to_datetime)
+        return ColumnarConverter.ohlc(res) if columnar else res
 
 
 class Account():
@@ -47,54 +61,46 @@ class Account():
     https://zaif-api-document.readthedocs.io/ja/latest/TradingAPI.html
     '''
 
-    def __init__(self, key, secret, url_config: UrlConfigs = UrlConfigs()):
+    def __init__(self, key, secret=None, url_config: UrlConfigs = UrlConfigs()):
         '''
         コンストラクタ
+        keyにKeyPoolを指定した場合、secretは不要です。
         '''
-        self._connection = HttpConnection(url_config.trade_api_url, key, secret)
+        self._connection = _create_private_connection(
+            url_config.trade_api_url, key, secret, url_config)
 
-    def get_info(self) -> dict:
+    def get_info(self, model: bool = False) -> dict:
         '''
         残高情報を取得します。
+        model :
+            Trueを指定した場合、funds・depositを通貨ごとのBalance(balances)に置き換えて返します。
         '''
-        params = {
-            'method': 'get_info',
-            'nonce': NonceGenerator.generate()
-        }
-        res = self._connection.post(None, params)
-        return ResponseParser.parse(res)
+        res = self._connection.post(*AccountRequestBuilder.get_info())
+        res = ResponseParser.parse(res)
+        return ModelConverter.balances(res) if model else res
 
-    def get_info2(self) -> dict:
+    def get_info2(self, model: bool = False) -> dict:
         '''
         残高情報を取得します。(軽量版)
+        model :
+            Trueを指定した場合、funds・depositを通貨ごとのBalance(balances)に置き換えて返します。
         '''
-        params = {
-            'method': 'get_info2',
-            'nonce': NonceGenerator.generate()
-        }
-        res = self._connection.post(None, params)
-        return ResponseParser.parse(res)
+        res = self._connection.post(*AccountRequestBuilder.get_info2())
+        res = ResponseParser.parse(res)
+        return ModelConverter.balances(res) if model else res
 
     def get_personal_info(self) -> dict:
         '''
         チャット情報を取得します。
         '''
-        params = {
-            'method': 'get_personal_info',
-            'nonce': NonceGenerator.generate()
-        }
-        res = self._connection.post(None, params)
+        res = self._connection.post(*AccountRequestBuilder.get_personal_info())
         return ResponseParser.parse(res)
 
     def get_id_info(self) -> dict:
         '''
         アカウント情報を取得します。
         '''
-        params = {
-            'method': 'get_id_info',
-            'nonce': NonceGenerator.generate()
-        }
-        res = self._connection.post(None, params)
+        res = self._connection.post(*AccountRequestBuilder.get_id_info())
         return ResponseParser.parse(res)
 
     def withdraw(self, currency: str, address: str, amount: Decimal,
@@ -102,18 +108,8 @@ class Account():
         '''
         出金を依頼します。
         '''
-        params = {
-            'method': 'withdraw',
-            'nonce': NonceGenerator.generate(),
-            'currency': currency,
-            'address': address,
-            'amount': amount
-        }
-        if message is not None:
-            params['message'] = message
-        if opt_fee is not None:
-            params['opt_fee'] = opt_fee
-        res = self._connection.post(None, params)
+        res = self._connection.post(*AccountRequestBuilder.withdraw(
+            currency, address, amount, message, opt_fee))
         return ResponseParser.parse(res)
 
     def get_deposit_history(self, currency: str, since: datetime = None, end: datetime = None,
@@ -122,26 +118,8 @@ class Account():
         '''
         入金履歴を取得します。
         '''
-        params = {
-            'method': 'deposit_history',
-            'nonce': NonceGenerator.generate(),
-            'currency': currency
-        }
-        if _from is not None:
-            params['from'] = str(_from)
-        if count is not None:
-            params['count'] = str(count)
-        if from_id is not None:
-            params['from_id'] = str(from_id)
-        if end_id is not None:
-            params['end_id'] = str(end_id)
-        if order is not None:
-            params['order'] = order
-        if since is not None:
-            params['since'] = str(int(time.mktime(since.timetuple())))
-        if end is not None:
-            params['end'] = str(int(time.mktime(end.timetuple())))
-        res = self._connection.post(None, params)
+        res = self._connection.post(*AccountRequestBuilder.get_deposit_history(
+            currency, since, end, _from, count, from_id, end_id, order))
         return ResponseParser.parse(res)
 
     def get_withdraw_history(self, currency: str, since: datetime = None, end: datetime = None,
@@ -150,28 +128,32 @@ class Account():
         '''
         出金履歴を取得します。
         '''
-        params = {
-            'method': 'withdraw_history',
-            'nonce': NonceGenerator.generate(),
-            'currency': currency
-        }
-        if _from is not None:
-            params['from'] = str(_from)
-        if count is not None:
-            params['count'] = str(count)
-        if from_id is not None:
-            params['from_id'] = str(from_id)
-        if end_id is not None:
-            params['end_id'] = str(end_id)
-        if order is not None:
-            params['order'] = order
-        if since is not None:
-            params['since'] = str(int(time.mktime(since.timetuple())))
-        if end is not None:
-            params['end'] = str(int(time.mktime(end.timetuple())))
-        res = self._connection.post(None, params)
+        res = self._connection.post(*AccountRequestBuilder.get_withdraw_history(
+            currency, since, end, _from, count, from_id, end_id, order))
         return ResponseParser.parse(res)
 
+    def iter_deposit_history(self, currency: str, since: datetime = None, end: datetime = None,
+                             from_id: int = None, end_id: int = None, order: str = 'ASC',
+                             page_size: int = 1000, prefetch: bool = True) -> HistoryIterator:
+        '''
+        入金履歴を全件取得するまでページを送りながら、1件ずつ(ID, 明細)を返します。
+        '''
+        return HistoryIterator(
+            lambda count, from_id, end_id, order: self.get_deposit_history(
+                currency, since, end, None, count, from_id, end_id, order),
+            page_size, order, from_id, end_id, prefetch)
+
+    def iter_withdraw_history(self, currency: str, since: datetime = None, end: datetime = None,
+                              from_id: int = None, end_id: int = None, order: str = 'ASC',
+                              page_size: int = 1000, prefetch: bool = True) -> HistoryIterator:
+        '''
+        出金履歴を全件取得するまでページを送りながら、1件ずつ(ID, 明細)を返します。
+        '''
+        return HistoryIterator(
+            lambda count, from_id, end_id, order: self.get_withdraw_history(
+                currency, since, end, None, count, from_id, end_id, order),
+            page_size, order, from_id, end_id, prefetch)
+
 
 class Market():
     '''
@@ -185,43 +167,61 @@ class Market():
         '''
         コンストラクタ
         '''
-        self._connection = HttpConnection(url_config.public_api_url)
+        self._connection = HttpConnection(url_config.public_api_url, url_config=url_config)
 
     def get_currencies(self, currency: str) -> dict:
         '''
         通貨情報を取得します。
         '''
-        return self._connection.get('/currencies/{}'.format(currency), None)
+        return self._connection.get(*MarketRequestBuilder.get_currencies(currency))
 
     def get_currency_pairs(self, currency_pair: str) -> dict:
         '''
         通貨ペア情報を取得します。
         '''
-        return self._connection.get('/currency_pairs/{}'.format(currency_pair), None)
+        return self._connection.get(*MarketRequestBuilder.get_currency_pairs(currency_pair))
 
     def get_last_price(self, currency_pair: str) -> dict:
         '''
         現在の終値を取得します。
         '''
-        return self._connection.get('/last_price/{}'.format(currency_pair), None)
+        return self._connection.get(*MarketRequestBuilder.get_last_price(currency_pair))
 
-    def get_ticker(self, currency_pair: str) -> dict:
+    def get_ticker(self, currency_pair: str, model: bool = False) -> dict:
         '''
         ティッカーを取得します。
+        model :
+            Trueを指定した場合、Tickerで返します。
         '''
-        return self._connection.get('/ticker/{}'.format(currency_pair), None)
+        res = self._connection.get(*MarketRequestBuilder.get_ticker(currency_pair))
+        return ModelConverter.ticker(res) if model else res
 
-    def get_trade_history(self, currency_pair: str) -> dict:
+    def get_trade_history(self, currency_pair: str, columnar: bool = False,
+                          model: bool = False) -> dict:
         '''
         全ユーザーの取引履歴を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、PublicTradeのリストで返します。
         '''
-        return self._connection.get('/trades/{}'.format(currency_pair), None)
+        res = self._connection.get(*MarketRequestBuilder.get_trade_history(currency_pair))
+        if columnar:
+            return ColumnarConverter.trades(res)
+        return ModelConverter.trades(res) if model else res
 
-    def get_depth(self, currency_pair: str) -> dict:
+    def get_depth(self, currency_pair: str, columnar: bool = False, model: bool = False) -> dict:
         '''
         板情報を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、DepthLevelのリストで返します。
         '''
-        return self._connection.get('/depth/{}'.format(currency_pair), None)
+        res = self._connection.get(*MarketRequestBuilder.get_depth(currency_pair))
+        if columnar:
+            return ColumnarConverter.depth(res)
+        return ModelConverter.depth(res) if model else res
 
 
 class Trade():
@@ -232,11 +232,13 @@ class Trade():
     https://zaif-api-document.readthedocs.io/ja/latest/TradingAPI.html
     '''
 
-    def __init__(self, key, secret, url_config: UrlConfigs = UrlConfigs()):
+    def __init__(self, key, secret=None, url_config: UrlConfigs = UrlConfigs()):
         '''
         コンストラクタ
+        keyにKeyPoolを指定した場合、secretは不要です。
         '''
-        self._connection = HttpConnection(url_config.trade_api_url, key, secret)
+        self._connection = _create_private_connection(
+            url_config.trade_api_url, key, secret, url_config)
 
     def get_trade_history(self, currency_pair: str = None, since: datetime = None, end: datetime = None,
                           _from: int = None, count: int = None,
@@ -245,83 +247,78 @@ class Trade():
         '''
         ユーザー自身の取引履歴を取得します。
         '''
-        params = {
-            'method': 'trade_history',
-            'nonce': NonceGenerator.generate()
-        }
-        if _from is not None:
-            params['from'] = str(_from)
-        if count is not None:
-            params['count'] = str(count)
-        if from_id is not None:
-            params['from_id'] = str(from_id)
-        if end_id is not None:
-            params['end_id'] = str(end_id)
-        if order is not None:
-            params['order'] = order
-        if since is not None:
-            params['since'] = str(int(time.mktime(since.timetuple())))
-        if end is not None:
-            params['end'] = str(int(time.mktime(end.timetuple())))
-        if currency_pair is not None:
-            params['currency_pair'] = currency_pair
-        if is_token is not None:
-            params['is_token'] = is_token
-        res = self._connection.post(None, params)
+        res = self._connection.post(*TradeRequestBuilder.get_trade_history(
+            currency_pair, since, end, _from, count, from_id, end_id, order, is_token))
         return ResponseParser.parse(res)
 
-    def get_active_orders(self, currency_pair: str = None, is_token: bool = None, is_token_both: bool = None) -> dict:
+    def iter_trade_history(self, currency_pair: str = None, since: datetime = None, end: datetime = None,
+                           from_id: int = None, end_id: int = None, order: str = 'ASC',
+                           is_token: bool = None, page_size: int = 1000, prefetch: bool = True) -> HistoryIterator:
+        '''
+        ユーザー自身の取引履歴を全件取得するまでページを送りながら、1件ずつ(ID, 明細)を返します。
+        '''
+        return HistoryIterator(
+            lambda count, from_id, end_id, order: self.get_trade_history(
+                currency_pair, since, end, None, count, from_id, end_id, order, is_token),
+            page_size, order, from_id, end_id, prefetch)
+
+    def get_active_orders(self, currency_pair: str = None, is_token: bool = None, is_token_both: bool = None,
+                          model: bool = False) -> dict:
         '''
         現在有効な注文一覧を取得します（未約定注文一覧）。
+        model :
+            Trueを指定した場合、ActiveOrderの辞書で返します。
         '''
-        params = {
-            'method': 'active_orders',
-            'nonce': NonceGenerator.generate()
-        }
-        if currency_pair is not None:
-            params['currency_pair'] = currency_pair
-        if is_token is not None:
-            params['is_token'] = str(is_token)
-        if is_token_both is not None:
-            params['is_token_both'] = str(is_token_both)
-        res = self._connection.post(None, params)
-        return ResponseParser.parse(res)
+        res = self._connection.post(*TradeRequestBuilder.get_active_orders(
+            currency_pair, is_token, is_token_both))
+        res = ResponseParser.parse(res)
+        return ModelConverter.active_orders(res) if model else res
 
     def open_order(self, currency_pair: str, action: str, price: Decimal, amount: Decimal, limit: Decimal = None, comment: str = None) -> dict:
         '''
         新規注文を送信します。
         '''
-        params = {
-            'method': 'trade',
-            'nonce': NonceGenerator.generate(),
-            'currency_pair': currency_pair,
-            'action': action,
-            'price': NumericConverter.decimal_to_str(price),
-            'amount': NumericConverter.decimal_to_str(amount)
-        }
-        if limit is not None:
-            params['limit'] = limit
-        if comment is not None:
-            params['comment'] = comment
-        res = self._connection.post(None, params)
+        res = self._connection.post(*TradeRequestBuilder.open_order(
+            currency_pair, action, price, amount, limit, comment))
         return ResponseParser.parse(res)
 
     def cancel_order(self, order_id: int, currency_pair: str = None, is_token: bool = None) -> dict:
         '''
         キャンセル注文を送信します。
         '''
-        params = {
-            'method': 'cancel_order',
-            'nonce': NonceGenerator.generate(),
-            'order_id': order_id
-        }
-        if currency_pair is not None:
-            params['currency_pair'] = currency_pair
-        if is_token is not None:
-            params['is_token'] = is_token
-        res = self._connection.post(None, params)
+        res = self._connection.post(*TradeRequestBuilder.cancel_order(
+            order_id, currency_pair, is_token))
         return ResponseParser.parse(res)
 
+    def open_orders(self, orders: list, max_workers: int = None) -> list:
+        '''
+        複数の新規注文を並列に送信し、注文ごとの結果をBatchResultのリストで返します。
+        orders :
+            open_orderの引数を表す辞書のリスト
+        max_workers :
+            同時に送信する要求の最大数。Noneの場合はAPIキーの数(KeyPoolを使用しない場合は1)とします。
+        '''
+        return BatchExecutor.for_connection(self._connection, max_workers).map(
+            lambda order: self.open_order(**order), orders)
+
+    def cancel_orders(self, order_ids: list, currency_pair: str = None, is_token: bool = None,
+                      max_workers: int = None) -> list:
+        '''
+        複数のキャンセル注文を並列に送信し、注文ごとの結果をBatchResultのリストで返します。
+        '''
+        return BatchExecutor.for_connection(self._connection, max_workers).map(
+            lambda order_id: self.cancel_order(order_id, currency_pair, is_token), order_ids)
+
+    def cancel_all(self, currency_pair: str = None, is_token: bool = None, max_workers: int = None) -> list:
+        '''
+        現在有効な注文をすべて取消し、注文ごとの結果をBatchResultのリストで返します。
+        '''
+        orders = self.get_active_orders(currency_pair, is_token)
+        return BatchExecutor.for_connection(self._connection, max_workers).map(
+            lambda order_id: self.cancel_order(
+                int(order_id), orders[order_id].get('currency_pair', currency_pair), is_token),
+            list(orders))
+
 
 class MarginMarket():
     '''
@@ -334,7 +331,7 @@ class MarginMarket():
         '''
         コンストラクタ
         '''
-        self._connection = HttpConnection(url_config.margin_public_api_url)
+        self._connection = HttpConnection(url_config.margin_public_api_url, url_config=url_config)
 
     def get_groups(self, group_id: str) -> dict:
         """
@@ -347,37 +344,59 @@ class MarginMarket():
             'all'を指定した場合、取引が終了したものを含むすべてのグループIDを取得します。
             'active'を指定した場合、現在取引可能なグループIDのみを取得します。
         """
-        return self._connection.get('/groups/{}'.format(str(group_id)), None)
+        return self._connection.get(*MarginMarketRequestBuilder.get_groups(group_id))
 
     def get_last_price(self, group_id: int, currency_pair: str) -> dict:
         '''
         現在の終値を取得します。
         '''
-        return self._connection.get('/last_price/{}/{}'.format(str(group_id), currency_pair), None)
+        return self._connection.get(*MarginMarketRequestBuilder.get_last_price(
+            group_id, currency_pair))
 
-    def get_ticker(self, group_id: int, currency_pair: str) -> dict:
+    def get_ticker(self, group_id: int, currency_pair: str, model: bool = False) -> dict:
         '''
         ティッカーを取得します。
+        model :
+            Trueを指定した場合、Tickerで返します。
         '''
-        return self._connection.get('/ticker/{}/{}'.format(str(group_id), currency_pair), None)
+        res = self._connection.get(*MarginMarketRequestBuilder.get_ticker(group_id, currency_pair))
+        return ModelConverter.ticker(res) if model else res
 
-    def get_trade_history(self, group_id: int, currency_pair: str) -> dict:
+    def get_trade_history(self, group_id: int, currency_pair: str, columnar: bool = False,
+                          model: bool = False) -> dict:
         '''
         全ユーザの取引履歴を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、PublicTradeのリストで返します。
         '''
-        return self._connection.get('/trades/{}/{}'.format(str(group_id), currency_pair), None)
+        res = self._connection.get(*MarginMarketRequestBuilder.get_trade_history(
+            group_id, currency_pair))
+        if columnar:
+            return ColumnarConverter.trades(res)
+        return ModelConverter.trades(res) if model else res
 
-    def get_depth(self, group_id: int, currency_pair: str) -> dict:
+    def get_depth(self, group_id: int, currency_pair: str, columnar: bool = False,
+                  model: bool = False) -> dict:
         '''
         板情報を取得します。
+        columnar :
+            Trueを指定した場合、列ごとのnumpy配列で返します。
+        model :
+            Trueを指定した場合、DepthLevelのリストで返します。
         '''
-        return self._connection.get('/depth/{}/{}'.format(str(group_id), currency_pair), None)
+        res = self._connection.get(*MarginMarketRequestBuilder.get_depth(group_id, currency_pair))
+        if columnar:
+            return ColumnarConverter.depth(res)
+        return ModelConverter.depth(res) if model else res
 
     def get_swap_history(self, group_id: int, currency_pair: str) -> dict:
         '''
         確定したスワップポイントの履歴を取得します。
         '''
-        return self._connection.get('/swap_history/{}/{}'.format(str(group_id), currency_pair), None)
+        return self._connection.get(*MarginMarketRequestBuilder.get_swap_history(
+            group_id, currency_pair))
 
 
 class MarginTrade():
@@ -389,135 +408,113 @@ class MarginTrade():
     https://zaif-api-document.readthedocs.io/ja/latest/AirFXAPI.html
     '''
 
-    def __init__(self, key, secret, url_config: UrlConfigs = UrlConfigs()):
+    def __init__(self, key, secret=None, url_config: UrlConfigs = UrlConfigs()):
         '''
         コンストラクタ
+        keyにKeyPoolを指定した場合、secretは不要です。
         '''
-        self._connection = HttpConnection(
-            url_config.margin_trade_api_url, key, secret)
+        self._connection = _create_private_connection(
+            url_config.margin_trade_api_url, key, secret, url_config)
 
     def get_positions(self, _type: str, group_id: int = None, currency_pair: str = None,
                       since: datetime = None, end: datetime = None, _from: int = None, count: int = None,
-                      from_id: int = None, end_id: int = None, order: str = None) -> dict:
+                      from_id: int = None, end_id: int = None, order: str = None,
+                      model: bool = False) -> dict:
         """
         証拠金取引のユーザー自身の取引履歴を取得します。
+        model :
+            Trueを指定した場合、Positionの辞書で返します。
         """
+        res = self._connection.post(*MarginTradeRequestBuilder.get_positions(
+            _type, group_id, currency_pair, since, end, _from, count, from_id, end_id, order))
+        res = ResponseParser.parse(res)
+        return ModelConverter.positions(res) if model else res
 
-        params = {
-            'method': 'get_positions',
-            'nonce': NonceGenerator.generate(),
-            'type': _type,
-        }
-        if group_id is not None:
-            params['group_id'] = group_id
-        if _from is not None:
-            params['from'] = str(_from)
-        if count is not None:
-            params['count'] = str(count)
-        if from_id is not None:
-            params['from_id'] = str(from_id)
-        if end_id is not None:
-            params['end_id'] = str(end_id)
-        if order is not None:
-            params['order'] = order
-        if since is not None:
-            params['since'] = str(int(time.mktime(since.timetuple())))
-        if end is not None:
-            params['end'] = str(int(time.mktime(end.timetuple())))
-        if currency_pair is not None:
-            params['currency_pair'] = currency_pair
-        res = self._connection.post(None, params)
-        return ResponseParser.parse(res)
+    def iter_positions(self, _type: str, group_id: int = None, currency_pair: str = None,
+                       since: datetime = None, end: datetime = None,
+                       from_id: int = None, end_id: int = None, order: str = 'ASC',
+                       page_size: int = 1000, prefetch: bool = True) -> HistoryIterator:
+        '''
+        証拠金取引のユーザー自身の取引履歴を全件取得するまでページを送りながら、1件ずつ(ID, 明細)を返します。
+        '''
+        return HistoryIterator(
+            lambda count, from_id, end_id, order: self.get_positions(
+                _type, group_id, currency_pair, since, end, None, count, from_id, end_id, order),
+            page_size, order, from_id, end_id, prefetch)
 
     def get_position_history(self, _type: str, group_id: int, order_id: int) -> dict:
         '''
         証拠金取引のユーザー自身の取引履歴の明細を取得します。
         '''
-        params = {
-            'method': 'position_history',
-            'nonce': NonceGenerator.generate(),
-            'type': _type,
-            'leverage_id': order_id
-        }
-        if group_id is not None:
-            params['group_id'] = group_id
-        res = self._connection.post(None, params)
+        res = self._connection.post(*MarginTradeRequestBuilder.get_position_history(
+            _type, group_id, order_id))
         return ResponseParser.parse(res)
 
-    def get_active_positions(self, _type: str, group_id: int = None, currency_pair: str = None) -> dict:
+    def get_active_positions(self, _type: str, group_id: int = None, currency_pair: str = None,
+                             model: bool = False) -> dict:
         '''
         証拠金取引の現在有効な注文一覧を取得します（未約定注文一覧）。
+        model :
+            Trueを指定した場合、Positionの辞書で返します。
         '''
-        params = {
-            'method': 'active_positions',
-            'nonce': NonceGenerator.generate(),
-            'type': _type
-        }
-        if group_id is not None:
-            params['group_id'] = group_id
-        if currency_pair is not None:
-            params['currency_pair'] = currency_pair
-        res = self._connection.post(None, params)
-        return ResponseParser.parse(res)
+        res = self._connection.post(*MarginTradeRequestBuilder.get_active_positions(
+            _type, group_id, currency_pair))
+        res = ResponseParser.parse(res)
+        return ModelConverter.positions(res) if model else res
 
     def create_position(self, _type: str, group_id: int, currency_pair: str, action: str, price: Decimal, amount: Decimal, leverage: Decimal, limit: Decimal = None, stop: Decimal = None) -> dict:
         '''
         証拠金取引の新規注文を送信します。
         '''
-        params = {
-            'method': 'create_position',
-            'nonce': NonceGenerator.generate(),
-            'type': _type,
-            'currency_pair': currency_pair,
-            'action': action,
-            'price': price,
-            'amount': amount,
-            'leverage': leverage
-        }
-        if group_id is not None:
-            params['group_id'] = group_id
-        if limit is not None:
-            params['limit'] = limit
-        if stop is not None:
-            params['stop'] = stop
-        res = self._connection.post(None, params)
+        res = self._connection.post(*MarginTradeRequestBuilder.create_position(
+            _type, group_id, currency_pair, action, price, amount, leverage, limit, stop))
         return ResponseParser.parse(res)
 
     def update_position(self, _type: str, group_id: int, order_id: int, price: Decimal, limit: Decimal = None, stop: Decimal = None) -> dict:
         '''
         証拠金取引の修正注文を送信します。
         '''
-        params = {
-            'method': 'change_position',
-            'nonce': NonceGenerator.generate(),
-            'type': _type,
-            'leverage_id': order_id,
-            'price': price,
-        }
-        if group_id is not None:
-            params['group_id'] = group_id
-        if limit is not None:
-            params['limit'] = limit
-        if stop is not None:
-            params['stop'] = stop
-        res = self._connection.post(None, params)
+        res = self._connection.post(*MarginTradeRequestBuilder.update_position(
+            _type, group_id, order_id, price, limit, stop))
         return ResponseParser.parse(res)
 
     def cancel_position(self, _type: str, group_id: int, order_id: int) -> dict:
         '''
         証拠金取引のキャンセル注文を送信します。
         '''
-        params = {
-            'method': 'cancel_position',
-            'nonce': NonceGenerator.generate(),
-            'type': _type,
-            'leverage_id': order_id
-        }
-        if group_id is not None:
-            params['group_id'] = group_id
-        res = self._connection.post(None, params)
+        res = self._connection.post(*MarginTradeRequestBuilder.cancel_position(
+            _type, group_id, order_id))
         return ResponseParser.parse(res)
 
+    def create_positions(self, _type: str, positions: list, max_workers: int = None) -> list:
+        '''
+        証拠金取引の複数の新規注文を並列に送信し、注文ごとの結果をBatchResultのリストで返します。
+        positions :
+            create_positionの_type以外の引数を表す辞書のリスト
+        max_workers :
+            同時に送信する要求の最大数。Noneの場合はAPIキーの数(KeyPoolを使用しない場合は1)とします。
+        '''
+        return BatchExecutor.for_connection(self._connection, max_workers).map(
+            lambda position: self.create_position(_type, **position), positions)
+
+    def cancel_positions(self, _type: str, group_id: int, order_ids: list, max_workers: int = None) -> list:
+        '''
+        証拠金取引の複数のキャンセル注文を並列に送信し、注文ごとの結果をBatchResultのリストで返します。
+        '''
+        return BatchExecutor.for_connection(self._connection, max_workers).map(
+            lambda order_id: self.cancel_position(_type, group_id, order_id), order_ids)
+
+    def cancel_all(self, _type: str, group_id: int = None, currency_pair: str = None,
+                   max_workers: int = None) -> list:
+        '''
+        証拠金取引の現在有効な注文をすべて取消し、注文ごとの結果をBatchResultのリストで返します。
+        '''
+        positions = self.get_active_positions(_type, group_id, currency_pair)
+        return BatchExecutor.for_connection(self._connection, max_workers).map(
+            lambda order_id: self.cancel_position(
+                _type, positions[order_id].get('group_id', group_id), int(order_id)),
+            list(positions))
+
 
 class AirFXMarket():
     '''
@@ -543,31 +540,40 @@ class AirFXMarket():
             currency_pair=self._currency_pair
         )
 
-    def get_ticker(self) -> dict:
+    def get_ticker(self, model: bool = False) -> dict:
         '''
         ティッカーを取得します。
+        model :
+            Trueを指定した場合、Tickerで返します。
         '''
         return self._margin_market.get_ticker(
             group_id=self._group_id,
-            currency_pair=self._currency_pair
+            currency_pair=self._currency_pair,
+            model=model
         )
 
-    def get_trade_history(self) -> dict:
+    def get_trade_history(self, model: bool = False) -> dict:
         '''
         全ユーザの取引履歴を取得します。
+        model :
+            Trueを指定した場合、PublicTradeのリストで返します。
         '''
         return self._margin_market.get_trade_history(
             group_id=self._group_id,
-            currency_pair=self._currency_pair
+            currency_pair=self._currency_pair,
+            model=model
         )
 
-    def get_depth(self) -> dict:
+    def get_depth(self, model: bool = False) -> dict:
         '''
         板情報を取得します。
+        model :
+            Trueを指定した場合、DepthLevelのリストで返します。
         '''
         return self._margin_market.get_depth(
             group_id=self._group_id,
-            currency_pair=self._currency_pair
+            currency_pair=self._currency_pair,
+            model=model
         )
 
     def get_swap_history(self) -> dict:
@@ -599,9 +605,12 @@ class AirFXTrade():
 
     def get_positions(self, since: datetime = None, end: datetime = None,
                       _from: int = None, count: int = None,
-                      from_id: int = None, end_id: int = None, order: str = None) -> dict:
+                      from_id: int = None, end_id: int = None, order: str = None,
+                      model: bool = False) -> dict:
         '''
         証拠金取引のユーザー自身の取引履歴を取得します。
+        model :
+            Trueを指定した場合、Positionの辞書で返します。
         '''
         return self._margin_trade.get_positions(
             _type=self._type,
@@ -613,7 +622,27 @@ class AirFXTrade():
             count=count,
             from_id=from_id,
             end_id=end_id,
-            order=order
+            order=order,
+            model=model
+        )
+
+    def iter_positions(self, since: datetime = None, end: datetime = None,
+                       from_id: int = None, end_id: int = None, order: str = 'ASC',
+                       page_size: int = 1000, prefetch: bool = True) -> HistoryIterator:
+        '''
+        証拠金取引のユーザー自身の取引履歴を全件取得するまでページを送りながら、1件ずつ(ID, 明細)を返します。
+        '''
+        return self._margin_trade.iter_positions(
+            _type=self._type,
+            group_id=self._group_id,
+            currency_pair=self._currency_pair,
+            since=since,
+            end=end,
+            from_id=from_id,
+            end_id=end_id,
+            order=order,
+            page_size=page_size,
+            prefetch=prefetch
         )
 
     def get_position_history(self, order_id: int) -> dict:
@@ -626,14 +655,15 @@ class AirFXTrade():
             order_id=order_id
         )
 
-    def get_active_positions(self) -> dict:
+    def get_active_positions(self, model: bool = False) -> dict:
         '''
         証拠金取引の現在有効な注文一覧を取得します（未約定注文一覧）。
         '''
         return self._margin_trade.get_active_positions(
             _type=self._type,
             group_id=self._group_id,
-            currency_pair=self._currency_pair
+            currency_pair=self._currency_pair,
+            model=model
         )
 
     def create_position(self, action: str, price: Decimal, amount: Decimal, leverage: Decimal, limit: Decimal = None, stop: Decimal = None) -> dict:
@@ -674,3 +704,47 @@ class AirFXTrade():
             group_id=self._group_id,
             order_id=order_id
         )
+
+    def create_positions(self, positions: list, max_workers: int = None) -> list:
+        '''
+        証拠金取引の複数の新規注文を並列に送信し、注文ごとの結果をBatchResultのリストで返します。
+        positions :
+            create_positionの引数を表す辞書のリスト
+        '''
+        return self._margin_trade.create_positions(
+            _type=self._type,
+            positions=[dict(position, group_id=self._group_id, currency_pair=self._currency_pair)
+                       for position in positions],
+            max_workers=max_workers
+        )
+
+    def cancel_positions(self, order_ids: list, max_workers: int = None) -> list:
+        '''
+        証拠金取引の複数のキャンセル注文を並列に送信し、注文ごとの結果をBatchResultのリストで返します。
+        '''
+        return self._margin_trade.cancel_positions(
+            _type=self._type,
+            group_id=self._group_id,
+            order_ids=order_ids,
+            max_workers=max_workers
+        )
+
+    def cancel_all(self, max_workers: int = None) -> list:
+        '''
+        証拠金取引の現在有効な注文をすべて取消し、注文ごとの結果をBatchResultのリストで返します。
+        '''
+        return self._margin_trade.cancel_all(
+            _type=self._type,
+            group_id=self._group_id,
+            currency_pair=self._currency_pair,
+            max_workers=max_workers
+        )
+
+
+def _create_private_connection(base_url: str, key, secret: str, url_config: UrlConfigs):
+    '''
+    非公開APIへの接続を作成します。
+    '''
+    if isinstance(key, KeyPool):
+        return key.create_connection(base_url, url_config)
+    return HttpConnection(base_url, key, secret, url_config)
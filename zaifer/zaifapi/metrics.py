@@ -0,0 +1,296 @@
+import bisect
+import threading
+import time
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class RequestTrace():
+    '''
+    HTTP要求1回分の計測結果を表します。
+
+    phasesには、区間ごとの所要時間(秒)を次の名前で保持します。
+        build : パラメータのエンコード
+        sign :  署名
+        connect : 接続の確立(新しい接続を確立した場合のみ)
+        send :  要求の送信
+        ttfb :  送信してからレスポンスのヘッダーを受信するまで
+        read :  レスポンスの本文の受信
+        decode : JSONのデコード
+        parse : レスポンスの検証(ResponseParser.error_of、取引APIのみ)
+    '''
+
+    __slots__ = ('http_method', 'family', 'api_method', 'phases', 'status', 'error',
+                 'started', 'elapsed', '_last')
+
+    PHASES = ('build', 'sign', 'connect', 'send', 'ttfb', 'read', 'decode', 'parse')
+
+    _active = threading.local()
+
+    def __init__(self, http_method: str, family: str, api_method: str):
+        '''
+        コンストラクタ
+        http_method :
+            'GET'または'POST'
+        family :
+            エンドポイント種別(public, trade, margin, chart)
+        api_method :
+            APIのメソッド名(取引APIはmethodパラメータ、公開APIはパスの先頭)
+        '''
+        self.http_method = http_method
+        self.family = family
+        self.api_method = api_method
+        self.phases = {}
+        self.status = None
+        self.error = None
+        self.started = time.perf_counter()
+        self.elapsed = None
+        self._last = self.started
+
+    def mark(self, phase: str):
+        '''
+        前回の区切りから現在までの時間を、区間の所要時間に加算します。
+        '''
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def finish(self, error: Exception = None):
+        '''
+        計測を終了します。
+        '''
+        self.error = error
+        self.elapsed = time.perf_counter() - self.started
+
+    def activate(self):
+        '''
+        実行中のスレッドで送信する要求の接続・送信・受信を、この計測に記録します。
+        '''
+        RequestTrace._active.trace = self
+
+    @staticmethod
+    def deactivate():
+        RequestTrace._active.trace = None
+
+    @staticmethod
+    def current() -> 'RequestTrace':
+        '''
+        実行中のスレッドで記録中の計測を取得します。
+        '''
+        return getattr(RequestTrace._active, 'trace', None)
+
+
+class _TracedConnectionMixin():
+    '''
+    接続の確立・要求の送信・ヘッダーの受信を、記録中の計測に区切ります。
+    '''
+
+    def connect(self):
+        trace = RequestTrace.current()
+        if trace is None:
+            return super().connect()
+        trace.mark('send')
+        super().connect()
+        trace.mark('connect')
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        trace = RequestTrace.current()
+        if trace is not None:
+            trace.mark('send')
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        trace = RequestTrace.current()
+        if trace is not None:
+            trace.mark('ttfb')
+        return response
+
+
+class TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+
+# SessionPoolが接続に使用する接続プール
+TRACED_POOL_CLASSES = {
+    'http': TracedHTTPConnectionPool,
+    'https': TracedHTTPSConnectionPool
+}
+
+
+class Instrumentation():
+    '''
+    HTTP要求の前後に呼び出されるフックです。UrlConfigs.instrumentationに設定して使用します。
+    設定しない場合(既定)は計測を行いません。
+    '''
+
+    def before_request(self, trace: RequestTrace):
+        '''
+        要求を送信する前に呼び出されます。
+        '''
+        pass
+
+    def after_request(self, trace: RequestTrace):
+        '''
+        レスポンスを受信した後(失敗した場合は例外が送出された後)に呼び出されます。
+        '''
+        pass
+
+
+class _Histogram():
+    '''
+    所要時間の分布を表します。
+    '''
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, buckets: tuple, value: float):
+        index = bisect.bisect_left(buckets, value)
+        if index < len(buckets):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsAggregator(Instrumentation):
+    '''
+    HTTP要求の計測結果をメモリ上に集計し、Prometheusのテキスト形式で出力します。
+
+    エンドポイント種別・APIのメソッドごとに、所要時間と区間ごとの所要時間の分布、
+    ステータスコードごとの要求数、例外の種類ごとのエラー数を集計します。
+    '''
+
+    # 所要時間の分布の区切り(秒)
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS, prefix: str = 'zaifer'):
+        '''
+        コンストラクタ
+        buckets :
+            所要時間の分布の区切り(秒)
+        prefix :
+            出力するメトリクス名の接頭辞
+        '''
+        self._buckets = tuple(sorted(buckets))
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._phases = {}
+        self._requests = {}
+        self._errors = {}
+
+    @property
+    def buckets(self) -> tuple:
+        return self._buckets
+
+    def after_request(self, trace: RequestTrace):
+        '''
+        計測結果を集計します。
+        '''
+        labels = (trace.family, trace.api_method)
+        status = 'none' if trace.status is None else str(trace.status)
+        with self._lock:
+            self._observe(self._durations, labels, trace.elapsed)
+            for phase, elapsed in trace.phases.items():
+                self._observe(self._phases, labels + (phase,), elapsed)
+            key = labels + (status,)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if trace.error is not None:
+                key = labels + (type(trace.error).__name__,)
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def reset(self):
+        '''
+        集計結果を破棄します。
+        '''
+        with self._lock:
+            self._durations.clear()
+            self._phases.clear()
+            self._requests.clear()
+            self._errors.clear()
+
+    def snapshot(self) -> dict:
+        '''
+        集計結果を辞書で取得します。所要時間は(件数, 合計秒数)で返します。
+        '''
+        with self._lock:
+            return {
+                'durations': {key: (h.count, h.sum) for key, h in self._durations.items()},
+                'phases': {key: (h.count, h.sum) for key, h in self._phases.items()},
+                'requests': dict(self._requests),
+                'errors': dict(self._errors)
+            }
+
+    def export_prometheus(self) -> str:
+        '''
+        集計結果をPrometheusのテキスト形式で出力します。
+        '''
+        prefix = self._prefix
+        lines = []
+        with self._lock:
+            self._export_histograms(
+                lines, prefix + '_request_duration_seconds', 'Time spent on an HTTP request.',
+                ('family', 'method'), self._durations)
+            self._export_histograms(
+                lines, prefix + '_request_phase_duration_seconds', 'Time spent on each phase of an HTTP request.',
+                ('family', 'method', 'phase'), self._phases)
+            self._export_counters(
+                lines, prefix + '_requests_total', 'HTTP requests by status code.',
+                ('family', 'method', 'status'), self._requests)
+            self._export_counters(
+                lines, prefix + '_request_errors_total', 'Failed HTTP requests by exception class.',
+                ('family', 'method', 'error'), self._errors)
+        return '\n'.join(lines) + '\n'
+
+    def _observe(self, histograms: dict, key: tuple, value: float):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = _Histogram(len(self._buckets))
+        histogram.observe(self._buckets, value)
+
+    def _export_histograms(self, lines: list, name: str, help_text: str, label_names: tuple, histograms: dict):
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} histogram'.format(name))
+        for key in sorted(histograms, key=str):
+            histogram = histograms[key]
+            labels = self._format_labels(label_names, key)
+            cumulative = 0
+            for bound, count in zip(self._buckets, histogram.counts):
+                cumulative += count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, repr(float(bound)), cumulative))
+            lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, histogram.count))
+            lines.append('{}_sum{{{}}} {}'.format(name, labels, repr(histogram.sum)))
+            lines.append('{}_count{{{}}} {}'.format(name, labels, histogram.count))
+
+    def _export_counters(self, lines: list, name: str, help_text: str, label_names: tuple, counters: dict):
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} counter'.format(name))
+        for key in sorted(counters, key=str):
+            lines.append('{}{{{}}} {}'.format(name, self._format_labels(label_names, key), counters[key]))
+
+    @staticmethod
+    def _format_labels(label_names: tuple, values: tuple) -> str:
+        return ','.join('{}="{}"'.format(name, MetricsAggregator._escape(value))
+                        for name, value in zip(label_names, values))
+
+    @staticmethod
+    def _escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
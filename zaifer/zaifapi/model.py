@@ -0,0 +1,243 @@
+from collections import namedtuple
+from collections.abc import Mapping, Sequence
+
+
+class ResponseModel():
+    '''
+    レスポンスの明細を表すモデルの基底クラスです。
+
+    項目は__slots__で定義した属性に保持し、辞書を持たないため明細あたりのメモリが少なく済みます。
+    定義されていない項目はextraに保持します。辞書と同じく model['price'] の形式でも参照できます。
+    '''
+
+    __slots__ = ('extra',)
+
+    def __init__(self, payload: dict = None, **values):
+        '''
+        コンストラクタ
+        payload :
+            デコードしたレスポンスの明細
+        values :
+            明細より優先して設定する項目
+        '''
+        payload = {} if payload is None else payload
+        fields = self.__slots__
+        get = payload.get
+        for name in fields:
+            setattr(self, name, get(name))
+        for name, value in values.items():
+            setattr(self, name, value)
+        extra_names = payload.keys() - fields
+        self.extra = {name: payload[name] for name in extra_names} if extra_names else None
+
+    def to_dict(self) -> dict:
+        '''
+        辞書に変換します。
+        '''
+        result = dict(self.extra) if self.extra else {}
+        for name in self.__slots__:
+            result[name] = getattr(self, name)
+        return result
+
+    def __getitem__(self, name: str):
+        if name in self.__slots__:
+            return getattr(self, name)
+        if self.extra and name in self.extra:
+            return self.extra[name]
+        raise KeyError(name)
+
+    def get(self, name: str, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def __eq__(self, other) -> bool:
+        if type(self) is not type(other):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__))
+
+
+class Ticker(ResponseModel):
+    '''
+    ティッカーを表します。
+    '''
+
+    __slots__ = ('last', 'high', 'low', 'vwap', 'volume', 'bid', 'ask')
+
+
+class PublicTrade(ResponseModel):
+    '''
+    全ユーザーの取引履歴の約定を表します。
+    '''
+
+    __slots__ = ('date', 'price', 'amount', 'tid', 'currency_pair', 'trade_type')
+
+
+class ActiveOrder(ResponseModel):
+    '''
+    現在有効な注文を表します。
+    '''
+
+    __slots__ = ('order_id', 'currency_pair', 'action', 'amount', 'price', 'timestamp', 'comment')
+
+
+class Position(ResponseModel):
+    '''
+    証拠金取引の注文(ポジション)を表します。
+    '''
+
+    __slots__ = ('order_id', 'group_id', 'currency_pair', 'action', 'amount', 'price', 'limit', 'stop',
+                 'leverage', 'fee_spent', 'timestamp', 'timestamp_closed', 'price_avg', 'amount_done',
+                 'close_avg', 'close_done', 'deposit', 'deposit_price_avg', 'refunded', 'swap')
+
+
+class Balance(ResponseModel):
+    '''
+    通貨ごとの残高を表します。fundsは利用可能な残高、depositは注文中の資金を含む残高です。
+    '''
+
+    __slots__ = ('currency', 'funds', 'deposit')
+
+
+DepthLevel = namedtuple('DepthLevel', ['price', 'amount'])
+DepthLevel.__doc__ = '''
+板情報の価格帯を表します。
+'''
+
+
+class ModelList(Sequence):
+    '''
+    明細のリストを、参照されたときに1件ずつモデルへ変換するリストです。
+    変換したモデルは元の明細と置き換えて保持します。
+    '''
+
+    __slots__ = ('_items', '_factory')
+
+    def __init__(self, items: list, factory):
+        '''
+        コンストラクタ
+        items :
+            デコードしたレスポンスの明細のリスト(キャッシュと共有しないよう複製して保持します)
+        factory :
+            明細からモデルを作成する関数
+        '''
+        self._items = list(items or [])
+        self._factory = factory
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._items)))]
+        item = self._items[index]
+        if isinstance(item, (dict, list)):
+            item = self._factory(item)
+            self._items[index] = item
+        return item
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, list(self))
+
+
+class ModelMapping(Mapping):
+    '''
+    IDをキーとする明細の辞書を、参照されたときに1件ずつモデルへ変換する辞書です。
+    キーはモデルの key_name の項目にも整数として設定します。
+    '''
+
+    __slots__ = ('_items', '_factory', '_key_name')
+
+    def __init__(self, items: dict, factory, key_name: str):
+        '''
+        コンストラクタ
+        items :
+            デコードしたレスポンスの明細の辞書(キャッシュと共有しないよう複製して保持します)
+        factory :
+            明細からモデルを作成するモデルクラス
+        key_name :
+            キーを設定する項目名
+        '''
+        self._items = dict(items or {})
+        self._factory = factory
+        self._key_name = key_name
+
+    def __getitem__(self, key):
+        item = self._items[key]
+        if isinstance(item, dict):
+            item = self._factory(item, **{self._key_name: int(key)})
+            self._items[key] = item
+        return item
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return '{}({!r})'.format(type(self).__name__, dict(self))
+
+
+class ModelConverter():
+    '''
+    デコードしたレスポンスをモデルに変換します。明細のリスト・辞書は参照されたときに変換します。
+    '''
+
+    @staticmethod
+    def ticker(response: dict) -> Ticker:
+        '''
+        ティッカーをTickerに変換します。
+        '''
+        return Ticker(response)
+
+    @staticmethod
+    def trades(response: list) -> ModelList:
+        '''
+        全ユーザーの取引履歴をPublicTradeのリストに変換します。
+        '''
+        return ModelList(response, PublicTrade)
+
+    @staticmethod
+    def depth(response: dict) -> dict:
+        '''
+        板情報を、asks・bidsそれぞれDepthLevelのリストに変換します。
+        '''
+        return {side: ModelList(response.get(side), DepthLevel._make) for side in ('asks', 'bids')}
+
+    @staticmethod
+    def active_orders(response: dict) -> dict:
+        '''
+        現在有効な注文一覧を、注文IDをキーとするActiveOrderの辞書に変換します。
+        '''
+        # is_token_bothを指定した場合は、現物とトークンの注文一覧に分かれている
+        if 'active_orders' in response:
+            return {name: ModelMapping(orders, ActiveOrder, 'order_id')
+                    for name, orders in response.items()}
+        return ModelMapping(response, ActiveOrder, 'order_id')
+
+    @staticmethod
+    def positions(response: dict) -> ModelMapping:
+        '''
+        証拠金取引の注文一覧・取引履歴を、注文IDをキーとするPositionの辞書に変換します。
+        '''
+        return ModelMapping(response, Position, 'order_id')
+
+    @staticmethod
+    def balances(response: dict) -> dict:
+        '''
+        残高情報のfunds・depositを、通貨をキーとするBalanceの辞書(balances)に置き換えます。
+        '''
+        result = dict(response)
+        funds = result.pop('funds', None) or {}
+        deposit = result.pop('deposit', None) or {}
+        result['balances'] = {
+            currency: Balance(currency=currency, funds=funds.get(currency), deposit=deposit.get(currency))
+            for currency in sorted(set(funds) | set(deposit))
+        }
+        return result
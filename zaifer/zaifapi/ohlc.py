@@ -0,0 +1,114 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from zaifer.zaifapi.utils import TimeConverter
+
+
+class OhlcRangeFetcher():
+    '''
+    長期間のチャート情報を足の種類に応じた区間に分割し、並列に取得して結合します。
+    '''
+
+    # 足の種類ごとの秒数
+    PERIOD_SECONDS = {
+        '1': 60,
+        '5': 300,
+        '15': 900,
+        '30': 1800,
+        '60': 3600,
+        '240': 14400,
+        '480': 28800,
+        '720': 43200,
+        'D': 86400,
+        'W': 604800
+    }
+
+    def __init__(self, get_ohlc, max_workers: int = 4, candles_per_request: int = 1000,
+                 retries: int = 2, retry_delay: float = 0.5):
+        '''
+        コンストラクタ
+        get_ohlc :
+            get_ohlc(currency_pair, period, from_datetime, to_datetime)の形式で1区間を取得する関数
+        max_workers :
+            同時に送信する要求の最大数
+        candles_per_request :
+            1回の要求で取得するローソク足の本数
+        retries :
+            取得に失敗した区間を再試行する回数
+        retry_delay :
+            再試行までの待機秒数(試行ごとに倍増)
+        '''
+        self._get_ohlc = get_ohlc
+        self._max_workers = max_workers
+        self._candles_per_request = candles_per_request
+        self._retries = retries
+        self._retry_delay = retry_delay
+
+    @classmethod
+    def period_seconds(cls, period: str) -> int:
+        '''
+        足の種類の秒数を取得します。
+        '''
+        try:
+            return cls.PERIOD_SECONDS[str(period)]
+        except KeyError:
+            raise ValueError('unsupported period: {}'.format(period))
+
+    def split(self, period: str, from_datetime: datetime, to_datetime: datetime) -> list:
+        '''
+        取得期間を1回の要求で取得できる区間に分割します。
+        '''
+        span = self.period_seconds(period) * self._candles_per_request
+        start = int(TimeConverter.datetime_to_unixtime(from_datetime))
+        stop = int(TimeConverter.datetime_to_unixtime(to_datetime))
+        chunks = []
+        while start < stop:
+            end = min(start + span, stop)
+            chunks.append((TimeConverter.unixtime_to_datetime(start),
+                           TimeConverter.unixtime_to_datetime(end)))
+            start = end
+        return chunks
+
+    def fetch(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime) -> dict:
+        '''
+        チャート情報を取得します。戻り値の形式はChart.get_ohlcと同じです。
+        '''
+        chunks = self.split(period, from_datetime, to_datetime)
+        if not chunks:
+            return {'ohlc_data': []}
+
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(chunks))) as executor:
+            results = list(executor.map(
+                lambda chunk: self._fetch_chunk(currency_pair, period, chunk[0], chunk[1]), chunks))
+        return self.merge(results)
+
+    @staticmethod
+    def merge(results: list) -> dict:
+        '''
+        区間ごとのチャート情報を時刻順に結合し、重複するローソク足を取り除きます。
+        '''
+        candles = {}
+        merged = {}
+        for result in results:
+            for key, value in result.items():
+                if key != 'ohlc_data':
+                    merged.setdefault(key, value)
+            for candle in result.get('ohlc_data') or []:
+                candles[candle['time']] = candle
+        merged['ohlc_data'] = [candles[key] for key in sorted(candles)]
+        return merged
+
+    def _fetch_chunk(self, currency_pair: str, period: str, from_datetime: datetime, to_datetime: datetime) -> dict:
+        '''
+        1区間のチャート情報を取得します。失敗した場合は再試行します。
+        '''
+        attempt = 0
+        while True:
+            try:
+                return self._get_ohlc(currency_pair, period, from_datetime, to_datetime)
+            except Exception:
+                if attempt >= self._retries:
+                    raise
+            time.sleep(self._retry_delay * (2 ** attempt))
+            attempt += 1
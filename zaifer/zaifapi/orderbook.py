@@ -0,0 +1,198 @@
+import bisect
+from array import array
+from collections import namedtuple
+
+DepthDiff = namedtuple('DepthDiff', ['side', 'price', 'amount', 'previous_amount'])
+DepthDiff.__doc__ = '''
+板の価格帯ごとの変化を表します。amountが0の場合、その価格帯は消滅しています。
+'''
+
+
+class OrderBook():
+    '''
+    板情報(Market.get_depth / MarginMarket.get_depth)のスナップショットから板を構築します。
+
+    価格帯は配列で価格順に保持し、最良気配はO(1)で、累積数量・約定平均価格は
+    累積和の二分探索で取得できます。スナップショットを更新するたびに前回との差分を計算し、
+    購読者へ通知します。
+    '''
+
+    ASKS = 'asks'
+    BIDS = 'bids'
+
+    def __init__(self, depth: dict = None):
+        '''
+        コンストラクタ
+        depth :
+            初期状態とする板情報
+        '''
+        self._sides = {
+            self.ASKS: _BookSide(self.ASKS, []),
+            self.BIDS: _BookSide(self.BIDS, [])
+        }
+        self._listeners = []
+        if depth is not None:
+            self.update(depth)
+
+    def subscribe(self, listener):
+        '''
+        板の差分を受け取る関数を登録します。関数はDepthDiffのリストを引数に呼び出されます。
+        '''
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        '''
+        登録した関数を解除します。
+        '''
+        self._listeners.remove(listener)
+
+    def update(self, depth: dict) -> list:
+        '''
+        板情報のスナップショットで板を更新し、前回との差分を返します。
+        '''
+        diffs = []
+        for side in (self.ASKS, self.BIDS):
+            previous = self._sides[side]
+            current = _BookSide(side, depth.get(side) or [])
+            diffs.extend(previous.diff(current))
+            self._sides[side] = current
+
+        if diffs:
+            for listener in list(self._listeners):
+                listener(diffs)
+        return diffs
+
+    @property
+    def best_ask(self) -> tuple:
+        '''
+        最良売気配の(価格, 数量)を取得します。売気配がない場合はNoneを返します。
+        '''
+        return self._sides[self.ASKS].best()
+
+    @property
+    def best_bid(self) -> tuple:
+        '''
+        最良買気配の(価格, 数量)を取得します。買気配がない場合はNoneを返します。
+        '''
+        return self._sides[self.BIDS].best()
+
+    @property
+    def spread(self) -> float:
+        '''
+        最良売気配と最良買気配の価格差を取得します。
+        '''
+        best_ask, best_bid = self.best_ask, self.best_bid
+        if best_ask is None or best_bid is None:
+            return None
+        return best_ask[0] - best_bid[0]
+
+    @property
+    def mid_price(self) -> float:
+        '''
+        最良売気配と最良買気配の中値を取得します。
+        '''
+        best_ask, best_bid = self.best_ask, self.best_bid
+        if best_ask is None or best_bid is None:
+            return None
+        return (best_ask[0] + best_bid[0]) / 2
+
+    def levels(self, side: str) -> list:
+        '''
+        価格帯の(価格, 数量)を最良気配から順に取得します。
+        '''
+        return self._sides[side].levels()
+
+    def cumulative_amount(self, side: str, price: float = None, depth: int = None) -> float:
+        '''
+        最良気配から指定した価格まで、または指定した価格帯の数までの累積数量を取得します。
+        '''
+        return self._sides[side].cumulative_amount(price, depth)
+
+    def vwap(self, side: str, amount: float) -> float:
+        '''
+        指定した数量を板から約定させた場合の平均価格を取得します。
+        買う場合は'asks'、売る場合は'bids'を指定します。板の数量が不足する場合はNoneを返します。
+        '''
+        return self._sides[side].vwap(amount)
+
+
+class _BookSide():
+    '''
+    板の片側(売気配または買気配)を表します。
+    '''
+
+    def __init__(self, side: str, levels: list):
+        '''
+        コンストラクタ
+        '''
+        self._side = side
+        ascending = side == OrderBook.ASKS
+        levels = [(float(price), float(amount)) for price, amount in levels]
+        levels.sort(key=lambda level: level[0], reverse=not ascending)
+
+        # 二分探索のため、買気配は価格の符号を反転したキーで昇順に並べる
+        self._prices = array('d', (price for price, _ in levels))
+        self._amounts = array('d', (amount for _, amount in levels))
+        self._keys = self._prices if ascending else array('d', (-price for price, _ in levels))
+        self._cumulative_amounts = array('d')
+        self._cumulative_notionals = array('d')
+        total_amount = total_notional = 0.0
+        for price, amount in levels:
+            total_amount += amount
+            total_notional += price * amount
+            self._cumulative_amounts.append(total_amount)
+            self._cumulative_notionals.append(total_notional)
+        self._index = dict(levels)
+
+    def best(self) -> tuple:
+        '''
+        最良気配を取得します。
+        '''
+        if not self._prices:
+            return None
+        return self._prices[0], self._amounts[0]
+
+    def levels(self) -> list:
+        '''
+        価格帯を最良気配から順に取得します。
+        '''
+        return list(zip(self._prices, self._amounts))
+
+    def cumulative_amount(self, price: float = None, depth: int = None) -> float:
+        '''
+        累積数量を取得します。
+        '''
+        count = len(self._prices)
+        if price is not None:
+            key = price if self._side == OrderBook.ASKS else -price
+            count = bisect.bisect_right(self._keys, key)
+        if depth is not None:
+            count = min(count, depth)
+        return self._cumulative_amounts[count - 1] if count > 0 else 0.0
+
+    def vwap(self, amount: float) -> float:
+        '''
+        指定した数量を約定させた場合の平均価格を取得します。
+        '''
+        if amount <= 0 or not self._prices or amount > self._cumulative_amounts[-1]:
+            return None
+        index = bisect.bisect_left(self._cumulative_amounts, amount)
+        filled_amount = self._cumulative_amounts[index - 1] if index > 0 else 0.0
+        filled_notional = self._cumulative_notionals[index - 1] if index > 0 else 0.0
+        notional = filled_notional + (amount - filled_amount) * self._prices[index]
+        return notional / amount
+
+    def diff(self, current: '_BookSide') -> list:
+        '''
+        現在の板との差分を取得します。
+        '''
+        diffs = []
+        previous_index = self._index
+        for price, amount in current._index.items():
+            previous_amount = previous_index.get(price, 0.0)
+            if amount != previous_amount:
+                diffs.append(DepthDiff(self._side, price, amount, previous_amount))
+        for price, previous_amount in previous_index.items():
+            if price not in current._index:
+                diffs.append(DepthDiff(self._side, price, 0.0, previous_amount))
+        return diffs
@@ -0,0 +1,107 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HistoryIterator():
+    '''
+    履歴取得APIをIDで区切りながら順に取得し、1件ずつ(ID, 明細)を返すイテレーターです。
+
+    メモリに保持するのは取得中のページと先読みしたページのみです。
+    中断した場合は cursor を from_id(昇順)または end_id(降順)に指定して再開できます。
+    '''
+
+    def __init__(self, fetch, page_size: int = 1000, order: str = 'ASC',
+                 from_id: int = None, end_id: int = None, prefetch: bool = True):
+        '''
+        コンストラクタ
+        fetch :
+            fetch(count, from_id, end_id, order)の形式で1ページ分の履歴を取得する関数
+        page_size :
+            1回の要求で取得する件数
+        order :
+            'ASC'(古い順)または'DESC'(新しい順)
+        prefetch :
+            次のページをバックグラウンドで先読みするか
+        '''
+        order = order.upper()
+        if order not in ('ASC', 'DESC'):
+            raise ValueError('order must be ASC or DESC.')
+        self._fetch = fetch
+        self._page_size = page_size
+        self._order = order
+        self._from_id = from_id
+        self._end_id = end_id
+        self._cursor = from_id if order == 'ASC' else end_id
+        self._executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        self._next_page = None
+        self._page = []
+        self._exhausted = False
+
+    @property
+    def cursor(self) -> int:
+        '''
+        次に取得する明細のIDの境界を取得します。
+        '''
+        return self._cursor
+
+    def __iter__(self) -> 'HistoryIterator':
+        return self
+
+    def __next__(self) -> tuple:
+        while not self._page:
+            if self._exhausted:
+                self.close()
+                raise StopIteration
+            self._load_page()
+
+        record_id, record = self._page.pop()
+        self._cursor = record_id + 1 if self._order == 'ASC' else record_id - 1
+        return record_id, record
+
+    def __enter__(self) -> 'HistoryIterator':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        '''
+        先読みを停止し、イテレーターを終了します。
+        '''
+        self._exhausted = True
+        self._page = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._next_page = None
+
+    def _load_page(self):
+        '''
+        次のページを取得し、続くページを先読みします。
+        '''
+        if self._next_page is not None:
+            page = self._next_page.result()
+            self._next_page = None
+        else:
+            page = self._request(self._cursor)
+        page = page or {}
+
+        records = sorted(
+            ((int(record_id), record) for record_id, record in page.items()),
+            key=lambda item: item[0], reverse=self._order == 'ASC')
+        if len(records) < self._page_size:
+            self._exhausted = True
+        elif self._executor is not None:
+            last_id = records[0][0]
+            next_cursor = last_id + 1 if self._order == 'ASC' else last_id - 1
+            self._next_page = self._executor.submit(self._request, next_cursor)
+
+        # 末尾から取り出すため、返却順の逆順に保持する
+        self._page = records
+
+    def _request(self, cursor: int) -> dict:
+        '''
+        カーソルの位置から1ページ分の履歴を取得します。
+        '''
+        if self._order == 'ASC':
+            return self._fetch(self._page_size, cursor, self._end_id, self._order)
+        return self._fetch(self._page_size, self._from_id, cursor, self._order)
@@ -0,0 +1,288 @@
+import hashlib
+import heapq
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from zaifer.zaifapi.connection import UrlConfigs
+from zaifer.zaifapi.method import MarginMarket, Market
+
+_logger = logging.getLogger(__name__)
+
+PollEvent = namedtuple('PollEvent', ['endpoint', 'currency_pair', 'group_id', 'data', 'timestamp'])
+PollEvent.__doc__ = '''
+MarketPollerが取得した、前回から変化したレスポンスを表します。
+group_idは証拠金取引のグループID(現物取引の場合はNone)、
+dataはMarket.get_tickerまたはMarket.get_depthと同じ形式です。
+'''
+
+
+class _Subscription():
+    '''
+    (エンドポイント, 通貨ペア, グループID)ごとの取得状態を表します。
+    '''
+
+    __slots__ = ('key', 'listeners', 'interval', 'digest', 'removed',
+                 'polls', 'changes', 'errors', 'last_error', 'listener_errors')
+
+    def __init__(self, key: tuple, interval: float):
+        self.key = key
+        self.listeners = []
+        self.interval = interval
+        self.digest = None
+        self.removed = False
+        self.polls = 0
+        self.changes = 0
+        self.errors = 0
+        self.last_error = None
+        self.listener_errors = 0
+
+
+class MarketPoller():
+    '''
+    複数の通貨ペアのティッカー・板情報を定期的に取得し、変化した場合のみ購読者に通知します。
+
+    レスポンスのハッシュ値を前回と比較し、同じ場合は通知しません。
+    取得間隔は通貨ペアごとに、変化した場合は短く、変化しない場合は長く調整します(min_interval〜max_interval)。
+    取得は最大max_workers個のスレッドで行い、subscribe で登録した関数は取得したスレッドから呼び出されます。
+    登録した関数で発生した例外はログに出力し、statisticsのlistener_errorsに数えます(他の購読者への通知と取得は続けます)。
+    '''
+
+    ENDPOINTS = ('ticker', 'depth')
+
+    def __init__(self, url_config: UrlConfigs = UrlConfigs(), max_workers: int = 4,
+                 min_interval: float = 1.0, max_interval: float = 10.0, backoff: float = 1.5,
+                 jitter: float = 0.1, error_listener=None):
+        '''
+        コンストラクタ
+        max_workers :
+            同時に取得するスレッドの最大数
+        min_interval :
+            取得間隔の最小値(秒)。購読を開始した直後と、変化した直後の取得間隔です。
+        max_interval :
+            取得間隔の最大値(秒)
+        backoff :
+            変化しなかった場合に取得間隔に掛ける倍率。変化した場合はこの値で割ります。
+        jitter :
+            取得間隔をランダムにずらす割合(0.1の場合は±10%)
+        error_listener :
+            取得に失敗した場合に、error_listener(endpoint, currency_pair, group_id, error)の形式で呼び出す関数
+        '''
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError('intervals must satisfy 0 < min_interval <= max_interval.')
+        if backoff < 1:
+            raise ValueError('backoff must be at least 1.')
+        self._market = Market(url_config)
+        self._margin_market = MarginMarket(url_config)
+        self._max_workers = max_workers
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._backoff = backoff
+        self._jitter = jitter
+        self._error_listener = error_listener
+        self._subscriptions = {}
+        self._schedule = []
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._executor = None
+        self._futures = set()
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        購読ごとの取得回数・変化した回数・エラー件数・購読者で発生した例外の件数・現在の取得間隔を取得します。
+        キーは(エンドポイント, 通貨ペア, グループID)です。
+        '''
+        with self._condition:
+            return {key: {'polls': s.polls, 'changes': s.changes, 'errors': s.errors,
+                          'listener_errors': s.listener_errors, 'interval': s.interval,
+                          'last_error': s.last_error}
+                    for key, s in self._subscriptions.items()}
+
+    def subscribe(self, endpoint: str, currency_pair: str, listener, group_id: int = None):
+        '''
+        ティッカーまたは板情報の変化を受け取る関数を登録します。関数はPollEventを引数に呼び出されます。
+        endpoint :
+            'ticker'または'depth'
+        group_id :
+            証拠金取引のグループID。指定した場合はMarginMarketから取得します。
+        '''
+        if endpoint not in self.ENDPOINTS:
+            raise ValueError('unsupported endpoint: {}'.format(endpoint))
+        key = (endpoint, currency_pair, group_id)
+        with self._condition:
+            subscription = self._subscriptions.get(key)
+            if subscription is None:
+                subscription = self._subscriptions[key] = _Subscription(key, self._min_interval)
+                if self._thread is not None:
+                    self._push(subscription, self._first_due())
+            subscription.listeners.append(listener)
+
+    def unsubscribe(self, endpoint: str, currency_pair: str, listener, group_id: int = None):
+        '''
+        登録した関数を解除します。購読者がいなくなった場合は取得を停止します。
+        '''
+        key = (endpoint, currency_pair, group_id)
+        with self._condition:
+            subscription = self._subscriptions[key]
+            subscription.listeners.remove(listener)
+            if not subscription.listeners:
+                subscription.removed = True
+                del self._subscriptions[key]
+
+    def start(self):
+        '''
+        取得を開始します。
+        '''
+        if self._thread is not None:
+            return
+        with self._condition:
+            self._stopping = False
+            self._schedule = []
+            self._futures = set()
+            for subscription in self._subscriptions.values():
+                self._push(subscription, self._first_due())
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                thread_name_prefix='zaifer-poller')
+            self._thread = threading.Thread(target=self._run, name='zaifer-poller-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        '''
+        取得を停止し、実行中の取得の終了を最大timeout秒待ちます(Noneの場合は終了するまで待ちます)。
+        開始していない取得は取り消します。timeout以内に終了しなかった取得はスレッドプールで実行を続け、
+        終了時に購読者を呼び出すことがあります。
+        '''
+        if self._thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        with self._condition:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        wait(futures, None if deadline is None else max(deadline - time.monotonic(), 0))
+        self._thread = None
+        self._executor = None
+
+    def __enter__(self) -> 'MarketPoller':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _first_due(self) -> float:
+        '''
+        購読を開始したときに取得する時刻を、同時に登録した購読が重ならないようにずらして返します。
+        '''
+        return time.monotonic() + random.uniform(0, self._min_interval * self._jitter)
+
+    def _push(self, subscription: _Subscription, due: float):
+        '''
+        次に取得する時刻を予定に追加します。
+        '''
+        self._sequence += 1
+        heapq.heappush(self._schedule, (due, self._sequence, subscription))
+        self._condition.notify()
+
+    def _run(self):
+        '''
+        予定の時刻になった購読の取得を、スレッドプールに渡します。
+        '''
+        with self._condition:
+            while not self._stopping:
+                now = time.monotonic()
+                while self._schedule and self._schedule[0][0] <= now:
+                    _, _, subscription = heapq.heappop(self._schedule)
+                    if subscription.removed:
+                        continue
+                    future = self._executor.submit(self._poll, subscription)
+                    self._futures.add(future)
+                    future.add_done_callback(self._poll_done)
+                timeout = self._schedule[0][0] - now if self._schedule else None
+                self._condition.wait(timeout)
+
+    def _poll_done(self, future):
+        '''
+        終了した取得を、実行中の取得から除きます。
+        '''
+        with self._condition:
+            self._futures.discard(future)
+
+    def _poll(self, subscription: _Subscription):
+        '''
+        1回取得し、変化した場合は購読者に通知してから、次に取得する時刻を予定に追加します。
+        '''
+        endpoint, currency_pair, group_id = subscription.key
+        event = None
+        error = None
+        try:
+            data = self._fetch(endpoint, currency_pair, group_id)
+            # デコードした値の表現から計算する(同じレスポンスからは同じ表現が得られる)
+            digest = hashlib.blake2b(repr(data).encode(), digest_size=16).digest()
+        except Exception as e:
+            error = e
+
+        with self._condition:
+            subscription.polls += 1
+            if error is not None:
+                subscription.errors += 1
+                subscription.last_error = repr(error)
+                changed = False
+            else:
+                changed = digest != subscription.digest
+                subscription.digest = digest
+            if changed:
+                subscription.changes += 1
+                subscription.interval = max(self._min_interval, subscription.interval / self._backoff)
+                event = PollEvent(endpoint, currency_pair, group_id, data, time.time())
+            else:
+                subscription.interval = min(self._max_interval, subscription.interval * self._backoff)
+            listeners = list(subscription.listeners)
+
+        if event is not None:
+            for listener in listeners:
+                try:
+                    listener(event)
+                except Exception:
+                    self._listener_failed(subscription)
+        elif error is not None and self._error_listener is not None:
+            try:
+                self._error_listener(endpoint, currency_pair, group_id, error)
+            except Exception:
+                self._listener_failed(subscription)
+
+        with self._condition:
+            if not subscription.removed and not self._stopping:
+                interval = subscription.interval * (1 + random.uniform(-self._jitter, self._jitter))
+                self._push(subscription, time.monotonic() + interval)
+
+    def _listener_failed(self, subscription: _Subscription):
+        '''
+        購読者で発生した例外を記録します。
+        '''
+        with self._condition:
+            subscription.listener_errors += 1
+        _logger.exception('poller listener failed: %s', subscription.key)
+
+    def _fetch(self, endpoint: str, currency_pair: str, group_id: int) -> dict:
+        '''
+        ティッカーまたは板情報を取得します。
+        '''
+        if group_id is None:
+            if endpoint == 'ticker':
+                return self._market.get_ticker(currency_pair)
+            return self._market.get_depth(currency_pair)
+        if endpoint == 'ticker':
+            return self._margin_market.get_ticker(group_id, currency_pair)
+        return self._margin_market.get_depth(group_id, currency_pair)
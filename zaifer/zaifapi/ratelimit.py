@@ -0,0 +1,217 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+
+class TokenBucket():
+    '''
+    トークンバケットによる送信レートを表します。
+    '''
+
+    def __init__(self, rate: float, capacity: float):
+        '''
+        コンストラクタ
+        rate :
+            1秒あたりに補充するトークン数
+        capacity :
+            バケットに保持できるトークンの最大数(バースト数)
+        '''
+        self._rate = float(rate)
+        self._capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def capacity(self) -> float:
+        return self._capacity
+
+    def reserve(self, now: float) -> float:
+        '''
+        トークンを1つ取得します。
+        取得できた場合は0を、取得できない場合は次のトークンが補充されるまでの秒数を返します。
+        '''
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self._rate
+
+    def delay(self, now: float) -> float:
+        '''
+        次のトークンを取得できるまでの秒数を、トークンを消費せずに返します。
+        '''
+        tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        return 0.0 if tokens >= 1.0 else (1.0 - tokens) / self._rate
+
+
+class RateLimiter():
+    '''
+    エンドポイント種別(public, trade, margin, chart)ごとに送信レートを制限します。
+
+    送信待ちの要求は優先度順に処理され、注文の取消が最優先、
+    次いで新規注文・注文変更、最後に参照系の要求が送信されます。
+    '''
+
+    PRIORITY_CANCEL = 0
+    PRIORITY_ORDER = 1
+    PRIORITY_READ = 2
+
+    # 非公開APIのメソッドごとの優先度
+    _METHOD_PRIORITIES = {
+        'cancel_order': PRIORITY_CANCEL,
+        'cancel_position': PRIORITY_CANCEL,
+        'trade': PRIORITY_ORDER,
+        'create_position': PRIORITY_ORDER,
+        'change_position': PRIORITY_ORDER
+    }
+
+    # asyncio版で、先頭以外の要求が順番を確認し直す最短の間隔(秒)
+    _ASYNC_POLL_INTERVAL = 0.005
+
+    # エンドポイント種別ごとの既定の(1秒あたりの送信数, バースト数)
+    DEFAULT_RATES = {
+        'public': (5.0, 10.0),
+        'trade': (2.0, 5.0),
+        'margin': (2.0, 5.0),
+        'chart': (1.0, 5.0)
+    }
+
+    def __init__(self, rates: dict = None):
+        '''
+        コンストラクタ
+        rates :
+            エンドポイント種別ごとの(1秒あたりの送信数, バースト数)
+        '''
+        rates = dict(self.DEFAULT_RATES, **({} if rates is None else rates))
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._buckets = {}
+        self._queues = {}
+        self._statistics = {}
+        for family, (rate, capacity) in rates.items():
+            self._buckets[family] = TokenBucket(rate, capacity)
+            self._queues[family] = []
+            self._statistics[family] = {
+                'requests': 0,
+                'max_queue_depth': 0,
+                'total_wait': 0.0,
+                'max_wait': 0.0
+            }
+
+    @classmethod
+    def priority_of(cls, params: dict) -> int:
+        '''
+        要求の優先度を取得します。
+        '''
+        if not params:
+            return cls.PRIORITY_READ
+        return cls._METHOD_PRIORITIES.get(params.get('method'), cls.PRIORITY_READ)
+
+    def acquire(self, family: str, priority: int = PRIORITY_READ) -> float:
+        '''
+        送信可能になるまで待機し、待機した秒数を返します。
+        '''
+        if family not in self._buckets:
+            return 0.0
+
+        started = time.monotonic()
+        queue = self._queues[family]
+        bucket = self._buckets[family]
+        with self._condition:
+            entry = self._enqueue(family, priority)
+            try:
+                while True:
+                    if queue[0] is entry:
+                        wait = bucket.reserve(time.monotonic())
+                        if wait == 0.0:
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+            finally:
+                self._dequeue(family, entry)
+            return self._record(family, started)
+
+    async def acquire_async(self, family: str, priority: int = PRIORITY_READ) -> float:
+        '''
+        イベントループを止めずに送信可能になるまで待機し、待機した秒数を返します。
+        待機中はスレッドを占有せず、次のトークンが補充される時刻まで asyncio.sleep で待ちます。
+        '''
+        if family not in self._buckets:
+            return 0.0
+
+        started = time.monotonic()
+        queue = self._queues[family]
+        bucket = self._buckets[family]
+        with self._condition:
+            entry = self._enqueue(family, priority)
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    if queue[0] is entry:
+                        wait = bucket.reserve(now)
+                        if wait == 0.0:
+                            break
+                    else:
+                        # 先頭の要求が送信されるまで待ち、順番を確認し直す
+                        wait = max(bucket.delay(now), self._ASYNC_POLL_INTERVAL)
+                await asyncio.sleep(wait)
+        finally:
+            with self._condition:
+                self._dequeue(family, entry)
+        with self._condition:
+            return self._record(family, started)
+
+    def _enqueue(self, family: str, priority: int) -> tuple:
+        '''
+        送信待ちの要求を待ち行列に追加します。
+        '''
+        queue = self._queues[family]
+        entry = (priority, next(self._sequence))
+        heapq.heappush(queue, entry)
+        statistics = self._statistics[family]
+        statistics['max_queue_depth'] = max(statistics['max_queue_depth'], len(queue))
+        return entry
+
+    def _dequeue(self, family: str, entry: tuple):
+        '''
+        送信待ちの要求を待ち行列から取り除き、待機中のスレッドに通知します。
+        '''
+        queue = self._queues[family]
+        queue.remove(entry)
+        heapq.heapify(queue)
+        self._condition.notify_all()
+
+    def _record(self, family: str, started: float) -> float:
+        '''
+        待機した秒数を集計し、その秒数を返します。
+        '''
+        waited = time.monotonic() - started
+        statistics = self._statistics[family]
+        statistics['requests'] += 1
+        statistics['total_wait'] += waited
+        statistics['max_wait'] = max(statistics['max_wait'], waited)
+        return waited
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        エンドポイント種別ごとの待ち行列の深さと待機時間を取得します。
+        '''
+        with self._condition:
+            statistics = {}
+            for family, values in self._statistics.items():
+                requests_count = values['requests']
+                statistics[family] = dict(
+                    values,
+                    queue_depth=len(self._queues[family]),
+                    average_wait=values['total_wait'] / requests_count if requests_count else 0.0)
+            return statistics
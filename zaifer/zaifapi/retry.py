@@ -0,0 +1,155 @@
+import random
+import sys
+import threading
+
+import requests
+
+from zaifer.zaifapi.exception import *
+
+
+class RetryPolicy():
+    '''
+    失敗した要求を再試行するかを判定し、再試行までの待機時間を決定します。
+
+    失敗は理由ごとに再試行可能・致命的に分類されます。
+    再試行は上限付きの指数バックオフ(フルジッター)で行い、
+    新規注文や出金など重複が許されないメソッドは、
+    サーバーが要求を処理していないことが確実な場合のみ再試行します。
+    '''
+
+    REASON_NONCE = 'nonce'
+    REASON_TRADE_UNAVAILABLE = 'trade_unavailable'
+    REASON_TIMEOUT = 'timeout'
+    REASON_SERVER_ERROR = 'server_error'
+    REASON_THROTTLED = 'throttled'
+    REASON_CONNECT = 'connect'
+    REASON_CONNECTION = 'connection'
+
+    ALL_REASONS = (
+        REASON_NONCE,
+        REASON_TRADE_UNAVAILABLE,
+        REASON_TIMEOUT,
+        REASON_SERVER_ERROR,
+        REASON_THROTTLED,
+        REASON_CONNECT,
+        REASON_CONNECTION
+    )
+
+    # サーバーが要求を処理していないことが確実な理由
+    _SAFE_REASONS = (
+        REASON_NONCE,
+        REASON_TRADE_UNAVAILABLE,
+        REASON_THROTTLED,
+        REASON_CONNECT
+    )
+
+    # 重複して実行されると困るメソッド
+    NON_IDEMPOTENT_METHODS = (
+        'trade',
+        'create_position',
+        'change_position',
+        'withdraw'
+    )
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 5.0,
+                 reasons: tuple = ALL_REASONS, non_idempotent_methods: tuple = NON_IDEMPOTENT_METHODS):
+        '''
+        コンストラクタ
+        max_attempts :
+            最初の送信を含む最大試行回数
+        base_delay :
+            バックオフの基準となる秒数
+        max_delay :
+            バックオフの上限となる秒数
+        reasons :
+            再試行する失敗の理由
+        non_idempotent_methods :
+            安全な場合のみ再試行するメソッド
+        '''
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._reasons = tuple(reasons)
+        self._non_idempotent_methods = tuple(non_idempotent_methods)
+        self._lock = threading.Lock()
+        self._retries = {}
+        self._give_ups = {}
+
+    @classmethod
+    def nonce_only(cls) -> 'RetryPolicy':
+        '''
+        ノンスが拒否された場合のみ、待機せずに一度だけ再試行するポリシーを作成します。
+        '''
+        return cls(max_attempts=2, base_delay=0.0, max_delay=0.0, reasons=(cls.REASON_NONCE,))
+
+    @property
+    def max_attempts(self) -> int:
+        return self._max_attempts
+
+    @classmethod
+    def classify(cls, error: Exception) -> str:
+        '''
+        失敗の理由を取得します。再試行できない失敗の場合はNoneを返します。
+        '''
+        if isinstance(error, (NonceNotIcreasedException, NonceOutOfRangeException)):
+            return cls.REASON_NONCE
+        if isinstance(error, TradeTemporarilyUnavailableException):
+            return cls.REASON_TRADE_UNAVAILABLE
+        if isinstance(error, TimeoutException):
+            return cls.REASON_TIMEOUT
+        if isinstance(error, HttpStatusException):
+            if error.status_code == 429:
+                return cls.REASON_THROTTLED
+            if 500 <= error.status_code < 600:
+                return cls.REASON_SERVER_ERROR
+            return None
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return cls.REASON_CONNECT
+        if isinstance(error, requests.exceptions.Timeout):
+            return cls.REASON_TIMEOUT
+        if isinstance(error, requests.exceptions.ConnectionError):
+            return cls.REASON_CONNECTION
+        # aiohttpの例外はaiohttpを読み込んでいる場合のみ発生するため、読み込み済みの場合に限り判定する
+        aiohttp = sys.modules.get('aiohttp')
+        if aiohttp is not None:
+            if isinstance(error, aiohttp.ClientConnectorError):
+                return cls.REASON_CONNECT
+            if isinstance(error, aiohttp.ClientConnectionError):
+                return cls.REASON_CONNECTION
+        if isinstance(error, ConnectionError):
+            return cls.REASON_CONNECTION
+        return None
+
+    def next_delay(self, error: Exception, method: str, attempt: int) -> float:
+        '''
+        再試行までの待機秒数を取得します。再試行しない場合はNoneを返します。
+        attempt :
+            失敗した試行の回数(最初の送信は0)
+        '''
+        reason = self.classify(error)
+        if reason is None or reason not in self._reasons:
+            return None
+        if attempt + 1 >= self._max_attempts \
+                or (method in self._non_idempotent_methods and reason not in self._SAFE_REASONS):
+            self._count(self._give_ups, reason)
+            return None
+        self._count(self._retries, reason)
+        return random.uniform(0.0, min(self._max_delay, self._base_delay * (2 ** attempt)))
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        理由ごとの再試行回数と、再試行を断念した回数を取得します。
+        '''
+        with self._lock:
+            return {
+                'retries': dict(self._retries),
+                'give_ups': dict(self._give_ups)
+            }
+
+    def _count(self, counter: dict, reason: str):
+        '''
+        理由ごとの回数を数えます。
+        '''
+        with self._lock:
+            counter[reason] = counter.get(reason, 0) + 1
@@ -0,0 +1,39 @@
+import hashlib
+import hmac
+
+
+class HmacSigner():
+    '''
+    APIキーとシークレットで要求に署名します。
+
+    シークレットを鍵として初期化したHMACの状態を保持し、署名のたびに複製して使用するため、
+    鍵の処理は初回の1度のみとなります。
+    '''
+
+    def __init__(self, key: str, secret: str):
+        '''
+        コンストラクタ
+        '''
+        self._key = key
+        self._hmac = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha512)
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    def sign(self, params: str) -> str:
+        '''
+        エンコード済みのパラメータの署名を作成します。
+        '''
+        signature = self._hmac.copy()
+        signature.update(params.encode('utf-8'))
+        return signature.hexdigest()
+
+    def create_http_headers(self, params: str) -> dict:
+        '''
+        署名を含むHTTPヘッダーを作成します。
+        '''
+        return {
+            'key': self._key,
+            'sign': self.sign(params)
+        }
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+
+from zaifer.zaifapi.decoder import JsonDecoder
+
+
+class SingleFlight():
+    '''
+    同一の要求が同時に発行された場合、先行する1つの要求の結果を共有します。
+
+    スレッドからは do を、コルーチンからは do_async を使用します。
+    結果を共有した呼び出し元には、結果の複製を返します。
+    '''
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        '''
+        コンストラクタ
+        '''
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+        self._statistics = {
+            'calls': 0,
+            'shared': 0
+        }
+
+    @classmethod
+    def shared(cls) -> 'SingleFlight':
+        '''
+        プロセス内で共有される既定のインスタンスを取得します。
+        '''
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def do(self, key, func):
+        '''
+        同じキーの要求が実行中であればその結果を待ち、なければfuncを実行します。
+        '''
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._statistics['calls'] += 1
+            else:
+                self._statistics['shared'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return JsonDecoder.copy(call.value)
+
+        try:
+            call.value = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.value
+
+    async def do_async(self, key, coroutine_func):
+        '''
+        同じキーの要求が実行中であればその結果を待ち、なければcoroutine_funcを実行します。
+        要求は呼び出し元とは別のタスクで実行するため、呼び出し元の1つがキャンセルされても
+        他の呼び出し元には影響せず、すべての呼び出し元がキャンセルされた場合のみ要求をキャンセルします。
+        '''
+        loop = asyncio.get_event_loop()
+        future_key = (loop, key)
+        with self._lock:
+            call = self._futures.get(future_key)
+            leader = call is None
+            if leader:
+                call = _AsyncCall(asyncio.ensure_future(coroutine_func()))
+                call.task.add_done_callback(lambda task: self._forget(future_key, call))
+                self._futures[future_key] = call
+                self._statistics['calls'] += 1
+            else:
+                self._statistics['shared'] += 1
+            call.waiters += 1
+
+        cancelled = False
+        try:
+            value = await asyncio.shield(call.task)
+            return value if leader else JsonDecoder.copy(value)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = cancelled and call.waiters == 0
+                # キャンセルする要求に、新しい呼び出し元が合流しないようにする
+                if abandoned and self._futures.get(future_key) is call:
+                    del self._futures[future_key]
+            if abandoned:
+                call.task.cancel()
+
+    def _forget(self, future_key: tuple, call: '_AsyncCall'):
+        '''
+        完了した要求を、実行中の要求から取り除きます。
+        '''
+        with self._lock:
+            if self._futures.get(future_key) is call:
+                del self._futures[future_key]
+        # 待機している呼び出し元がいない場合の警告を抑止する
+        if not call.task.cancelled():
+            call.task.exception()
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        実際に実行した要求の数と、結果を共有した要求の数を取得します。
+        '''
+        with self._lock:
+            return dict(self._statistics, in_flight=len(self._calls) + len(self._futures))
+
+
+class _Call():
+    '''
+    実行中の要求を表します。
+    '''
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class _AsyncCall():
+    '''
+    asyncioで実行中の要求を表します。
+    '''
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
@@ -0,0 +1,571 @@
+import asyncio
+import json
+import logging
+import queue
+import random
+import threading
+from collections import namedtuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+try:
+    import websockets
+    from websockets.exceptions import ConnectionClosed, WebSocketException
+except ImportError:
+    websockets = None
+    ConnectionClosed = None
+    WebSocketException = None
+
+from zaifer.zaifapi.connection import UrlConfigs
+
+_logger = logging.getLogger(__name__)
+
+StreamMessage = namedtuple(
+    'StreamMessage', ['currency_pair', 'depth', 'trades', 'new_trades', 'last_price', 'timestamp'])
+StreamMessage.__doc__ = '''
+ストリーミングAPIのメッセージを表します。
+depthはMarket.get_depth、tradesとnew_tradesはMarket.get_trade_history、
+last_priceはMarket.get_last_priceと同じ形式です。
+'''
+
+# 受信を終了したことを表す値
+_STOP = object()
+
+
+def _require_websockets():
+    '''
+    websocketsが導入されていることを確認します。
+    '''
+    if websockets is None:
+        raise ImportError('websockets is required to use the streaming API.')
+
+
+class StreamDecoder():
+    '''
+    ストリーミングAPIのメッセージを、Marketの各メソッドと同じ形式に変換します。
+
+    約定履歴は直近の一定件数が毎回送られてくるため、通貨ペアごとに受信済みの取引IDを保持し、
+    前回より新しい約定のみをnew_tradesとして取り出します。
+    '''
+
+    def __init__(self):
+        '''
+        コンストラクタ
+        '''
+        self._last_tids = {}
+
+    def decode(self, raw) -> StreamMessage:
+        '''
+        受信したメッセージを変換します。
+        '''
+        message = json.loads(raw) if isinstance(raw, (str, bytes, bytearray)) else raw
+        currency_pair = message.get('currency_pair')
+
+        depth = {'asks': message.get('asks') or [], 'bids': message.get('bids') or []}
+        trades = [self._normalize_trade(trade, currency_pair) for trade in message.get('trades') or []]
+
+        last_tid = self._last_tids.get(currency_pair)
+        if last_tid is None:
+            new_trades = trades
+        else:
+            new_trades = [trade for trade in trades if trade['tid'] > last_tid]
+        if trades:
+            latest_tid = max(trade['tid'] for trade in trades)
+            self._last_tids[currency_pair] = latest_tid if last_tid is None else max(last_tid, latest_tid)
+
+        last_price = message.get('last_price') or {}
+        return StreamMessage(
+            currency_pair, depth, trades, new_trades,
+            {'last_price': last_price.get('price')}, message.get('timestamp'))
+
+    def reset(self, currency_pair: str = None):
+        '''
+        受信済みの取引IDを破棄します。
+        '''
+        if currency_pair is None:
+            self._last_tids.clear()
+        else:
+            self._last_tids.pop(currency_pair, None)
+
+    @staticmethod
+    def _normalize_trade(trade: dict, currency_pair: str) -> dict:
+        '''
+        約定をMarket.get_trade_historyと同じ形式に変換します。
+        ストリーミングAPIでは通貨ペアの項目名が'currenty_pair'となっているため、読み替えます。
+        '''
+        trade = dict(trade)
+        if 'currenty_pair' in trade:
+            trade.setdefault('currency_pair', trade.pop('currenty_pair'))
+        trade.setdefault('currency_pair', currency_pair)
+        return trade
+
+
+class AsyncStreamClient():
+    '''
+    ストリーミングAPIから板情報・約定履歴を受信するasyncio版のクライアントです。
+
+    通貨ペアごとに1本の接続を保持し、切断された場合やidle_timeoutの間メッセージが届かない場合は、
+    待機時間を倍増させながら再接続します。死活監視のpingはheartbeat_intervalごとに送信します。
+    受信したメッセージは subscribe で登録した関数に通知するほか、async for で順に取得できます。
+    '''
+
+    def __init__(self, currency_pairs, url_config: UrlConfigs = UrlConfigs(),
+                 heartbeat_interval: float = 15.0, idle_timeout: float = 60.0,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+                 max_queue_size: int = 1000):
+        '''
+        コンストラクタ
+        currency_pairs :
+            受信する通貨ペア、またはそのリスト
+        heartbeat_interval :
+            pingを送信する間隔(秒)。応答がない場合は再接続します。
+        idle_timeout :
+            メッセージが届かない場合に再接続するまでの秒数。Noneの場合は再接続しません。
+        reconnect_delay :
+            再接続までの最初の待機秒数
+        max_reconnect_delay :
+            再接続までの最大待機秒数
+        max_queue_size :
+            async for で取り出されていないメッセージを保持する最大件数。超えた場合は古いものから破棄します。
+        '''
+        _require_websockets()
+        if isinstance(currency_pairs, str):
+            currency_pairs = [currency_pairs]
+        self._currency_pairs = list(currency_pairs)
+        self._stream_api_url = url_config.stream_api_url
+        self._heartbeat_interval = heartbeat_interval
+        self._idle_timeout = idle_timeout
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._max_queue_size = max_queue_size
+        self._decoder = StreamDecoder()
+        self._listeners = []
+        self._queue = None
+        self._tasks = []
+        self._statistics = {
+            currency_pair: {'connections': 0, 'messages': 0, 'dropped': 0, 'errors': 0, 'listener_errors': 0}
+            for currency_pair in self._currency_pairs
+        }
+
+    @property
+    def currency_pairs(self) -> list:
+        return list(self._currency_pairs)
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        通貨ペアごとの接続回数・受信件数・破棄件数・エラー件数・購読者のエラー件数を取得します。
+        '''
+        return {currency_pair: dict(counts) for currency_pair, counts in self._statistics.items()}
+
+    def subscribe(self, listener):
+        '''
+        メッセージを受け取る関数を登録します。関数はStreamMessageを引数に呼び出されます。
+        '''
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        '''
+        登録した関数を解除します。
+        '''
+        self._listeners.remove(listener)
+
+    def stream_url(self, currency_pair: str) -> str:
+        '''
+        通貨ペアの接続先URLを取得します。
+        '''
+        return '{}?{}'.format(self._stream_api_url, urlencode({'currency_pair': currency_pair}))
+
+    async def start(self):
+        '''
+        受信を開始します。
+        '''
+        if self._tasks:
+            return
+        self._tasks = [asyncio.ensure_future(self._run(currency_pair))
+                       for currency_pair in self._currency_pairs]
+
+    async def stop(self):
+        '''
+        受信を停止し、すべての接続を閉じます。
+        '''
+        tasks, self._tasks = self._tasks, []
+        # 受信とキャンセルが重なるとwait_forがキャンセルを取りこぼすため、終了するまで繰り返す
+        pending = set(tasks)
+        while pending:
+            for task in pending:
+                task.cancel()
+            _, pending = await asyncio.wait(pending, timeout=0.1)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._queue is not None:
+            self._put(_STOP)
+
+    async def __aenter__(self) -> 'AsyncStreamClient':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.stop()
+
+    def __aiter__(self) -> 'AsyncStreamClient':
+        # 取り出す側がいる場合のみメッセージを保持する
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        return self
+
+    async def __anext__(self) -> StreamMessage:
+        if not self._tasks and self._queue.empty():
+            await self.start()
+        message = await self._queue.get()
+        if message is _STOP:
+            raise StopAsyncIteration
+        return message
+
+    async def _run(self, currency_pair: str):
+        '''
+        通貨ペアの接続を維持し、メッセージを受信します。
+        '''
+        statistics = self._statistics[currency_pair]
+        attempt = 0
+        while True:
+            try:
+                async with websockets.connect(
+                        self.stream_url(currency_pair),
+                        ping_interval=self._heartbeat_interval,
+                        ping_timeout=self._heartbeat_interval,
+                        close_timeout=1) as websocket:
+                    statistics['connections'] += 1
+                    attempt = 0
+                    while True:
+                        raw = await asyncio.wait_for(websocket.recv(), self._idle_timeout)
+                        try:
+                            message = self._decoder.decode(raw)
+                        except (ValueError, AttributeError, TypeError, KeyError):
+                            statistics['errors'] += 1
+                            continue
+                        statistics['messages'] += 1
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except (WebSocketException, OSError, asyncio.TimeoutError):
+                # 切断のほか、ハンドシェイクの失敗(HTTPエラー応答など)も再接続する
+                statistics['errors'] += 1
+
+            # 待機時間を倍増させ、揺らぎを加えて再接続する
+            delay = min(self._max_reconnect_delay, self._reconnect_delay * (2 ** attempt))
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            attempt += 1
+
+    def _dispatch(self, message: StreamMessage):
+        '''
+        メッセージを購読者とキューに渡します。
+        '''
+        for listener in list(self._listeners):
+            # 購読者の例外で受信や他の購読者への通知を止めない
+            try:
+                listener(message)
+            except Exception:
+                self._listener_failed(message)
+        if self._queue is not None:
+            self._put(message)
+
+    def _listener_failed(self, message: StreamMessage):
+        '''
+        購読者で発生した例外を記録します。
+        '''
+        self._statistics[message.currency_pair]['listener_errors'] += 1
+        _logger.exception('stream listener failed: %s', message.currency_pair)
+
+    def _put(self, message):
+        '''
+        メッセージをキューに追加します。上限を超えた場合は最も古いメッセージを破棄します。
+        '''
+        if message is not _STOP and self._max_queue_size and self._queue.qsize() >= self._max_queue_size:
+            dropped = self._queue.get_nowait()
+            if isinstance(dropped, StreamMessage):
+                self._statistics[dropped.currency_pair]['dropped'] += 1
+        self._queue.put_nowait(message)
+
+
+class StreamClient():
+    '''
+    ストリーミングAPIから板情報・約定履歴を受信するスレッド版のクライアントです。
+
+    バックグラウンドのスレッドでAsyncStreamClientを実行します。
+    subscribe で登録した関数は受信用のスレッドから呼び出されます。
+    '''
+
+    def __init__(self, currency_pairs, url_config: UrlConfigs = UrlConfigs(),
+                 heartbeat_interval: float = 15.0, idle_timeout: float = 60.0,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+                 max_queue_size: int = 1000):
+        '''
+        コンストラクタ
+        引数はAsyncStreamClientと同じです。
+        '''
+        _require_websockets()
+        self._client_args = (currency_pairs, url_config, heartbeat_interval, idle_timeout,
+                             reconnect_delay, max_reconnect_delay, max_queue_size)
+        self._queue = queue.Queue(max_queue_size or 0)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._client = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        通貨ペアごとの接続回数・受信件数・破棄件数・エラー件数・購読者のエラー件数を取得します。
+        '''
+        return self._client.statistics if self._client is not None else {}
+
+    def subscribe(self, listener):
+        '''
+        メッセージを受け取る関数を登録します。関数はStreamMessageを引数に呼び出されます。
+        '''
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        '''
+        登録した関数を解除します。
+        '''
+        with self._lock:
+            self._listeners.remove(listener)
+
+    def start(self):
+        '''
+        受信用のスレッドを起動します。
+        '''
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._client = AsyncStreamClient(*self._client_args)
+        self._client.subscribe(self._dispatch)
+        self._thread = threading.Thread(target=self._run, name='zaifer-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        '''
+        受信を停止し、受信用のスレッドの終了を待ちます。
+        '''
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.stop(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self._put(_STOP)
+
+    def get(self, timeout: float = None) -> StreamMessage:
+        '''
+        受信したメッセージを1件取得します。timeoutの間に受信しない場合はqueue.Emptyを送出します。
+        '''
+        if self._thread is None and self._queue.empty():
+            self.start()
+        message = self._queue.get(timeout=timeout)
+        if message is _STOP:
+            raise queue.Empty
+        return message
+
+    def __enter__(self) -> 'StreamClient':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def __iter__(self) -> 'StreamClient':
+        return self
+
+    def __next__(self) -> StreamMessage:
+        try:
+            return self.get()
+        except queue.Empty:
+            raise StopIteration
+
+    def _run(self):
+        '''
+        受信用のスレッドでイベントループを実行します。
+        '''
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._client.start())
+        self._loop.run_forever()
+        self._loop.close()
+
+    def _dispatch(self, message: StreamMessage):
+        '''
+        メッセージを購読者とキューに渡します。
+        '''
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(message)
+            except Exception:
+                self._client._listener_failed(message)
+        self._put(message)
+
+    def _put(self, message):
+        '''
+        メッセージをキューに追加します。上限を超えた場合は最も古いメッセージを破棄し、破棄件数に数えます。
+        '''
+        while True:
+            try:
+                self._queue.put_nowait(message)
+                return
+            except queue.Full:
+                pass
+            try:
+                dropped = self._queue.get_nowait()
+            except queue.Empty:
+                # 取り出す前に他のスレッドが取得した
+                continue
+            if isinstance(dropped, StreamMessage):
+                with self._lock:
+                    self._client._statistics[dropped.currency_pair]['dropped'] += 1
+
+
+class StreamReplayServer():
+    '''
+    記録したストリーミングAPIのメッセージを配信するWebSocketサーバーです。
+    接続先をstream_api_urlに指定することで、オフラインで動作を確認できます。
+
+    メッセージは接続時に指定された通貨ペアのものを、記録順にintervalの間隔で配信します。
+    '''
+
+    def __init__(self, messages, host: str = '127.0.0.1', port: int = 0,
+                 interval: float = 0.1, repeat: bool = True):
+        '''
+        コンストラクタ
+        messages :
+            配信するメッセージのリスト、または1行に1件のJSONを記録したファイルのパス
+        port :
+            待ち受けるポート。0の場合は空いているポートを使用します。
+        interval :
+            メッセージを配信する間隔(秒)
+        repeat :
+            すべて配信した後、先頭から繰り返すか
+        '''
+        _require_websockets()
+        if isinstance(messages, str):
+            messages = self.load(messages)
+        self._messages = {}
+        for message in messages:
+            if isinstance(message, (bytes, bytearray)):
+                message = message.decode('utf-8')
+            raw = message if isinstance(message, str) else json.dumps(message)
+            currency_pair = json.loads(raw).get('currency_pair')
+            self._messages.setdefault(currency_pair, []).append(raw)
+        self._host = host
+        self._port = port
+        self._interval = interval
+        self._repeat = repeat
+        self._connections = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    @staticmethod
+    def load(path: str) -> list:
+        '''
+        1行に1件のJSONを記録したファイルからメッセージを読み込みます。
+        '''
+        with open(path, encoding='utf-8') as fp:
+            return [line.strip() for line in fp if line.strip()]
+
+    @property
+    def url(self) -> str:
+        '''
+        stream_api_urlに指定する接続先URLを取得します。
+        '''
+        return 'ws://{}:{}/stream'.format(self._host, self._port)
+
+    def start(self):
+        '''
+        サーバーを起動します。
+        '''
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(started,), name='zaifer-stream-replay', daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self):
+        '''
+        サーバーを停止します。
+        '''
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def drop_connections(self):
+        '''
+        接続中のすべての接続を切断します。クライアントの再接続の確認に使用します。
+        '''
+        asyncio.run_coroutine_threadsafe(self._close_connections(), self._loop).result()
+
+    def __enter__(self) -> 'StreamReplayServer':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self, started: threading.Event):
+        '''
+        サーバー用のスレッドでイベントループを実行します。
+        '''
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(self._serve())
+        self._port = list(self._server.sockets)[0].getsockname()[1]
+        started.set()
+        self._loop.run_forever()
+
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    async def _serve(self):
+        '''
+        待ち受けを開始します。
+        '''
+        return await websockets.serve(self._handle, self._host, self._port)
+
+    async def _handle(self, websocket):
+        '''
+        接続ごとに通貨ペアのメッセージを配信します。
+        '''
+        request = getattr(websocket, 'request', None)
+        path = request.path if request is not None else websocket.path
+        currency_pair = parse_qs(urlparse(path).query).get('currency_pair', [None])[0]
+        messages = self._messages.get(currency_pair)
+        if not messages:
+            await websocket.close(code=1008, reason='unknown currency_pair')
+            return
+
+        self._connections.add(websocket)
+        try:
+            while True:
+                for raw in messages:
+                    await websocket.send(raw)
+                    await asyncio.sleep(self._interval)
+                if not self._repeat:
+                    break
+            await websocket.wait_closed()
+        except ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(websocket)
+
+    async def _close_connections(self):
+        '''
+        接続中のすべての接続を閉じます。
+        '''
+        await asyncio.gather(*[websocket.close() for websocket in list(self._connections)],
+                             return_exceptions=True)
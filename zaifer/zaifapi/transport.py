@@ -0,0 +1,445 @@
+import asyncio
+import bisect
+import os
+import struct
+import threading
+import time
+import weakref
+from collections import deque, namedtuple
+from urllib.parse import parse_qsl, urlencode
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+from zaifer.zaifapi.connection import SessionPool
+from zaifer.zaifapi.exception import ReplayMissException
+
+TransportResponse = namedtuple('TransportResponse', ['status_code', 'content'])
+TransportResponse.__doc__ = '''
+トランスポートが返すレスポンスを表します。contentはレスポンスの本文(bytes)です。
+'''
+
+TransportRecord = namedtuple('TransportRecord', ['timestamp', 'elapsed', 'key', 'status_code', 'content'])
+TransportRecord.__doc__ = '''
+ログに記録したHTTP要求とレスポンスを表します。
+timestampはレスポンスを受信した時刻(UNIX時間)、elapsedは要求の所要時間(秒)です。
+'''
+
+
+def request_key(http_method: str, url: str, params: dict = None, data: str = None) -> str:
+    '''
+    記録したレスポンスと照合するための要求のキーを作成します。
+    パラメータは名前順に並べ、試行ごとに変わるノンスは除きます。
+    '''
+    if params:
+        query = sorted((name, str(value)) for name, value in params.items())
+    elif data:
+        query = sorted((name, value) for name, value in parse_qsl(data, keep_blank_values=True)
+                       if name != 'nonce')
+    else:
+        query = []
+    return '{} {}?{}'.format(http_method, url, urlencode(query))
+
+
+class TransportLog():
+    '''
+    HTTP要求とレスポンスを記録する追記専用のログです。
+
+    ログ本体(path)と、時刻からログ本体の位置を引く索引(path + '.idx')で構成されます。
+    索引は index_interval 件ごとに記録するため、指定した時刻への移動はログ全体を読まずに行えます。
+    '''
+
+    MAGIC = b'ZFTL\x01'
+
+    _RECORD = struct.Struct('<dfHII')
+    _INDEX = struct.Struct('<dQ')
+
+    def __init__(self, path: str, index_interval: int = 64):
+        '''
+        コンストラクタ
+        path :
+            ログ本体のパス
+        index_interval :
+            索引を記録する間隔(件数)
+        '''
+        if index_interval < 1:
+            raise ValueError('index_interval must be at least 1.')
+        self._path = path
+        self._index_path = path + '.idx'
+        self._index_interval = index_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._index_file = None
+        self._unindexed = 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def append(self, elapsed: float, key: str, status_code: int, content: bytes,
+               timestamp: float = None) -> TransportRecord:
+        '''
+        HTTP要求とレスポンスを記録します。
+        '''
+        key_bytes = key.encode('utf-8')
+        content = bytes(content)
+        with self._lock:
+            timestamp = time.time() if timestamp is None else timestamp
+            if self._file is None:
+                self._open_for_append()
+            offset = self._file.tell()
+            self._file.write(self._RECORD.pack(timestamp, elapsed, status_code, len(key_bytes), len(content)))
+            self._file.write(key_bytes)
+            self._file.write(content)
+            self._file.flush()
+
+            # 既存のログに追記する場合は、最初の1件から索引を記録する
+            if self._unindexed == 0:
+                self._index_file.write(self._INDEX.pack(timestamp, offset))
+                self._index_file.flush()
+            self._unindexed = (self._unindexed + 1) % self._index_interval
+        return TransportRecord(timestamp, elapsed, key, status_code, content)
+
+    def offset_of(self, timestamp: float) -> int:
+        '''
+        指定した時刻以降の記録を読み始める位置を、索引から取得します。
+        '''
+        timestamps = []
+        offsets = []
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'rb') as f:
+                data = f.read()
+            size = self._INDEX.size
+            for start in range(0, len(data) - len(data) % size, size):
+                entry_timestamp, offset = self._INDEX.unpack_from(data, start)
+                timestamps.append(entry_timestamp)
+                offsets.append(offset)
+        index = bisect.bisect_left(timestamps, timestamp) - 1
+        return offsets[index] if index >= 0 else len(self.MAGIC)
+
+    def read(self, offset: int = None, since: float = None):
+        '''
+        記録を先頭(offsetを指定した場合はその位置)から順に返します。
+        sinceを指定した場合は、その時刻より前の記録を読み飛ばします。
+        '''
+        with open(self._path, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise ValueError('{} is not a transport log.'.format(self._path))
+            if offset is not None:
+                f.seek(offset)
+            header_size = self._RECORD.size
+            while True:
+                header = f.read(header_size)
+                if len(header) < header_size:
+                    return
+                timestamp, elapsed, status_code, key_size, content_size = self._RECORD.unpack(header)
+                key = f.read(key_size)
+                content = f.read(content_size)
+                # 書き込み途中で終了した記録は読まない
+                if len(key) < key_size or len(content) < content_size:
+                    return
+                if since is not None and timestamp < since:
+                    continue
+                yield TransportRecord(timestamp, elapsed, key.decode('utf-8'), status_code, content)
+
+    def close(self):
+        '''
+        追記に使用しているファイルを閉じます。
+        '''
+        with self._lock:
+            for f in (self._file, self._index_file):
+                if f is not None:
+                    f.close()
+            self._file = None
+            self._index_file = None
+            self._unindexed = 0
+
+    def _open_for_append(self):
+        '''
+        追記するファイルを開きます。
+        '''
+        self._file = open(self._path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(self.MAGIC)
+        self._index_file = open(self._index_path, 'ab')
+        self._unindexed = 0
+
+
+class RecordingTransport():
+    '''
+    HTTP要求を送信し、要求とレスポンスをTransportLogに記録するトランスポートです。
+    UrlConfigs.transportに設定して使用します。
+    '''
+
+    def __init__(self, path: str, transport=None, index_interval: int = 64):
+        '''
+        コンストラクタ
+        path :
+            記録するログのパス
+        transport :
+            実際に要求を送信するトランスポート(既定はSessionPool.shared())
+        '''
+        self._transport = transport if transport is not None else SessionPool.shared()
+        self._log = TransportLog(path, index_interval)
+
+    @property
+    def log(self) -> TransportLog:
+        return self._log
+
+    def request(self, base_url: str, http_method: str, url: str, **kwargs):
+        '''
+        HTTP要求を送信し、レスポンスを記録します。
+        '''
+        started = time.perf_counter()
+        response = self._transport.request(base_url, http_method, url, **kwargs)
+        elapsed = time.perf_counter() - started
+        key = request_key(http_method, url, kwargs.get('params'), kwargs.get('data'))
+        self._log.append(elapsed, key, response.status_code, response.content)
+        return response
+
+    def close(self):
+        self._log.close()
+
+    def __enter__(self) -> 'RecordingTransport':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ReplayTransport():
+    '''
+    TransportLogに記録したレスポンスを返すトランスポートです。UrlConfigs.transportに設定して使用します。
+
+    要求ごとに、同じ要求(URLとノンスを除くパラメータが一致するもの)の記録を記録した順に返します。
+    timing に TIMING_ORIGINAL を指定した場合は、記録した所要時間(を speed で割った時間)だけ待ってから返します。
+    '''
+
+    TIMING_NONE = 'none'
+    TIMING_ORIGINAL = 'original'
+
+    def __init__(self, path: str, timing: str = TIMING_NONE, speed: float = 1.0, start: float = None):
+        '''
+        コンストラクタ
+        path :
+            再生するログのパス
+        timing :
+            'none'(待たずに返す)または'original'(記録した所要時間だけ待つ)
+        speed :
+            timingが'original'の場合の再生速度の倍率
+        start :
+            再生を開始する時刻(UNIX時間)
+        '''
+        if timing not in (self.TIMING_NONE, self.TIMING_ORIGINAL):
+            raise ValueError('unsupported timing: {}'.format(timing))
+        if speed <= 0:
+            raise ValueError('speed must be positive.')
+        self._log = TransportLog(path)
+        self._timing = timing
+        self._speed = speed
+        self._lock = threading.Lock()
+        self._records = None
+        self._pending = {}
+        self._now = None
+        self.seek(start)
+
+    @property
+    def now(self) -> float:
+        '''
+        最後に返した記録の時刻を取得します。
+        '''
+        return self._now
+
+    def seek(self, timestamp: float = None):
+        '''
+        指定した時刻以降の記録から再生し直します。Noneの場合は先頭から再生します。
+        '''
+        with self._lock:
+            if self._records is not None:
+                self._records.close()
+            offset = None if timestamp is None else self._log.offset_of(timestamp)
+            self._records = self._log.read(offset, timestamp)
+            self._pending = {}
+            self._now = None
+
+    def request(self, base_url: str, http_method: str, url: str, **kwargs) -> TransportResponse:
+        '''
+        要求に一致する次の記録を返します。
+        '''
+        key = request_key(http_method, url, kwargs.get('params'), kwargs.get('data'))
+        with self._lock:
+            record = self._next(key)
+            self._now = record.timestamp
+        if self._timing == self.TIMING_ORIGINAL:
+            time.sleep(record.elapsed / self._speed)
+        return TransportResponse(record.status_code, record.content)
+
+    def close(self):
+        with self._lock:
+            if self._records is not None:
+                self._records.close()
+            self._pending = {}
+
+    def __enter__(self) -> 'ReplayTransport':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _next(self, key: str) -> TransportRecord:
+        '''
+        要求に一致する次の記録を取得します。
+        読み進める途中で見つけた他の要求の記録は、要求ごとに保留します。
+        '''
+        pending = self._pending.get(key)
+        if pending:
+            return pending.popleft()
+        for record in self._records:
+            if record.key == key:
+                return record
+            queue = self._pending.get(record.key)
+            if queue is None:
+                queue = self._pending[record.key] = deque()
+            queue.append(record)
+        raise ReplayMissException(key)
+
+
+class Http2Transport():
+    '''
+    HTTP/2で要求を送信するトランスポートです。UrlConfigs.transportに設定して使用します。
+
+    ホストごとに1つの接続を保持し、同時に送信した要求をその接続上で多重化します。
+    同期版・asyncio版(AsyncHttpConnection)のどちらからも使用できます。
+    接続先がHTTP/2に対応していない場合はHTTP/1.1で通信し、
+    httpx(h2)が導入されていない場合は fallback (既定はSessionPool.shared())で送信します。
+    '''
+
+    def __init__(self, fallback=None, max_connections: int = 10, keep_alive_timeout: float = 30.0,
+                 timeout: float = None):
+        '''
+        コンストラクタ
+        fallback :
+            HTTP/2を使用できない場合に要求を送信するトランスポート
+        max_connections :
+            同時に保持する接続の最大数
+        keep_alive_timeout :
+            アイドル状態の接続を破棄するまでの秒数
+        timeout :
+            要求のタイムアウト(秒)。Noneの場合はタイムアウトしません。
+        '''
+        self._fallback = fallback if fallback is not None else SessionPool.shared()
+        self._options = {}
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._http2_enabled = httpx is not None and h2 is not None
+        if self._http2_enabled:
+            limits = httpx.Limits(max_connections=max_connections, keepalive_expiry=keep_alive_timeout)
+            self._options = {'http2': True, 'limits': limits, 'timeout': timeout}
+
+    @property
+    def http2_enabled(self) -> bool:
+        '''
+        HTTP/2で送信できるか(httpx・h2が導入されているか)を取得します。
+        '''
+        return self._http2_enabled
+
+    @property
+    def supports_async(self) -> bool:
+        return self._http2_enabled
+
+    @property
+    def statistics(self) -> dict:
+        '''
+        HTTPのバージョンごとの要求数を取得します。fallbackで送信した要求はHTTP/1.1として数えます。
+        '''
+        with self._lock:
+            return dict(self._versions)
+
+    def request(self, base_url: str, http_method: str, url: str, params: dict = None, data: str = None,
+                headers: dict = None, **kwargs):
+        '''
+        HTTP要求を送信します。
+        '''
+        if not self._http2_enabled:
+            response = self._fallback.request(base_url, http_method, url, params=params, data=data,
+                                              headers=headers, **kwargs)
+            self._count('HTTP/1.1')
+            return response
+        response = self._get_client().request(http_method, url, params=params, content=data,
+                                              headers=self._headers_of(headers, data))
+        self._count(response.http_version)
+        return response
+
+    async def request_async(self, base_url: str, http_method: str, url: str, params: dict = None,
+                            data: str = None, headers: dict = None):
+        '''
+        asyncioでHTTP要求を送信します。
+        '''
+        client = self._get_async_client()
+        response = await client.request(http_method, url, params=params, content=data,
+                                        headers=self._headers_of(headers, data))
+        self._count(response.http_version)
+        return response
+
+    def close(self):
+        '''
+        同期版の接続を破棄します。次の要求で接続し直します。
+        '''
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def close_async(self):
+        '''
+        実行中のイベントループに対応する接続を破棄します。
+        '''
+        client = self._async_clients.pop(asyncio.get_event_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _get_client(self) -> 'httpx.Client':
+        '''
+        同期版のクライアントを取得します。最初の要求で作成します。
+        '''
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(**self._options)
+                client = self._client
+        return client
+
+    def _get_async_client(self) -> 'httpx.AsyncClient':
+        '''
+        実行中のイベントループに対応するクライアントを取得します。
+        '''
+        loop = asyncio.get_event_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = httpx.AsyncClient(**self._options)
+        return client
+
+    def _count(self, http_version: str):
+        with self._lock:
+            self._versions[http_version] = self._versions.get(http_version, 0) + 1
+
+    @staticmethod
+    def _headers_of(headers: dict, data: str) -> dict:
+        '''
+        本文がある場合は、フォーム形式であることをヘッダーに設定します。
+        '''
+        if data is None:
+            return headers
+        headers = dict(headers or {})
+        headers.setdefault('Content-Type', 'application/x-www-form-urlencoded')
+        return headers